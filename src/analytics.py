@@ -0,0 +1,208 @@
+"""
+    Trends and anomalies of the accidents, computed incrementally.
+
+    `Trends` keeps the number of accidents per year and season (the table of
+    `preprocess.prepare_seasonal_accidents`) and per year, day of the week and
+    hour (the table of `preprocess.prepare_hourly_counts`). New rows are added
+    with `append`: only the years they touch are aggregated again, and the
+    year-over-year deltas are only recomputed for those years and the years
+    following them. The results are cached until the next append.
+
+    The seasonal anomalies are z-scores of each season against the same season
+    of the other years, so a drop in spring is compared to the other springs.
+"""
+import numpy as np
+import pandas as pd
+
+import preprocess
+from const import DAY_ORDER, SEASON_ORDER
+
+# A season of a year is an anomaly when its z-score is at least this far from 0,
+# and its number of accidents at least this far (in percent) from the mean of the season
+Z_THRESHOLD = 1.5
+MIN_DEVIATION = 5
+
+ALL_HOURS = list(range(24))
+MORNING_HOURS = list(range(0, 12))
+EVENING_HOURS = list(range(12, 24))
+NIGHT_HOURS = list(range(0, 6))
+
+
+class Trends:
+    """
+    Running aggregates of the accidents per year, with their derived trends.
+    """
+
+    def __init__(self):
+        self._seasonal = pd.DataFrame(columns=SEASON_ORDER, dtype=np.int64)
+        self._seasonal.index.name = 'crash_year'
+        self._hourly = {}
+        self._deltas = {}
+        self._dirty = set()
+        self._trends = None
+
+    def append(self, rows):
+        """
+        Adds accidents to the aggregates. Only the years of the new rows are marked as changed.
+
+        Args:
+            rows (pd.DataFrame): Processed accidents, with the `crash_year`, `season`,
+                `crash_day_of_week_name` and `crash_hour` columns.
+        """
+        if rows.empty:
+            return
+        seasonal = preprocess.prepare_seasonal_accidents(rows)
+        seasonal = seasonal.reindex(columns=SEASON_ORDER, fill_value=0).astype(np.int64)
+        self._seasonal = seasonal.add(self._seasonal, fill_value=0).astype(np.int64)
+        self._seasonal.columns.name = None
+
+        for year, group in rows.groupby('crash_year'):
+            hourly = preprocess.prepare_hourly_counts(group).reindex(DAY_ORDER, fill_value=0)
+            if year in self._hourly:
+                hourly = hourly + self._hourly[year]
+            self._hourly[year] = hourly
+        self._dirty.update(int(year) for year in seasonal.index)
+        self._trends = None
+
+    @property
+    def years(self):
+        """
+        List[int]: The years with at least one accident, in order.
+        """
+        return [int(year) for year in self._seasonal.index]
+
+    @property
+    def seasonal(self):
+        """
+        pd.DataFrame: The number of accidents per year (rows) and season (columns).
+        """
+        return self._seasonal
+
+    def hourly(self, years=None):
+        """
+        Returns the number of accidents per day of the week and hour.
+
+        Args:
+            years (List[int], optional): The years to count. Defaults to every year.
+
+        Returns:
+            pd.DataFrame: The counts, with the days in rows and the hours in columns.
+        """
+        tables = [self._hourly[year] for year in (self.years if years is None else years)
+                  if year in self._hourly]
+        if not tables:
+            return pd.DataFrame(0, index=DAY_ORDER, columns=ALL_HOURS, dtype=np.int64)
+        return sum(tables[1:], tables[0])
+
+    def trends(self):
+        """
+        Computes the trends of every season of every year.
+
+        Returns:
+            pd.DataFrame: One row per year and season, indexed by (`crash_year`, `season`), with:
+                - `count`: the number of accidents;
+                - `delta`: the difference with the same season of the previous year;
+                - `delta_pct`: that difference in percent of the previous year;
+                - `deviation_pct`: the difference with the mean of the season, in percent;
+                - `zscore`: the anomaly score against the same season of the other years.
+        """
+        if self._trends is not None:
+            return self._trends
+
+        # The delta of a year depends on the previous year: the changed years and the next ones
+        # are stale
+        stale = self._dirty | {year + 1 for year in self._dirty}
+        for year in stale.intersection(self.years):
+            if year - 1 in self._seasonal.index:
+                previous = self._seasonal.loc[year - 1]
+                delta = self._seasonal.loc[year] - previous
+                self._deltas[year] = pd.DataFrame({
+                    'delta': delta,
+                    'delta_pct': delta / previous.replace(0, np.nan) * 100,
+                })
+            else:
+                self._deltas[year] = pd.DataFrame(np.nan, index=SEASON_ORDER,
+                                                  columns=['delta', 'delta_pct'])
+        self._dirty.clear()
+
+        mean = self._seasonal.mean()
+        deviations = (self._seasonal - mean) / mean.replace(0, np.nan) * 100
+        zscores = (self._seasonal - mean) / self._seasonal.std(ddof=0).replace(0, np.nan)
+
+        trends = pd.concat(
+            {year: self._deltas[year].assign(count=self._seasonal.loc[year],
+                                             deviation_pct=deviations.loc[year],
+                                             zscore=zscores.loc[year])
+             for year in self.years},
+            names=['crash_year', 'season'],
+        )
+        self._trends = trends[['count', 'delta', 'delta_pct', 'deviation_pct', 'zscore']]
+        return self._trends
+
+    def anomalies(self, threshold=Z_THRESHOLD, min_deviation=MIN_DEVIATION):
+        """
+        Lists the seasons whose number of accidents is unusual compared to the other years.
+
+        Args:
+            threshold (float, optional): The minimal absolute z-score of an anomaly.
+            min_deviation (float, optional): The minimal difference with the mean of the season,
+                in percent.
+
+        Returns:
+            pd.DataFrame: The rows of `trends` which are anomalies, from the lowest to the highest
+            z-score.
+        """
+        trends = self.trends()
+        unusual = ((trends['zscore'].abs() >= threshold)
+                   & (trends['deviation_pct'].abs() >= min_deviation))
+        return trends[unusual].sort_values('zscore')
+
+    def rebound(self):
+        """
+        Finds the strongest rise of a season: its highest positive anomaly, or else its largest
+        increase compared to the previous year.
+
+        Returns:
+            Optional[Tuple[int, str, int]]: The year, the season and its number of accidents,
+            or None when no season increased.
+        """
+        anomalies = self.anomalies()
+        rises = anomalies[anomalies['zscore'] > 0]
+        if not rises.empty:
+            year, season = rises.index[-1]
+        else:
+            deltas = self.trends()['delta'].dropna()
+            if deltas.empty or deltas.max() <= 0:
+                return None
+            year, season = deltas.idxmax()
+        return int(year), season, int(self._seasonal.loc[year, season])
+
+def peak_hours(hourly, hours=ALL_HOURS):
+    """
+    Finds the hour with the most accidents of each day.
+
+    Args:
+        hourly (pd.DataFrame): The counts per day (rows) and hour (columns).
+        hours (List[int], optional): The hours to consider. Defaults to the whole day.
+
+    Returns:
+        pd.Series: The peak hour of each day.
+    """
+    return hourly[hours].idxmax(axis=1).astype(np.int64)
+
+
+def peak_window(counts, hours, width=3):
+    """
+    Finds the consecutive hours with the most accidents.
+
+    Args:
+        counts (pd.Series): The counts per hour.
+        hours (List[int]): The consecutive hours to consider.
+        width (int, optional): The number of hours of the window.
+
+    Returns:
+        Tuple[int, int]: The first and last hour of the window.
+    """
+    sums = counts[hours].rolling(width).sum().dropna()
+    last = int(sums.idxmax())
+    return last - width + 1, last
@@ -1,6 +1,18 @@
+import collections
 import dash
-import pathlib
+import functools
+import os
+import analytics
+import backends
+import debounce
+import drilldown
+import ingest
+import jobs
+import mappings
+import narrative
 import preprocess
+import rollups
+import templates
 import figure_1
 import figure_2
 import figure_3
@@ -9,79 +21,281 @@ from dash import ctx
 from dash import html
 from dash.dependencies import Input, Output, State
 from dash import dcc
+from dash.exceptions import PreventUpdate
 
 import plotly.graph_objects as go
 
 import pandas as pd
-from const import SEASON_ORDER, SEASON_COLORS
-
-app = dash.Dash(__name__)
+from const import (SEASON_ORDER, SEASON_COLORS, SANKEY_DIMENSIONS, DIMENSION_LABELS, DAY_ORDER,
+                   RAW_COLUMNS)
+
+# Query backend running the aggregations: 'pandas' (default) or 'duckdb'
+BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas")
+# Accidents sampled per month for the approximate counts of figure 2, 0 to always count exactly
+SAMPLE_SIZE = int(os.environ.get("DASHBOARD_SAMPLE_SIZE", "0"))
+# Accidents in the months of the selected dates up to which figure 2 is still counted exactly, in
+# the request, by the approximate mode
+EXACT_ROWS = int(os.environ.get("DASHBOARD_EXACT_ROWS", "1000000"))
+# Processes preprocessing the source CSV when the store is outdated, 1 to preprocess it in this
+# process
+INGEST_WORKERS = int(os.environ.get("DASHBOARD_INGEST_WORKERS", "1"))
+
+app = dash.Dash(
+    __name__,
+    background_callback_manager=jobs.create_manager(
+        ingest.CACHE_PATH.joinpath("jobs"), ingest.SOURCE_PATH
+    ),
+)
 app.title = 'La face cachée de nos trajets quotidiens'
-PATH = pathlib.Path(__file__).parent
-DATA_PATH = PATH.joinpath("data").resolve()
+debounce.init_app(app.server)
+# The custom Sankey groups the accidents by category: its results also depend on the version of the
+# mapping rules
+category_job_manager = jobs.create_manager(
+    ingest.CACHE_PATH.joinpath("jobs"), ingest.SOURCE_PATH,
+    [lambda: str(mappings.current().version)]
+)
 
-def load_data() :
+def prep_data(data, backend, aggregates=None) :
+    """
+    Prepares data for different figures by aggregating it with the query backend,
+    or by reshaping the aggregates merged during a parallel preprocessing.
+
+    Args:
+        data (pd.DataFrame): A DataFrame containing the processed traffic accident data.
+        backend (backends.PandasBackend | backends.DuckDBBackend): The query backend.
+        aggregates (partitions.Aggregates, optional): The aggregates of the data, as returned by
+            `ingest.load`.
+
+    Returns:
+        tuple: A tuple containing four DataFrames:
+               - `data_fig_1`: data for fig 1.
+               - `data_fig_2`: hourly counts for fig 2, over all the dates.
+               - `data_fig_3`: Sankey counts for fig 3.
+               - `data_fig_4`: data for fig 4.
+    """
+    if aggregates is not None:
+        return (aggregates.seasonal_accidents(), aggregates.hourly_counts(),
+                aggregates.sankey_counts(),
+                preprocess.figure_4_table(aggregates.injury_sums_by_cause()))
+    data_fig_1 = backend.seasonal_accidents()
+    data_fig_2 = backend.hourly_counts(data['crash_date'].min(), data['crash_date'].max(),
+                                       DAY_ORDER)
+    data_fig_3 = backend.sankey_counts()
+    data_fig_4 = preprocess.figure_4_table(backend.injury_sums_by_cause())
+    return data_fig_1, data_fig_2, data_fig_3, data_fig_4
+
+def prep_drilldown(backend) :
     """
-    Loads the traffic accident data from a CSV file, processes it, and returns the cleaned DataFrame.
+    Aggregates the accidents per category and raw value once, for the drill-down of figures 3 and 4.
+
+    Args:
+        backend (backends.PandasBackend | backends.DuckDBBackend): The query backend.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the processed traffic accident data.
+        tuple: The expansions of the categories of figure 3 and of the causes of figure 4,
+               as returned by `drilldown.sankey_expansions` and `drilldown.injury_expansions`.
     """
-    df = pd.read_csv(DATA_PATH.joinpath("traffic_accidents.csv"))
-    data = preprocess.convert_types(df)
-    data = preprocess.add_season(data)
-    data = preprocess.map_categories(data)
-    return data
+    return (prep_sankey_drilldown(backend),
+            drilldown.injury_expansions(backend.injury_sums_by_raw_cause()))
 
-def prep_data(data) :
+def prep_sankey_drilldown(backend) :
     """
-    Prepares data for different figures by processing and aggregating it.
+    Aggregates the accidents per category and raw value of the dimensions of figure 3, for its
+    drill-down.
 
     Args:
-        data (pd.DataFrame): A DataFrame containing the processed traffic accident data.
+        backend (backends.PandasBackend | backends.DuckDBBackend): The query backend.
 
     Returns:
-        tuple: A tuple containing four DataFrames:
-               - `data_fig_1`: data for fig 1.
-               - `data`: data for fig 2.
-               - `data`: data for fig 3.
-               - `data_fig_4`: data for fig 4.
+        dict: The expansions of the categories of figure 3, as returned by
+        `drilldown.sankey_expansions`.
     """
-    data_fig_1 = preprocess.prepare_seasonal_accidents(data)
-    data_fig_4 = preprocess.prepare_figure_4(data)
-    return data_fig_1, data, data, data_fig_4
+    raw_columns = [RAW_COLUMNS[dimension] for dimension in SANKEY_DIMENSIONS]
+    return drilldown.sankey_expansions(backend.sankey_counts(SANKEY_DIMENSIONS + raw_columns))
+
+# Everything depending on the category columns, replaced in a single assignment when the mapping
+# rules change, so that a callback reading it once never mixes aggregates of two versions
+CategoryState = collections.namedtuple('CategoryState', [
+    'data', 'backend', 'data_fig_3', 'data_fig_4', 'sankey_links', 'sankey_drilldown',
+    'injury_links', 'injury_drilldown', 'fig3', 'injury_figures', 'layout'])
 
-def init_figure(data_fig_1, data_fig_2, data_fig_3, data_fig_4):
+def category_state(data, backend, data_fig_3, data_fig_4, sankey_drilldown, injury_drilldown) :
     """
-    Initializes and generates multiple figures (1 to 4) using provided data for each figure.
+    Builds the state depending on the category columns, from their aggregates.
 
     Args:
-        data_fig_1 (pd.DataFrame): Data for figure 1.
-        data_fig_2 (pd.DataFrame): Data for figure 2.
-        data_fig_3 (pd.DataFrame): Data for figure 3.
-        data_fig_4 (pd.DataFrame): Data for figure 4.
+        data (pd.DataFrame): The processed traffic accident data.
+        backend (backends.PandasBackend | backends.DuckDBBackend): The query backend of the data.
+        data_fig_3 (pd.DataFrame): The counts of figure 3.
+        data_fig_4 (pd.DataFrame): The table of figure 4.
+        sankey_drilldown (dict): The expansions of the categories of figure 3.
+        injury_drilldown (dict): The expansions of the causes of figure 4.
 
     Returns:
-        tuple: A tuple containing five Plotly figures:
+        CategoryState: The state, whose figures and layout are only drawn when first requested.
+    """
+    fig3 = functools.lru_cache(maxsize=None)(functools.partial(figure_3.draw_counts, data_fig_3))
+    return CategoryState(
+        data=data,
+        backend=backend,
+        data_fig_3=data_fig_3,
+        data_fig_4=data_fig_4,
+        sankey_links=figure_3.link_table(data_fig_3),
+        sankey_drilldown=sankey_drilldown,
+        injury_links=figure_4.sankey_links(data_fig_4),
+        injury_drilldown=injury_drilldown,
+        fig3=fig3,
+        injury_figures=functools.lru_cache(maxsize=None)(
+            functools.partial(injury_figures, data_fig_4, injury_drilldown)),
+        layout=functools.lru_cache(maxsize=None)(functools.partial(page_layout, fig3)),
+    )
+
+def reload_categories(previous, rules):
+    """
+    Applies new mapping rules while the app runs, called by `mappings.refresh`.
+
+    Only the category columns whose rules changed are computed again, from the codes of their raw
+    values, and only the aggregates depending on them are rebuilt: figures 1, 2 and 5 never are.
+    The new columns and aggregates are built on a copy of the data, then replace the current
+    state at once, so the requests in progress keep reading the previous one. The background
+    jobs depending on the categories are cached under the version of the rules, so their old
+    results are not reused.
+
+    Args:
+        previous (mappings.MappingRules): The rules in use until now.
+        rules (mappings.MappingRules): The new rules.
+    """
+    global state, category_codes
+    current = state
+    changed = rules.changed_dimensions(previous)
+    if not changed and rules.colors == previous.colors \
+            and rules.injury_colors == previous.injury_colors:
+        return
+
+    data, backend = current.data, current.backend
+    if changed:
+        if category_codes is None:
+            category_codes = mappings.CategoryCodes(data)
+        data = category_codes.apply(data.copy(), rules, changed)
+        backend = backends.create_backend(BACKEND, data, ingest.STORE_PATH)
+
+    data_fig_3, sankey_drilldown = current.data_fig_3, current.sankey_drilldown
+    if set(changed) & set(SANKEY_DIMENSIONS):
+        data_fig_3 = backend.sankey_counts()
+        sankey_drilldown = prep_sankey_drilldown(backend)
+
+    data_fig_4, injury_drilldown = current.data_fig_4, current.injury_drilldown
+    if 'cause_category' in changed:
+        data_fig_4 = preprocess.figure_4_table(backend.injury_sums_by_cause())
+        injury_drilldown = drilldown.injury_expansions(backend.injury_sums_by_raw_cause())
+
+    state = category_state(data, backend, data_fig_3, data_fig_4, sankey_drilldown,
+                           injury_drilldown)
+
+def empty_figure(title):
+    """
+    Creates an empty figure displaying a message, used when there is nothing to draw.
+
+    Args:
+        title (str): The title of the figure, explaining what to do.
+
+    Returns:
+        go.Figure: The empty figure.
+    """
+    fig = go.Figure()
+    fig.update_layout(
+        title=title,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        annotations=[dict(
+            text="Aucune donnée à afficher",
+            xref="paper", yref="paper",
+            showarrow=False,
+            font=dict(size=20)
+        )]
+    )
+    return fig
+
+@functools.lru_cache(maxsize=None)
+def init_figure():
+    """
+    Initializes and generates the figures 1 and 2 displayed by the layout, once, when the page is
+    first served. They do not depend on the mapping rules: the Sankey diagram of figure 3 is drawn
+    once per state, and the figures of section 4 when first requested, by `injury_figures`.
+
+    Returns:
+        tuple: A tuple containing two Plotly figures:
                - `figure1`: A bar plot (figure 1).
                - `figure2`: A radar chart (figure 2).
-               - `figure3`: A Sankey diagram (figure 3).
-               - `figure4`: A sunburst chart (figure 4).
-               - `figure4_alt`: A Sankey diagram (alternative representation for figure 4).
     """
-    figure1 = figure_1.init_figure()
-    figure1 = figure_1.draw(figure1, data_fig_1)
+    figure1 = figure_1.draw(data_fig_1, anomalies=trends.anomalies())
+
+    figure2 = figure_2.draw_counts(data_fig_2)
+    return figure1, figure2
+
+def page_layout(figure3):
+    """
+    Builds the layout of the page once per state, when it is first served.
+
+    Args:
+        figure3 (Callable[[], go.Figure]): Draws the Sankey diagram of figure 3 of the state.
+
+    Returns:
+        html.Div: The layout of the app, as returned by `init_app_layout`.
+    """
+    figure1, figure2 = init_figure()
+    return init_app_layout(figure1, figure2, figure3(), trends)
+
+def serve_layout():
+    """
+    Serves the layout of the current state, so that the page reflects the latest mapping rules.
+
+    Returns:
+        html.Div: The layout of the app.
+    """
+    return state.layout()
 
-    figure2 = figure_2.draw(data_fig_2)
+def injury_figures(data_fig_4, injury_drilldown):
+    """
+    Draws the two figures of section 4, once per state, when the injury graph is first displayed.
 
-    figure3 = figure_3.draw(data_fig_3)
+    Args:
+        data_fig_4 (pd.DataFrame): The table of figure 4.
+        injury_drilldown (dict): The expansions of the causes of figure 4.
 
-    figure4 = figure_4.generate_sunburst_figure_4(data_fig_4)
+    Returns:
+        tuple: A tuple containing two Plotly figures:
+               - `figure4`: A sunburst chart (figure 4).
+               - `figure4_alt`: A Sankey diagram (alternative representation for figure 4).
+    """
+    figure4 = figure_4.generate_sunburst_figure_4(data_fig_4, injury_drilldown)
     figure4_alt = figure_4.generate_sankey_figure_4(data_fig_4)
-    return figure1, figure2, figure3, figure4, figure4_alt
+    return figure4, figure4_alt
+
 
+@functools.lru_cache(maxsize=None)
+def init_map():
+    """
+    Bins the accident locations and finds the view of the density map (figure 5) over the area
+    of most of the accidents, once, when the map is first displayed.
 
-def init_app_layout(figure1, figure2, figure3):
+    Returns:
+        Tuple[density.BinPyramid, dict, float]: The bins of the accident locations, and the
+        center and zoom level of the map before any move.
+    """
+    import density  # pylint: disable=import-outside-toplevel
+    import figure_5  # pylint: disable=import-outside-toplevel
+    pyramid = density.BinPyramid()
+    pyramid.append(data)
+    located = data.loc[(data['latitude'] != 0) | (data['longitude'] != 0),
+                       ['longitude', 'latitude']]
+    low, high = located.quantile(0.01), located.quantile(0.99)
+    center, zoom = density.fit_view(
+        (low['longitude'], low['latitude'], high['longitude'], high['latitude']),
+        figure_5.MAP_WIDTH, figure_5.MAP_HEIGHT)
+    return pyramid, center, zoom
+
+def init_app_layout(figure1, figure2, figure3, trends):
     """
     Initializes the layout for the app with various sections and interactive html components.
 
@@ -89,6 +303,7 @@ def init_app_layout(figure1, figure2, figure3):
         figure1 (Figure): The first Plotly figure, bar plot.
         figure2 (Figure): The second Plotly figure, radar chart.
         figure3 (Figure): The third Plotly figure, sankey diagram.
+        trends (analytics.Trends): The trends of the accidents, quoted in the texts.
 
     Returns:
         html.Div: The layout of the app as a HTML Div component, containing multiple sections
@@ -130,14 +345,30 @@ def init_app_layout(figure1, figure2, figure3):
                                 count=1,
                                 marks={year: str(year) for year in range(2018, 2025)},
                                 value=[2018, 2024],
+                                updatemode='mouseup',
                                 allowCross=False,
                                 tooltip={"placement": "bottom", "always_visible": True},
                                 className='slider-style'
                             ), 
+                            dcc.RadioItems(
+                                id='resolution-radio',
+                                options=[
+                                    {'label': 'Par saison', 'value': 'season'},
+                                    {'label': 'Par mois', 'value': 'month'},
+                                    {'label': 'Par semaine', 'value': 'week'},
+                                    {'label': 'Par jour', 'value': 'day'},
+                                ],
+                                value='season',
+                                labelStyle={'display': 'inline-block', 'margin-right': '10px'}
+                            ),
                             html.Div(className="title-season", id="dynamic-title"),  
                             html.Div(style={'display': 'flex', 'gap': '20px', 'alignItems': 'center', 'flexWrap': 'wrap'}, children=[
                                 html.Div(style={'flex': '1'}, children=[
-                                    dcc.Graph(id='figure1', figure=figure1, config={'staticPlot': False})
+                                    dcc.Graph(id='figure1', figure=figure1,
+                                              config={'staticPlot': False}),
+                                    # Selected seasons of figure 1, sent back instead of the
+                                    # figure itself
+                                    dcc.Store(id='figure1-state', data={'seasons': SEASON_ORDER})
                                 ]),
                                 html.Div(style={'minWidth': '200px'}, children=[
                                     html.Div("Sélectionner des saisons particulières", className="button-selector"),
@@ -146,14 +377,8 @@ def init_app_layout(figure1, figure2, figure3):
                                     ])
                                 ])
                             ]), 
-                            html.P(
-                                "Entre 2018 et 2024, le nombre total d’accidents de la route reste étonnamment stable d’une année à l’autre, se situant autour des 25 000 cas. Mais derrière cette régularité apparente, les saisons racontent une autre histoire. En 2020, la pandémie de COVID-19 a provoqué une chute historique : au printemps, les accidents tombent à 4308, et l’été, pourtant habituellement critique, n’en compte que 6345 — un effet direct des confinements et de la réduction massive des déplacements.",
-                                className="paragraph-style"
-                            ),
-                            html.P(
-                                "Dès l’été 2021, le relâchement post-confinement provoque un effet rebond spectaculaire, avec 7242 accidents. Depuis, les saisons estivales et automnales restent les plus accidentogènes, tandis que l’hiver, chaque année, demeure la plus « calme ». La stabilité annuelle masque ainsi de fortes variations saisonnières, reflets de nos habitudes, de nos libertés retrouvées… et parfois de nos excès.",
-                                className="paragraph-style"
-                            ),
+                            *[html.P(text, className="paragraph-style")
+                              for text in narrative.seasonal_paragraphs(trends)],
 
                         ]),
                         html.Section(id="section2", className="content-section", children=[
@@ -176,12 +401,19 @@ def init_app_layout(figure1, figure2, figure3):
 
                             dcc.DatePickerRange(
                                 id='date-picker-range',
-                                start_date=(data_fig_2['crash_date'].min().date()),
-                                end_date=data_fig_2['crash_date'].max().date(),
+                                start_date=(data['crash_date'].min().date()),
+                                end_date=data['crash_date'].max().date(),
                                 display_format='DD/MM/YYYY', 
+                                updatemode='bothdates',
                                 style={'margin-top': '10px', 'margin-bottom': '20px', 'display': 'block', 'textAlign': 'center'}
 
                             ),                    
+                            # Exact counts of figure 2, computed in the background when it
+                            # displays estimates
+                            dcc.Store(id='radar-exact'),
+                            # Selection of figure 2 drawn from estimates, whose exact counts are
+                            # computed in the background
+                            dcc.Store(id='radar-pending'),
                             dcc.Graph(
                                 figure=figure2,
                                 id='radar-graph',
@@ -195,32 +427,40 @@ def init_app_layout(figure1, figure2, figure3):
                                 "C'est une réalité que peu de conducteurs réalisent au quotidien : certains moments sont bien plus accidentogènes que d'autres. En regardant de près les données d'accidents heure par heure, un schéma se dessine et il est loin d'être anodin.",
                                 className="paragraph-style"
                             ),
+                            *[html.P(text, className="paragraph-style")
+                              for text in narrative.hourly_paragraphs(trends)],
                             html.P(
-                                "En semaine, du lundi au jeudi, les journées suivent un rythme presque chorégraphique. Deux pics se détachent nettement : un premier entre 7h et 9h du matin, l'autre entre 16h et 18h. Sans surprise, ces créneaux coïncident avec les allers-retours domicile-travail, ces moments où les routes débordent de stress, de fatigue et... de distractions.",
-                                className="paragraph-style"
-                            ),
-                            html.P(
-                                "Mais le vendredi change la donne. Avec 34 458 accidents recensés, il dépasse largement les autres jours. Pourquoi ? Peut-être parce qu'on est déjà tourné vers le week-end, moins concentré, plus pressé de rentrer ou de partir. Les comportements changent, et les routes en font les frais.",
-                                className="paragraph-style"
-                            ),
-                            html.P(
-                                "Le week-end, justement, affiche un tout autre visage. Fini le rythme métro-boulot-dodo. Les pics d'accidents se déplacent, s'étalent sur la journée et prennent d'assaut la soirée. Le samedi, les accidents grimpent en fin d'après-midi et en soirée, suivant le tempo des sorties et des loisirs.",
-                                className="paragraph-style"
-                            ),
-                            html.P(
-                                "Mais c'est le dimanche à 2h du matin qui interpelle le plus : un pic inattendu, inquiétant. Un moment où la majorité dort... sauf ceux qui rentrent de soirée. Ce rebond nocturne traduit sans doute les conséquences d'un samedi soir trop arrosé ou d'un retour tardif, souvent dans des conditions loin d'être idéales.",
+                                "Au final, cette plongée dans les chiffres nous rappelle une chose : chaque moment sur la route n'a pas le même niveau de risque. Et parfois, le danger se cache là où on ne l'attend pas, au cœur même de nos habitudes.",
                                 className="paragraph-style"
                             ),
+                        ]),
+
+                        html.Section(id="section-map", className="content-section", children=[
+                            html.H3("Là où la route frappe"),
                             html.P(
-                                "Au final, cette plongée dans les chiffres nous rappelle une chose : chaque moment sur la route n'a pas le même niveau de risque. Et parfois, le danger se cache là où on ne l'attend pas, au cœur même de nos habitudes.",
-                                className="paragraph-style"
+                                "Les accidents ne se répartissent pas au hasard dans la ville. "
+                                "La carte suit les filtres choisis plus haut : les années et les "
+                                "saisons de la première visualisation, et les jours de la semaine "
+                                "de la deuxième. Zoomez pour descendre jusqu’à l’échelle des rues.",
+                                className="paragraph-style"),
+                            # Drawn by `update_map` when the page loads
+                            dcc.Graph(
+                                id='map-graph',
+                                config={
+                                    'displayModeBar': False,
+                                    'scrollZoom': True,
+                                }
                             ),
                         ]),
 
                         html.Section(id="section3", className="content-section", children=[
                             html.H3("Quand les éléments se déchaînent"),
                             html.P("Pluie, brouillard… le climat rend certaines routes plus dangereuses. Le Sankey met en lumière les combinaisons de risques.", className="paragraph-style"),
-                            dcc.Graph(figure=figure3, config={'staticPlot': True}),
+                            html.Div("Cliquez sur une catégorie pour afficher les valeurs "
+                                     "détaillées qu’elle regroupe, et sur une valeur détaillée "
+                                     "pour revenir.", className="button-selector"),
+                            dcc.Graph(id='sankey-graph', figure=figure3,
+                                      config={'staticPlot': False}),
                             html.P(
                                 "Ce diagramme de Sankey illustre les liens entre les causes d’accidents, les conditions météorologiques et les types de routes. On observe que la conduite imprudente est la cause la plus fréquente, suivie des infractions et des distractions du conducteur. De manière surprenante, la majorité des accidents se produisent par temps clair, ce qui suggère que les comportements à risque sont plus déterminants que les conditions climatiques elles-mêmes. Les intersections et routes divisées sont les lieux les plus concernés, ce qui reflète leur complexité et leur dangerosité.",
                                 className="paragraph-style"
@@ -229,6 +469,37 @@ def init_app_layout(figure1, figure2, figure3):
                                 "Ce graphique met en évidence l’interdépendance des facteurs dans la survenue des accidents. Il souligne que les causes humaines restent dominantes, même en l’absence de conditions météorologiques défavorables. Il montre également que certains environnements (comme les routes spéciales ou en mauvais temps) présentent une vulnérabilité particulière. En résumé, ce Sankey permet de visualiser les combinaisons les plus à risque, et constitue un outil pertinent pour cibler les actions de prévention routière.",
                                 className="paragraph-style"
                             ),
+                            html.Div("Analyse personnalisée : choisissez les années et les "
+                                     "dimensions à croiser.", className="button-selector"),
+                            dcc.RangeSlider(
+                                id='custom-year-slider',
+                                min=2018,
+                                max=2024,
+                                step=1,
+                                marks={year: str(year) for year in range(2018, 2025)},
+                                value=[2018, 2024],
+                                allowCross=False,
+                                className='slider-style'
+                            ),
+                            dcc.Dropdown(
+                                id='custom-dimensions',
+                                options=[{'label': label, 'value': dimension}
+                                         for dimension, label in DIMENSION_LABELS.items()],
+                                value=SANKEY_DIMENSIONS,
+                                multi=True,
+                            ),
+                            html.Div(style={'display': 'flex', 'gap': '10px',
+                                            'alignItems': 'center', 'marginTop': '10px'},
+                                     children=[
+                                html.Button("Lancer l'analyse", id='custom-run',
+                                            className="button-season selected"),
+                                html.Button("Annuler", id='custom-cancel',
+                                            className="button-season not-select", disabled=True),
+                                html.Progress(id='custom-progress', value='0', max='1',
+                                              style={'flex': '1'}),
+                            ]),
+                            dcc.Graph(id='custom-sankey', figure=empty_figure(
+                                "Lancez l'analyse pour afficher le diagramme.")),
                         ]),
 
                         html.Section(id="section4", className="content-section", children=[
@@ -246,7 +517,7 @@ def init_app_layout(figure1, figure2, figure3):
                                 ],
                                 className='custom-tabs'
                             ),
-                            dcc.Graph(id='injury-graph', config={'staticPlot': True}),
+                            dcc.Graph(id='injury-graph', config={'staticPlot': False}),
                             html.Div(id="injury-description")
                         ]),]
                 )
@@ -254,116 +525,116 @@ def init_app_layout(figure1, figure2, figure3):
         )
 ])
 
+# Periods of figure 1 named in its title, for each resolution
+RESOLUTION_TITLES = {'season': 'saison', 'month': 'mois', 'week': 'semaine', 'day': 'jour'}
+
 @app.callback(
     Output('dynamic-title', 'children'),
-    Input('year-slider', 'value')
+    [Input('year-slider', 'value'),
+     Input('resolution-radio', 'value')]
 )
-def update_dynamic_title(year_range):
+def update_dynamic_title(year_range, resolution):
     """
-    Updates the title displayed above the first graph based on the selected year range.
+    Updates the title displayed above the first graph based on the selected year range and
+    resolution.
 
     Args:
         year_range (List[int]): A list containing the start and end year selected via the RangeSlider.
+        resolution (str): The resolution of figure 1: 'season', 'month', 'week' or 'day'.
 
     Returns:
         str: A formatted string indicating the selected year(s) for display in the title.
     """
     year_start, year_end = year_range
+    period = RESOLUTION_TITLES[resolution]
     if year_start == year_end:
-        return f"Nombre d'accidents par saison ({year_start})"
+        return f"Nombre d'accidents par {period} ({year_start})"
     else:
-        return f"Nombre d'accidents par saison ({year_start}–{year_end})"
+        return f"Nombre d'accidents par {period} ({year_start}–{year_end})"
 
 @app.callback(
     [Output('button-Hiver', 'className'),
      Output('button-Printemps', 'className'),
      Output('button-Été', 'className'),
      Output('button-Automne', 'className'),
-     Output('figure1', 'figure')],
+     Output('figure1', 'figure'),
+     Output('figure1-state', 'data')],
     [Input('year-slider', 'value'),
+     Input('resolution-radio', 'value'),
      Input('button-Hiver', 'n_clicks'),
      Input('button-Printemps', 'n_clicks'),
      Input('button-Été', 'n_clicks'),
      Input('button-Automne', 'n_clicks')],
-    [State('button-Hiver', 'className'),
-     State('button-Printemps', 'className'),
-     State('button-Été', 'className'),
-     State('button-Automne', 'className'),
-     State('figure1', 'figure')],
+    State('figure1-state', 'data'),
 )
-def update_figure_1(year_range, winterClick, springClick, summerClick, autumnClick,
-                        winterClass, springClass, summerClass, autumnClass, figure):
+def update_figure_1(year_range, resolution, winterClick, springClick, summerClick, autumnClick,
+                    state):
     """
     Updates the seasonal selection buttons and the associated figure (figure1)
-    based on the selected year range and the user's button interactions.
+    based on the selected year range, resolution and the user's button interactions.
+
+    This function toggles the clicked season in the selection, sets the class
+    of each seasonal button accordingly, and redraws the figure using
+    data filtered by the selected seasons and years. The seasons of each year
+    are drawn from `data_fig_1`; the months, weeks and days from the rollup
+    tables, so the work depends on the number of bars, not of accidents.
 
-    This function toggles the class of each seasonal button when clicked,
-    determines which seasons are selected, and redraws the figure using
-    data filtered by the selected seasons and years.
+    The browser only sends back the small state of the figure (the selected seasons),
+    not the figure itself.
 
     Args:
         year_range (List[int]): Start and end year from the range slider.
+        resolution (str): 'season', 'month', 'week' or 'day'.
         winterClick (int): Winter button.
         springClick (int): Spring button.
         summerClick (int): Summer button.
         fallClick (int): Fall button.
-        winterClass (str): Current CSS class for the Winter button.
-        springClass (str): Current CSS class for the Spring button.
-        summerClass (str): Current CSS class for the Summer button.
-        fallClass (str): Current CSS class for the Fall button.
-        figure (dict): Current Plotly figure (figure1) to be updated.
+        state (dict): The seasons selected until now ('seasons').
 
     Returns:
-        Tuple[str, str, str, str, go.Figure]: Updated class names for each seasonal button
-        and the updated Plotly figure reflecting the new seasonal and year filters.
+        Tuple[str, str, str, str, dict, dict]: Updated class names for each seasonal button,
+        the updated Plotly figure reflecting the new seasonal and year filters, and its new state.
     """
     triggered_id = ctx.triggered_id
+    # Only slider moves and resolution changes can be dropped: a season click toggles a season the
+    # next request depends on
+    droppable = triggered_id in ('year-slider', 'resolution-radio')
+    if debounce.is_superseded('update_figure_1', droppable=droppable):
+        raise PreventUpdate
     start_year, end_year = year_range
 
-    def toggle_class(current_class):
-        return "button-season selected" if "selected" not in current_class else "button-season not-select"
-
-    class_dict = {
-        'Hiver': toggle_class(winterClass) if triggered_id == 'button-Hiver' else winterClass,
-        'Printemps': toggle_class(springClass) if triggered_id == 'button-Printemps' else springClass,
-        'Été': toggle_class(summerClass) if triggered_id == 'button-Été' else summerClass,
-        'Automne': toggle_class(autumnClass) if triggered_id == 'button-Automne' else autumnClass,
-    }
-    selected_seasons = [season for season, c in class_dict.items() if 'selected' in c]
+    selected = set(state['seasons'])
+    if triggered_id and triggered_id.startswith('button-'):
+        selected ^= {triggered_id[len('button-'):]}
+    selected_seasons = [season for season in SEASON_ORDER if season in selected]
     
-    fig = go.Figure()
-
     if len(selected_seasons) == 0:
-        fig.update_layout(
-            title='Veuillez sélectionner au moins une saison.',
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            annotations=[dict(
-                text="Aucune donnée à afficher",
-                xref="paper", yref="paper",
-                showarrow=False,
-                font=dict(size=20)
-            )]
-        )
+        fig = empty_figure('Veuillez sélectionner au moins une saison.')
     
     else :
-        fig = figure_1.draw(figure, data_fig_1, start_year, end_year, selected_seasons)
-
-    return (
-        class_dict['Hiver'],
-        class_dict['Printemps'],
-        class_dict['Été'],
-        class_dict['Automne'],
-        fig
-    )
+        if resolution == 'season':
+            template = figure_1.template()
+            changes = figure_1.updates(data_fig_1, start_year, end_year, selected_seasons,
+                                       trends.anomalies())
+        else:
+            template = figure_1.series_template()
+            changes = figure_1.series_updates(
+                rollup_tables.between(resolution, start_year, end_year),
+                rollup_tables.table('year'), resolution, selected_seasons)
+        fig = templates.apply(template, changes)
+
+    classes = ["button-season selected" if season in selected else "button-season not-select"
+               for season in SEASON_ORDER]
+    return (*classes, fig, {'seasons': selected_seasons})
 
 @app.callback(
     Output('radar-graph', 'figure'),
     [Input('day-checklist', 'value'),
      Input('date-picker-range', 'start_date'),
-     Input('date-picker-range', 'end_date')]
+     Input('date-picker-range', 'end_date'),
+     Input('radar-exact', 'data')]
 )
-def update_figure_2(selected_days, start_date, end_date):
+def update_figure_2(selected_days, start_date, end_date, exact):
     """
     Updates the radar chart (figure 2) based on the selected days of the week
     and a specified date range.
@@ -371,55 +642,250 @@ def update_figure_2(selected_days, start_date, end_date):
     If any required input is missing (no day selected or invalid date range),
     an empty figure with a message is returned.
 
+    With the approximate mode (`DASHBOARD_SAMPLE_SIZE`), the chart of a selection with more
+    than `EXACT_ROWS` accidents is first drawn from estimated counts, then redrawn when
+    `refine_figure_2` stores the exact ones. Smaller selections are counted exactly at once.
+
     Args:
         selected_days (Optional[List[str]]): List of selected days from the checklist.
         start_date (Optional[str]): Start date from the date range picker (ISO format).
         end_date (Optional[str]): End date from the date range picker (ISO format).
+        exact (Optional[dict]): The exact counts computed in the background, with the selection
+            they answer.
 
     Returns:
-        go.Figure: A Plotly radar figure showing crash statistics for the selected days and dates,
-                   or an empty figure with an instructional message if inputs are invalid.
+        go.Figure | dict: A Plotly radar figure showing crash statistics for the selected days
+                   and dates, or an empty figure with an instructional message if inputs are
+                   invalid.
     """
     if not selected_days or not start_date or not end_date:
-        fig = go.Figure()
-        fig.update_layout(
-            title='Veuillez sélectionner au moins un jour et un intervalle de dates.',
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            annotations=[dict(
-                text="Aucune donnée à afficher",
-                xref="paper", yref="paper",
-                showarrow=False,
-                font=dict(size=20)
-            )]
-        )
-        return fig
+        return empty_figure('Veuillez sélectionner au moins un jour et un intervalle de dates.')
+
+    refined = ctx.triggered_id == 'radar-exact'
+    if refined and (exact is None or exact['selection'] != [selected_days, start_date, end_date]):
+        raise PreventUpdate
+    if debounce.is_superseded('update_figure_2', droppable=not refined):
+        raise PreventUpdate
+
+    if refined:
+        changes = figure_2.updates(pd.DataFrame(**exact['counts']), selected_days)
+    elif needs_estimate(start_date, end_date):
+        counts, errors, total_errors = sample.hourly_counts(start_date, end_date, selected_days)
+        changes = figure_2.updates(counts, selected_days, errors, total_errors)
+    else:
+        counts = state.backend.hourly_counts(start_date, end_date, selected_days)
+        changes = figure_2.updates(counts, selected_days)
+    return templates.apply(figure_2.template(), changes)
 
-    mask = (data_fig_2['crash_date'] >= pd.to_datetime(start_date)) & (data_fig_2['crash_date'] <= pd.to_datetime(end_date))
-    filtered_df = data_fig_2.loc[mask]
+def needs_estimate(start_date, end_date):
+    """
+    Tells whether figure 2 is drawn from estimates for a date range: with the approximate mode,
+    when the months of the range hold more than `EXACT_ROWS` accidents, so that the exact
+    query is slow.
+
+    Args:
+        start_date (str): Start date from the date range picker (ISO format).
+        end_date (str): End date from the date range picker (ISO format).
 
-    return figure_2.draw(filtered_df, selected_days)
+    Returns:
+        bool: Whether the counts are estimated, then refined in the background.
+    """
+    return sample is not None and sample.population(start_date, end_date) > EXACT_ROWS
+
+def request_exact_figure_2(selected_days, start_date, end_date):
+    """
+    Stores the selection of figure 2 whose exact counts must be computed in the background,
+    only when `update_figure_2` draws it from estimates, so that no background job is started
+    for the selections it counts exactly. Only registered with the approximate mode.
+
+    Args:
+        selected_days (Optional[List[str]]): List of selected days from the checklist.
+        start_date (Optional[str]): Start date from the date range picker (ISO format).
+        end_date (Optional[str]): End date from the date range picker (ISO format).
+
+    Returns:
+        list: The selected days, start date and end date.
+    """
+    if not selected_days or not start_date or not end_date:
+        raise PreventUpdate
+    if not needs_estimate(start_date, end_date):
+        raise PreventUpdate
+    return [selected_days, start_date, end_date]
+
+def refine_figure_2(selection):
+    """
+    Counts exactly the accidents of figure 2 in the background, to replace the estimates
+    drawn by `update_figure_2`. Only registered with the approximate mode.
+
+    Args:
+        selection (Optional[list]): The selected days, start date and end date, as stored by
+            `request_exact_figure_2`.
+
+    Returns:
+        dict: The selection and its exact counts, as returned by `pd.DataFrame.to_dict('split')`.
+    """
+    if selection is None:
+        raise PreventUpdate
+    counts = state.backend.hourly_counts(selection[1], selection[2], selection[0])
+    return {'selection': selection, 'counts': counts.to_dict('split')}
+
+if SAMPLE_SIZE:
+    app.callback(
+        Output('radar-pending', 'data'),
+        [Input('day-checklist', 'value'),
+         Input('date-picker-range', 'start_date'),
+         Input('date-picker-range', 'end_date')],
+    )(request_exact_figure_2)
+    app.callback(
+        Output('radar-exact', 'data'),
+        Input('radar-pending', 'data'),
+        background=True,
+    )(refine_figure_2)
+
+@app.callback(
+    Output('custom-sankey', 'figure'),
+    Input('custom-run', 'n_clicks'),
+    [State('custom-year-slider', 'value'),
+     State('custom-dimensions', 'value')],
+    background=True,
+    progress=[Output('custom-progress', 'value'), Output('custom-progress', 'max')],
+    running=[(Output('custom-run', 'disabled'), True, False),
+             (Output('custom-cancel', 'disabled'), False, True)],
+    cancel=[Input('custom-cancel', 'n_clicks')],
+    cache_args_to_ignore=[0],
+    manager=category_job_manager,
+    prevent_initial_call=True,
+)
+def update_custom_analysis(set_progress, n_clicks, year_range, dimensions):
+    """
+    Draws a Sankey diagram crossing the selected dimensions over the selected years.
+
+    It runs as a background callback, in a separate process, so the aggregation of the raw
+    data never blocks the threads serving the other callbacks. Results are cached by
+    year range and dimensions. The accidents are counted one year at a time, which is
+    where the time goes, and the progress bar advances after each year.
+
+    Args:
+        set_progress (Callable): Reports the progress of the job to the progress bar.
+        n_clicks (int): The run button, ignored in the cache key.
+        year_range (List[int]): Start and end year of the analysis.
+        dimensions (List[str]): The columns of the Sankey, from left to right.
+
+    Returns:
+        go.Figure: The Sankey diagram, or an empty figure if less than two dimensions are selected.
+    """
+    if not dimensions or len(dimensions) < 2:
+        return empty_figure('Veuillez sélectionner au moins deux dimensions.')
+
+    years = range(year_range[0], year_range[1] + 1)
+    # The last step is the drawing of the diagram
+    n_steps = str(len(years) + 1)
+    set_progress(('0', n_steps))
+    yearly_counts = []
+    for done, year in enumerate(years, start=1):
+        yearly_counts.append(state.backend.sankey_counts(dimensions, [year, year]))
+        set_progress((str(done), n_steps))
+    # The years are disjoint, so the counts of the range are the sums of the yearly ones
+    counts = pd.concat(yearly_counts, ignore_index=True)
+    counts = counts.groupby(dimensions)['count'].sum().reset_index()
+    return figure_3.draw_counts(counts, dimensions)
+
+@app.callback(
+    Output('map-graph', 'figure'),
+    [Input('map-graph', 'relayoutData'),
+     Input('year-slider', 'value'),
+     Input('day-checklist', 'value')]
+    + [Input(f'button-{season}', 'className') for season in SEASON_ORDER]
+)
+def update_map(relayout_data, year_range, selected_days, *season_classes):
+    """
+    Draws the density map (figure 5) when the page loads, and updates it when it is moved or when
+    the filters of figures 1 and 2 change.
+    Only the cells of the pyramid level matching the zoom, inside the visible area, are sent.
+
+    Args:
+        relayout_data (Optional[dict]): The last move of the map.
+        year_range (List[int]): Start and end year from the range slider of figure 1.
+        selected_days (Optional[List[str]]): The days selected for figure 2.
+        *season_classes (str): The CSS classes of the season buttons of figure 1, in SEASON_ORDER.
+
+    Returns:
+        dict: The density map.
+    """
+    moved = ctx.triggered_id == 'map-graph'
+    if moved and 'mapbox.zoom' not in (relayout_data or {}):
+        raise PreventUpdate
+    if debounce.is_superseded('update_map'):
+        raise PreventUpdate
+    import density  # pylint: disable=import-outside-toplevel
+    import figure_5  # pylint: disable=import-outside-toplevel
+    pyramid, map_center, map_zoom = init_map()
+    seasons = [season for season, c in zip(SEASON_ORDER, season_classes) if 'selected' in c]
+    center, zoom, bounds = figure_5.viewport(relayout_data, map_center, map_zoom)
+    level = density.level_for_zoom(zoom)
+    bins = pyramid.query(level, bounds, year_range, seasons, selected_days or [])
+    return figure_5.draw(bins, zoom, level, center)
+
+@app.callback(
+    Output('sankey-graph', 'figure'),
+    Input('sankey-graph', 'clickData'),
+    prevent_initial_call=True
+)
+def expand_sankey_node(click_data):
+    """
+    Expands the clicked category of figure 3 into its raw values, from the precomputed expansions.
+    Clicking one of the raw values collapses it back.
+
+    Args:
+        click_data (dict): The point clicked in the diagram.
+
+    Returns:
+        go.Figure: The Sankey diagram, with the clicked category expanded.
+    """
+    label = drilldown.clicked_label(click_data)
+    if label is None:
+        raise PreventUpdate
+    current = state
+    if label in current.sankey_drilldown:
+        links, parents = drilldown.expand(current.sankey_links, label, current.sankey_drilldown)
+        return figure_3.draw_links(links, parents)
+    return current.fig3()
 
 @app.callback(
     Output("injury-graph", "figure"),
-    Input("injury-tabs", "value")
+    Input("injury-tabs", "value"),
+    Input("injury-graph", "clickData")
 )
-def switch_injury_graph(selected_tab):
+def switch_injury_graph(selected_tab, click_data):
     """
     Switches the injury graph based on the selected tab.
 
-    If the 'sankey' tab is selected, it returns the alternative Sankey diagram.
-    Otherwise, it returns the sunburst diagram figure.
+    If the 'sankey' tab is selected, it returns the alternative Sankey diagram, where clicking a
+    cause expands it into its raw causes. Otherwise, it returns the sunburst diagram figure, which
+    reveals the raw causes by itself when a cause is clicked.
 
     Args:
         selected_tab (str): The value of the currently selected tab.
+        click_data (dict): The point clicked in the graph.
 
     Returns:
         go.Figure: The corresponding injury figure to display.
     """
-    if selected_tab == 'sankey':
-        return fig4_alt
-    return fig4
+    current = state
+    figure4, figure4_alt = current.injury_figures()
+    clicked = ctx.triggered_id == "injury-graph"
+    if selected_tab != 'sankey':
+        if clicked:
+            # Redrawing the sunburst would undo its zoom on the clicked sector
+            raise PreventUpdate
+        return figure4
+    label = drilldown.clicked_label(click_data) if clicked else None
+    if clicked and label is None:
+        raise PreventUpdate
+    if label in current.injury_drilldown:
+        links, parents = drilldown.expand(current.injury_links, label, current.injury_drilldown)
+        return figure_4.draw_sankey_links(links, parents)
+    return figure4_alt
 
 @app.callback(
     [Output("injury-title", "children"),
@@ -456,12 +922,32 @@ def update_injury_section(tab_value):
         ]
     return title, paragraphs
 
-data = load_data()
+data, aggregates = ingest.load(INGEST_WORKERS)
+
+backend = backends.create_backend(BACKEND, data, ingest.STORE_PATH)
+
+sample = None
+if SAMPLE_SIZE:
+    import sampling  # pylint: disable=import-outside-toplevel
+    sample = sampling.StratifiedSample(SAMPLE_SIZE)
+    sample.append(data)
+
+data_fig_1, data_fig_2, data_fig_3, data_fig_4 = prep_data(data, backend, aggregates)
+# Raw values of the category columns, factorized when the mapping rules first change
+category_codes = None
+
+trends = analytics.Trends()
+trends.append(data)
+
+rollup_tables = rollups.Rollups()
+rollup_tables.append(data)
 
-data_fig_1, data_fig_2, data_fig_3, data_fig_4 = prep_data(data)
+state = category_state(data, backend, data_fig_3, data_fig_4, *prep_drilldown(backend))
 
-# Call the function to initialize the figures
-fig1, fig2, fig3, fig4, fig4_alt = init_figure(data_fig_1, data_fig_2, data_fig_3, data_fig_4)
+# Set up the app layout, drawn when the page is first served: the callbacks are validated against
+# the same layout without figures, which Dash would otherwise build by calling `serve_layout`
+app.validation_layout = init_app_layout(go.Figure(), go.Figure(), go.Figure(), trends)
+app.layout = serve_layout
 
-# Set up the app layout
-app.layout = init_app_layout(fig1, fig2, fig3)
+# Apply the changes of the mapping file without restarting the app
+mappings.init_app(app.server, reload_categories)
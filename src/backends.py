@@ -0,0 +1,274 @@
+"""
+    Query backends computing the aggregations behind the figures.
+
+    A backend answers the few queries the dashboard needs. The pandas backend
+    runs them in-process on the DataFrame returned by `ingest.load_data`. The
+    DuckDB backend runs them as SQL on the Parquet store written by `store.py`,
+    so the full frame never needs to be scanned by pandas. Its category columns
+    are computed from the raw ones by the current mapping rules, since the store
+    may have been written with older rules. Both return exactly the same
+    DataFrames; the small results are reshaped by the same helpers of
+    `preprocess`.
+"""
+import importlib
+import os
+
+import pandas as pd
+
+import mappings
+import preprocess
+import store
+from const import INJURY_CATEGORIES, RAW_COLUMNS, SANKEY_DIMENSIONS
+
+# Columns that can be used as Sankey dimensions, and so interpolated in SQL
+DIMENSION_COLUMNS = {
+    "cause_category", "weather_category", "trafficway_category", "season", "crash_day_of_week_name",
+    *RAW_COLUMNS.values(),
+}
+
+
+class PandasBackend:
+    """
+    Runs the queries with pandas on the in-memory DataFrame.
+
+    When a store path is given, the date-range queries read only the needed
+    partitions and columns of the Parquet store instead of masking the whole frame.
+    """
+
+    name = "pandas"
+
+    def __init__(self, data, store_path=None):
+        self.data = data
+        self.store_path = store_path if store.available() else None
+
+    def seasonal_accidents(self):
+        """
+        Returns:
+            pd.DataFrame: The number of accidents per year (rows) and season (columns).
+        """
+        return preprocess.prepare_seasonal_accidents(self.data)
+
+    def injury_sums_by_cause(self):
+        """
+        Returns:
+            pd.DataFrame: The number of injuries of each category (columns) per cause category
+                          (rows, sorted, without 'Autre').
+        """
+        df_filtered = self.data[self.data["cause_category"] != 'Autre']
+        return df_filtered.groupby("cause_category")[INJURY_CATEGORIES].sum()
+
+    def injury_sums_by_raw_cause(self):
+        """
+        Returns:
+            pd.DataFrame: The number of injuries of each category (columns) per cause category and
+                          raw cause (rows, sorted, without 'Autre').
+        """
+        df_filtered = self.data[self.data["cause_category"] != 'Autre']
+        columns = ["cause_category", RAW_COLUMNS["cause_category"]]
+        return df_filtered.groupby(columns)[INJURY_CATEGORIES].sum()
+
+    def hourly_counts(self, start_date, end_date, days):
+        """
+        Counts the accidents per day of the week and hour between two dates (both included).
+
+        Args:
+            start_date (str): The first date of the range.
+            end_date (str): The last date of the range.
+            days (List[str]): The names of the days of the week to keep.
+
+        Returns:
+            pd.DataFrame: The counts, as returned by `preprocess.prepare_hourly_counts`.
+        """
+        columns = ['crash_day_of_week_name', 'crash_hour']
+        if self.store_path is not None:
+            filtered_df = store.read_range(self.store_path, columns, start_date, end_date, days)
+        else:
+            mask = ((self.data['crash_date'] >= pd.to_datetime(start_date))
+                    & (self.data['crash_date'] <= pd.to_datetime(end_date))
+                    & self.data['crash_day_of_week_name'].isin(days))
+            filtered_df = self.data.loc[mask, columns]
+        return preprocess.prepare_hourly_counts(filtered_df)
+
+    def sankey_counts(self, dimensions=SANKEY_DIMENSIONS, year_range=None):
+        """
+        Counts the accidents per combination of the given dimensions.
+
+        Args:
+            dimensions (List[str], optional): The columns to group by.
+                Defaults to SANKEY_DIMENSIONS.
+            year_range (List[int], optional): The first and last years to keep.
+                Defaults to all years.
+
+        Returns:
+            pd.DataFrame: One column per dimension and 'count', sorted by the dimensions.
+        """
+        data = self.data
+        if year_range is not None:
+            data = data.loc[data['crash_year'].between(*year_range)]
+        return data.groupby(list(dimensions)).size().reset_index(name="count")
+
+
+class DuckDBBackend:
+    """
+    Runs the queries as SQL with an embedded DuckDB database reading the Parquet store.
+
+    DuckDB only reads the columns and partitions a query needs, and runs it on all
+    the cores. The connection is opened lazily, once per process, so the backend
+    can be created before gunicorn forks its workers.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, store_path):
+        # DuckDB is optional, and only imported when this backend is used
+        try:
+            self._duckdb = importlib.import_module('duckdb')
+        except ImportError as error:
+            raise ImportError("The duckdb backend requires the duckdb package.") from error
+        self.source = (f"read_parquet('{store_path.as_posix()}/**/*.parquet', "
+                       "hive_partitioning = true)")
+        self._connection = None
+        self._pid = None
+
+    def _query(self, sql, parameters=None):
+        """
+        Runs a query in a cursor of the connection of the current process.
+        """
+        if self._pid != os.getpid():
+            self._connection = self._duckdb.connect()
+            self._pid = os.getpid()
+        cursor = self._connection.cursor()
+        try:
+            return cursor.execute(sql, parameters or []).df()
+        finally:
+            cursor.close()
+
+    def _mapped_source(self, dimensions):
+        """
+        Builds the source of a query where the category columns among `dimensions` follow the
+        current mapping rules: each one is looked up from its raw column in a small table of the
+        rules.
+
+        Returns:
+            Tuple[str, list]: The source, and its parameters.
+        """
+        rules = mappings.current()
+        mapped = [dimension for dimension in dict.fromkeys(dimensions)
+                  if dimension in rules.lookups]
+        if not mapped:
+            return self.source, []
+        replaced, joins, parameters = [], [], []
+        for dimension in mapped:
+            lookup = rules.lookups[dimension]
+            replaced.append(f"COALESCE({dimension}_rules.category, "
+                            f"'{mappings.DEFAULT_CATEGORY}') AS {dimension}")
+            values = ", ".join(["(?, ?)"] * len(lookup))
+            joins.append(f"""
+                LEFT JOIN (VALUES {values}) AS {dimension}_rules(raw_value, category)
+                ON accidents.{RAW_COLUMNS[dimension]} = {dimension}_rules.raw_value""")
+            parameters.extend(item for pair in lookup.items() for item in pair)
+        return (f"(SELECT accidents.* REPLACE ({', '.join(replaced)}) "
+                f"FROM {self.source} AS accidents {''.join(joins)})"), parameters
+
+    def seasonal_accidents(self):
+        """
+        See `PandasBackend.seasonal_accidents`.
+        """
+        counts = self._query(f"""
+            SELECT crash_year, season, COUNT(*) AS count
+            FROM {self.source}
+            GROUP BY crash_year, season
+            ORDER BY crash_year, season
+        """)
+        return preprocess.seasonal_table(counts)
+
+    def injury_sums_by_cause(self):
+        """
+        See `PandasBackend.injury_sums_by_cause`.
+        """
+        sums = ", ".join(f"CAST(SUM({injury}) AS BIGINT) AS {injury}"
+                         for injury in INJURY_CATEGORIES)
+        source, parameters = self._mapped_source(["cause_category"])
+        return self._query(f"""
+            SELECT cause_category, {sums}
+            FROM {source}
+            WHERE cause_category != 'Autre'
+            GROUP BY cause_category
+            ORDER BY cause_category
+        """, parameters).set_index("cause_category")
+
+    def injury_sums_by_raw_cause(self):
+        """
+        See `PandasBackend.injury_sums_by_raw_cause`.
+        """
+        columns = ["cause_category", RAW_COLUMNS["cause_category"]]
+        sums = ", ".join(f"CAST(SUM({injury}) AS BIGINT) AS {injury}"
+                         for injury in INJURY_CATEGORIES)
+        source, parameters = self._mapped_source(columns)
+        return self._query(f"""
+            SELECT {", ".join(columns)}, {sums}
+            FROM {source}
+            WHERE cause_category != 'Autre'
+            GROUP BY {", ".join(columns)}
+            ORDER BY {", ".join(columns)}
+        """, parameters).set_index(columns)
+
+    def hourly_counts(self, start_date, end_date, days):
+        """
+        See `PandasBackend.hourly_counts`.
+        """
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        counts = self._query(f"""
+            SELECT crash_day_of_week_name, crash_hour, COUNT(*) AS count
+            FROM {self.source}
+            WHERE crash_date BETWEEN ? AND ?
+              AND year * 12 + month BETWEEN ? AND ?
+              AND list_contains(?, crash_day_of_week_name)
+            GROUP BY crash_day_of_week_name, crash_hour
+        """, [start.to_pydatetime(), end.to_pydatetime(),
+              start.year * 12 + start.month, end.year * 12 + end.month, list(days)])
+        return preprocess.hourly_table(counts)
+
+    def sankey_counts(self, dimensions=SANKEY_DIMENSIONS, year_range=None):
+        """
+        See `PandasBackend.sankey_counts`.
+        """
+        dimensions = list(dimensions)
+        if not set(dimensions) <= DIMENSION_COLUMNS:
+            raise ValueError(f"Unknown dimensions: {set(dimensions) - DIMENSION_COLUMNS}")
+        columns = ", ".join(dimensions)
+        source, parameters = self._mapped_source(dimensions)
+        where = ""
+        if year_range is not None:
+            where = "WHERE crash_year BETWEEN ? AND ?"
+            parameters += list(year_range)
+        return self._query(f"""
+            SELECT {columns}, COUNT(*) AS count
+            FROM {source}
+            {where}
+            GROUP BY {columns}
+            ORDER BY {columns}
+        """, parameters)
+
+
+BACKENDS = {
+    "pandas": lambda data, store_path: PandasBackend(data, store_path),
+    "duckdb": lambda data, store_path: DuckDBBackend(store_path),
+}
+
+
+def create_backend(name, data, store_path):
+    """
+    Creates the query backend with the given name.
+
+    Args:
+        name (str): 'pandas' or 'duckdb'.
+        data (pd.DataFrame): The processed data, used by the pandas backend.
+        store_path (pathlib.Path): The Parquet store, used by the DuckDB backend.
+
+    Returns:
+        PandasBackend | DuckDBBackend: The backend.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend {name!r}, expected one of {sorted(BACKENDS)}.")
+    return BACKENDS[name](data, store_path)
@@ -0,0 +1,94 @@
+"""
+    Benchmark of the query backends on synthetic datasets of increasing size.
+
+    For each size, the synthetic data is preprocessed and saved to a Parquet
+    store, then every query of the dashboard is run on both backends. The
+    script checks that both backends return identical results and prints
+    the median time of each query.
+
+    Usage:
+        python ./src/benchmark_backends.py --rows 100000 1000000 5000000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import backends
+import preprocess
+import store
+import synthetic
+from const import DAY_ORDER
+
+QUERIES = {
+    'seasonal_accidents': lambda b: b.seasonal_accidents(),
+    'injury_sums_by_cause': lambda b: b.injury_sums_by_cause(),
+    'hourly_counts (1 month)': lambda b: b.hourly_counts('2021-06-01', '2021-06-30', DAY_ORDER),
+    'hourly_counts (all)': lambda b: b.hourly_counts('2018-01-01', '2024-12-31', DAY_ORDER[:5]),
+    'sankey_counts': lambda b: b.sankey_counts(),
+    'sankey_counts (2 years)': lambda b: b.sankey_counts(year_range=[2020, 2021]),
+}
+
+
+def prepare(n_rows, path):
+    """
+    Generates, preprocesses and stores `n_rows` synthetic accidents.
+
+    Returns:
+        pd.DataFrame: The processed data.
+    """
+    data = synthetic.generate(n_rows)
+    data = preprocess.convert_types(data)
+    data = preprocess.add_season(data)
+    data = preprocess.map_categories(data)
+    store.write_store(data, path, str(n_rows))
+    return data
+
+
+def timed(query, backend, repeat):
+    """
+    Runs a query `repeat` times.
+
+    Returns:
+        Tuple[pd.DataFrame, float]: The result and the median time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = query(backend)
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the query backends.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory)
+            data = prepare(n_rows, path)
+            candidates = [backends.PandasBackend(data),
+                          backends.PandasBackend(data, path),
+                          backends.DuckDBBackend(path)]
+            print(f"\n{n_rows} rows")
+            print(f"{'query':<28}{'pandas':>10}{'pandas+store':>14}{'duckdb':>10}  identical")
+            for name, query in QUERIES.items():
+                results, times = zip(*(timed(query, backend, args.repeat)
+                                       for backend in candidates))
+                identical = True
+                for result in results[1:]:
+                    try:
+                        pd.testing.assert_frame_equal(results[0], result)
+                    except AssertionError:
+                        identical = False
+                print(f"{name:<28}{times[0]:>10.1f}{times[1]:>14.1f}{times[2]:>10.1f}  {identical}")
+
+
+if __name__ == '__main__':
+    main()
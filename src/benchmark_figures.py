@@ -0,0 +1,97 @@
+"""
+    Benchmark of the figure updates of figures 1 and 2.
+
+    For typical interactions, measures the server CPU time and the response
+    size of:
+        - a full rebuild through validated Plotly objects (`go.Figure`),
+          like the figure modules did before using templates;
+        - a full figure built from the template.
+
+    For the monthly, weekly and daily views of figure 1, also compares the
+    time to compute the update from the rollup tables and from the rows.
+
+    Usage:
+        python ./src/benchmark_figures.py --rows 200000
+"""
+import argparse
+import time
+
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+import equivalence
+import figure_1
+import figure_2
+import preprocess
+import rollups
+import synthetic
+import templates
+
+
+def timed(function, repeat):
+    """
+    Returns the result of `function` and its mean time in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def measure(name, template, changes, repeat):
+    """
+    Prints the time and size of the two ways to send the same update.
+    """
+    full = templates.apply(template, changes)
+    rebuilt, rebuild_ms = timed(lambda: go.Figure(full).to_json(), repeat)
+    serialized, template_ms = timed(lambda: to_json_plotly(templates.apply(template, changes)),
+                                    repeat)
+    print(f"{name:<34}{rebuild_ms:>9.2f}{len(rebuilt):>9}{template_ms:>9.2f}"
+          f"{len(serialized):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the figure updates.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    data = synthetic.generate(args.rows)
+    data = preprocess.convert_types(data)
+    data = preprocess.add_season(data)
+    data = preprocess.map_categories(data)
+    seasonal = preprocess.prepare_seasonal_accidents(data)
+    hourly = preprocess.prepare_hourly_counts(data)
+
+    print(f"{'':<34}{'rebuild':>18}{'template':>18}")
+    print(f"{'update':<34}{'ms':>9}{'bytes':>9}{'ms':>9}{'bytes':>9}")
+    for years, seasons in [((2018, 2024), ['Hiver', 'Printemps', 'Été', 'Automne']),
+                           ((2019, 2022), ['Hiver', 'Été']),
+                           ((2020, 2020), ['Automne'])]:
+        measure(f"figure 1 {years} {len(seasons)} seasons", figure_1.template(),
+                figure_1.updates(seasonal, *years, seasons), args.repeat)
+    for days in [['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+                 ['Friday', 'Saturday', 'Sunday'],
+                 ['Sunday']]:
+        measure(f"figure 2 {len(days)} days", figure_2.template(),
+                figure_2.updates(hourly, days), args.repeat)
+
+    rollup_tables = rollups.Rollups()
+    rollup_tables.append(data)
+    totals = rollup_tables.table('year')
+    for resolution in ['month', 'week', 'day']:
+        measure(f"figure 1 per {resolution}", figure_1.series_template(),
+                figure_1.series_updates(rollup_tables.between(resolution, 2018, 2024), totals,
+                                        resolution),
+                args.repeat)
+
+    print(f"\n{'update of figure 1 from':<34}{'rollup ms':>12}{'rows ms':>12}")
+    for resolution in ['month', 'week', 'day']:
+        _, rollup_ms = timed(lambda: figure_1.series_updates(
+            rollup_tables.between(resolution, 2018, 2024), totals, resolution), args.repeat)
+        _, rows_ms = timed(lambda: figure_1.series_updates(
+            equivalence.rows_table(data, resolution, 2018, 2024), totals, resolution), args.repeat)
+        print(f"{'per ' + resolution:<34}{rollup_ms:>12.2f}{rows_ms:>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+    Benchmark of the parallel preprocessing on synthetic CSV files of increasing size.
+
+    For each size, a synthetic CSV with a fraction of broken accidents is
+    written to a temporary directory, then preprocessed by `ingest.preprocess_file`
+    with each number of workers. The script checks that the rows, the rejected
+    rows and the aggregates are exactly those of the serial preprocessing, and
+    reports the throughput in rows per second, in total and per core.
+
+    Usage:
+        python ./src/benchmark_ingest.py --rows 100000 1000000 5000000 --workers 1 2 4 8
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+
+import pandas as pd
+
+import backends
+import ingest
+import synthetic
+from const import DAY_ORDER
+
+
+def check_aggregates(data, aggregates):
+    """
+    Checks that merged aggregates are those computed by the pandas backend on the merged rows.
+    """
+    backend = backends.PandasBackend(data)
+    pd.testing.assert_frame_equal(aggregates.seasonal_accidents(), backend.seasonal_accidents())
+    pd.testing.assert_frame_equal(
+        aggregates.hourly_counts(),
+        backend.hourly_counts(data['crash_date'].min(), data['crash_date'].max(), DAY_ORDER))
+    pd.testing.assert_frame_equal(aggregates.sankey_counts(), backend.sankey_counts())
+    pd.testing.assert_frame_equal(aggregates.injury_sums_by_cause(), backend.injury_sums_by_cause())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the parallel preprocessing.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--bad-fraction', type=float, default=0.001,
+                        help='Fraction of the accidents to break.')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'workers':>9}{'time (s)':>10}{'rows/s':>12}{'rows/s per core':>17}"
+          f"{'speedup':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory).joinpath('accidents.csv')
+        for n_rows in args.rows:
+            df, _ = synthetic.corrupt(synthetic.generate(n_rows), args.bad_fraction)
+            df.to_csv(path, index=False)
+            del df
+
+            reference = None
+            for workers in args.workers:
+                start = time.perf_counter()
+                data, quarantine, summary, aggregates, per_core = ingest.preprocess_file(
+                    path, workers)
+                elapsed = time.perf_counter() - start
+                if reference is None:
+                    reference = (data, quarantine.reset_index(drop=True), summary, elapsed)
+                else:
+                    pd.testing.assert_frame_equal(data, reference[0])
+                    pd.testing.assert_frame_equal(quarantine.reset_index(drop=True), reference[1])
+                    pd.testing.assert_series_equal(summary, reference[2])
+                if aggregates is not None:
+                    check_aggregates(data, aggregates)
+                del data, quarantine, aggregates
+
+                print(f"{n_rows:>10}{workers:>9}{elapsed:>10.2f}{n_rows / elapsed:>12.0f}"
+                      f"{per_core:>17.0f}{reference[3] / elapsed:>9.2f}")
+            del reference
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+    Benchmark of the validation stage on synthetic datasets of increasing size.
+
+    For each size, a fraction of the synthetic accidents is broken, then the
+    script checks that exactly those rows are quarantined, and compares the
+    time of `preprocess.convert_types` alone, on unbroken data, with the time
+    of the validation followed by `convert_types`. The validation parses the
+    dates itself, so `convert_types` does not parse them again: the overhead
+    is the time of the other checks.
+
+    Usage:
+        python ./src/benchmark_validation.py --rows 100000 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import preprocess
+import synthetic
+import validation
+
+
+def timed(function, *args):
+    """
+    Returns the result of `function` and its time in seconds.
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the validation stage.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--bad-fraction', type=float, default=0.001,
+                        help='Fraction of the accidents to break.')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'quarantined':>13}{'convert_types (s)':>19}{'validated (s)':>15}"
+          f"{'overhead':>10}")
+    for n_rows in args.rows:
+        _, convert_time = timed(preprocess.convert_types, synthetic.generate(n_rows))
+
+        data, broken = synthetic.corrupt(synthetic.generate(n_rows), args.bad_fraction)
+        (valid, quarantine, _), validate_time = timed(validation.validate, data)
+        if not np.array_equal(data.index.get_indexer(quarantine.index), broken):
+            raise AssertionError(
+                f"The quarantined rows differ from the broken ones for {n_rows} rows")
+        del data
+        _, validated_time = timed(preprocess.convert_types, valid)
+        validated_time += validate_time
+
+        print(f"{n_rows:>10}{len(quarantine):>13}{convert_time:>19.2f}{validated_time:>15.2f}"
+              f"{validated_time / convert_time - 1:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
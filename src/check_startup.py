@@ -0,0 +1,172 @@
+"""
+    Startup budget check of the dashboard.
+
+    Measures, in fresh processes:
+        - the time spent importing the modules needed by `app`, from the
+          output of `python -X importtime`, without the time spent running
+          the code of `app` itself (loading the data, drawing the figures);
+        - the time spent importing `server`, which must stay light since
+          gunicorn imports it before loading the app;
+        - the time from the start of the production server to the first
+          layout served.
+
+    The slowest imports are listed, and the script exits with an error when
+    a measure exceeds its budget, so it can be run before a deployment.
+
+    Usage:
+        python ./src/check_startup.py --import-budget 1.5 --startup-budget 10
+"""
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+SOURCE_PATH = Path(__file__).parent
+
+# Default budgets, in seconds
+IMPORT_BUDGET = 1.5
+SERVER_BUDGET = 0.1
+STARTUP_BUDGET = 10
+
+
+def import_times(module):
+    """
+    Imports a module in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        List[Tuple[str, int, float, float]]: For each imported module, in import order:
+        its name, its depth in the import tree, and its own and cumulative times in seconds.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=SOURCE_PATH, capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), depth, int(own) / 1e6, int(cumulative) / 1e6))
+    return times
+
+
+def dependencies_time(module, top=10):
+    """
+    Measures the time spent importing the dependencies of a module, and prints the slowest ones.
+
+    Args:
+        module (str): The module to import.
+        top (int, optional): The number of dependencies to print.
+
+    Returns:
+        float: The import time of the dependencies, in seconds.
+    """
+    times = import_times(module)
+    _, depth, own, cumulative = next(entry for entry in times
+                                     if entry[0] == module and entry[1] == 0)
+    direct = [entry for entry in times if entry[1] == depth + 1]
+    print(f"{module}: {cumulative:.3f} s, of which {own:.3f} s running its own code")
+    for dependency, _, _, dependency_time in sorted(direct, key=lambda entry: -entry[3])[:top]:
+        print(f"    {dependency:<30}{dependency_time:>8.3f} s")
+    return cumulative - own
+
+
+def free_port():
+    """
+    Returns:
+        int: A port free at the time of the call, chosen by the OS.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('localhost', 0))
+        return probe.getsockname()[1]
+
+
+def startup_time(port, timeout=300):
+    """
+    Starts the production server with one worker and measures the time until it serves the layout.
+
+    Args:
+        port (int): The port of the server.
+        timeout (float, optional): The maximal time to wait, in seconds.
+
+    Returns:
+        float: The time from the start of the process to the first layout served, in seconds.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(SOURCE_PATH.joinpath('server.py')), '--prod', '--port', str(port),
+         '--workers', '1'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://localhost:{port}/_dash-layout', timeout=1):
+                    return time.perf_counter() - start
+            except OSError:
+                if process.poll() is not None:
+                    sys.exit('The server exited before serving the layout.')
+                time.sleep(0.05)
+        sys.exit('The server did not serve the layout in time.')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def measure(port=None, import_budget=IMPORT_BUDGET, server_budget=SERVER_BUDGET,
+             startup_budget=STARTUP_BUDGET):
+    """
+    Measures the startup of the dashboard.
+
+    Args:
+        port (int, optional): The port of the production server started for the measure.
+            Defaults to a free port chosen by the OS.
+        import_budget (float, optional): Maximal time to import the dependencies of app.
+        server_budget (float, optional): Maximal time to import server.
+        startup_budget (float, optional): Maximal time from the start of the server to the first
+            layout served.
+
+    Returns:
+        List[Tuple[str, float, float]]: The name, the measured time and the budget of each check,
+        in seconds.
+    """
+    # The first start may preprocess the data and build the store: it is not what is measured
+    import_times('app')
+
+    return [
+        ('server import', import_times('server')[-1][3], server_budget),
+        ('app dependencies import', dependencies_time('app'), import_budget),
+        ('start to layout', startup_time(port or free_port()), startup_budget),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup budget check of the dashboard.')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET,
+                        help='Maximal time to import the dependencies of app, in seconds.')
+    parser.add_argument('--server-budget', type=float, default=SERVER_BUDGET,
+                        help='Maximal time to import server, in seconds.')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_BUDGET,
+                        help='Maximal time from the start of the server to the first layout '
+                             'served, in seconds.')
+    parser.add_argument('--port', type=int,
+                        help='Port of the production server. Defaults to a free port.')
+    args = parser.parse_args()
+
+    checks = measure(args.port, args.import_budget, args.server_budget, args.startup_budget)
+    failed = False
+    print()
+    for name, measured, budget in checks:
+        status = 'ok' if measured <= budget else 'OVER BUDGET'
+        failed |= measured > budget
+        print(f"{name:<26}{measured:>8.3f} s   budget {budget:>6.3f} s   {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -25,25 +25,23 @@ DAY_LABELS = {
 
 # Figure 3
 
-COLOR_MAP = {
-    # Causes
-    "Infractions au Code de la route": "#e74c3c",
-    "Conduite imprudente": "#d35400",
-    "Conduite inexpérimentée": "#c0392b",
-    "Déficiences du conducteur": "#e67e22",
-    "Distractions du conducteur": "#f39c12",
-    "Facteurs environnementaux et externes": "#7f8c8d",
+# The colors of the categories are given by the mapping rules (see `mappings.py`)
 
-    # Météo
-    "Temps clair": "#3498db",
-    "Pluie / Neige": "#2980b9",
-    "Temps nuageux ou brouillard": "#95a5a6",
-    "Conditions météorologiques extrêmes": "#34495e",
+SANKEY_DIMENSIONS = ["cause_category", "weather_category", "trafficway_category"]
 
-    # Routes
-    "Routes standards": "#2ecc71",
-    "Intersections et routes divisées": "#27ae60",
-    "Routes spéciales ou inconnues": "#16a085",
+# Raw column of the dataset grouped by each category column, revealed by the drill-down
+RAW_COLUMNS = {
+    "cause_category": "prim_contributory_cause",
+    "weather_category": "weather_condition",
+    "trafficway_category": "trafficway_type",
+}
+
+DIMENSION_LABELS = {
+    "cause_category": "Cause",
+    "weather_category": "Météo",
+    "trafficway_category": "Type de route",
+    "season": "Saison",
+    "crash_day_of_week_name": "Jour de la semaine",
 }
 
 # Figure 4
@@ -60,14 +58,8 @@ INJURY_LABEL_MAPPING = {
     "injuries_fatal": "Blessures mortelles"
 }
 
+# Colors of the nodes of figure 4 other than the causes, whose colors are given by the mapping rules
 COLORS_MAP_FIG_4 = {
-    "Infractions au Code de la route": "#9ea9ff",
-    "Conduite imprudente": "#7b9fff",
-    "Conduite inexpérimentée": "#7b9fff",
-    "Déficiences du conducteur": "#7b9fff",
-    "Distractions du conducteur": "#7b9fff",
-    "Facteurs environnementaux et externes": "#9ea9ff",
-    "Conditions météorologiques": "#9ea9ff",
     "Autre": "#d3d3d3",
     "Blessures légères": "#FF6F61",
     "Blessures graves": "#D14B3A",
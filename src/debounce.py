@@ -0,0 +1,99 @@
+"""
+    Server-side coalescing of bursts of callback requests.
+
+    Each browser gets a client id cookie. When a callback request arrives,
+    it is registered as the latest request of its client for this callback.
+    If the previous request of the same client arrived less than a short
+    window before, a burst is under way, and the request waits for the
+    window. If a newer request arrived meanwhile, the older one is superseded
+    and can be dropped with PreventUpdate before doing any expensive work: the
+    Dash renderer only keeps the result of the latest request anyway. Isolated
+    requests never wait.
+
+    The registrations older than the window cannot supersede anything, so they
+    are pruned regularly and the bookkeeping does not grow with the clients.
+
+    The bookkeeping is per process, so with several gunicorn workers only
+    the requests served by the same worker are coalesced.
+"""
+import itertools
+import threading
+import time
+import uuid
+
+import flask
+
+CLIENT_COOKIE = 'dashboard-client'
+COALESCE_WINDOW = 0.05  # seconds
+PRUNE_INTERVAL = 10.0  # seconds
+
+_counter = itertools.count()
+# Token and arrival time of the latest request, per client and callback
+_latest = {}
+_pruned = 0.0
+_lock = threading.Lock()
+
+
+def init_app(server):
+    """
+    Makes the Flask server give a client id cookie to every new browser.
+
+    Args:
+        server (flask.Flask): The Flask server of the Dash app.
+    """
+    @server.after_request
+    def set_client_cookie(response):  # pylint: disable=unused-variable
+        if CLIENT_COOKIE not in flask.request.cookies:
+            response.set_cookie(CLIENT_COOKIE, uuid.uuid4().hex, httponly=True, samesite='Lax')
+        return response
+
+
+def is_superseded(name, droppable=True, window=COALESCE_WINDOW):
+    """
+    Registers the current request as the latest one of its client for the
+    callback `name`, and tells whether a newer one arrived during the window.
+    The request only waits when the previous one of the same client arrived
+    less than a window before.
+
+    Requests that must not be dropped (e.g. because they toggle a state the
+    next request depends on) should still be registered, with
+    `droppable=False`, so that they supersede the older droppable ones.
+
+    Args:
+        name (str): The name of the callback.
+        droppable (bool, optional): Whether this request may be dropped.
+        window (float, optional): How long to wait for a newer request, in seconds.
+
+    Returns:
+        bool: True if the request has been superseded and can be dropped.
+    """
+    global _pruned
+    client = flask.request.cookies.get(CLIENT_COOKIE)
+    if client is None:
+        return False
+    key = (client, name)
+    token = next(_counter)
+    now = time.monotonic()
+    with _lock:
+        previous = _latest.get(key)
+        _latest[key] = (token, now)
+        if now - _pruned > PRUNE_INTERVAL:
+            _prune(now, window)
+            _pruned = now
+    if not droppable or previous is None or now - previous[1] >= window:
+        return False
+    time.sleep(window)
+    with _lock:
+        latest = _latest.get(key)
+        if latest is not None and latest[0] != token:
+            return True
+        _latest.pop(key, None)
+    return False
+
+
+def _prune(now, window):
+    """
+    Forgets the requests registered more than a window ago. The caller holds the lock.
+    """
+    for key in [key for key, (_, arrived) in _latest.items() if now - arrived >= window]:
+        del _latest[key]
@@ -0,0 +1,261 @@
+"""
+    Multi-resolution bins of the accident locations, for the density map.
+
+    The locations are projected once to Web Mercator, the projection of the
+    map tiles, and counted in square cells at the finest level of a pyramid:
+    at level L, the world is divided into 2^L x 2^L cells, so each level
+    splits the cells of the previous one in four, like the tiles of the map.
+    The cells are also split per year, season and day of the week, the
+    filters shared with figures 1 and 2, so a filtered count is a sum over
+    a few precomputed rows and never a scan of the accidents.
+
+    The coarser levels are summed from the finest one when first needed. A
+    query only returns the cells of one level inside the visible area of the
+    map, so the size of the answer depends on the size of the screen, not on
+    the number of accidents.
+"""
+import numpy as np
+import pandas as pd
+
+from const import DAY_ORDER, SEASON_ORDER
+
+MIN_LEVEL = 8
+MAX_LEVEL = 17
+
+# Number of levels between a map tile and a cell: a tile of 256 pixels holds 16 x 16 cells of 16
+# pixels
+CELLS_PER_TILE_LEVELS = 4
+TILE_SIZE = 256
+
+# Latitude limit of the Web Mercator projection
+MAX_LATITUDE = 85.05112878
+
+# View of the map when there is no area to fit: Chicago, where the accidents of the dataset are
+DEFAULT_CENTER = {'lon': -87.73, 'lat': 41.83}
+DEFAULT_ZOOM = 10.0
+
+GROUPS_PER_YEAR = len(SEASON_ORDER) * len(DAY_ORDER)
+
+
+def project(longitude, latitude):
+    """
+    Projects coordinates to Web Mercator, scaled to the unit square.
+
+    Args:
+        longitude (np.ndarray): The longitudes, in degrees.
+        latitude (np.ndarray): The latitudes, in degrees.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The x (west to east) and y (north to south) coordinates,
+        in [0, 1].
+    """
+    sine = np.sin(np.radians(np.clip(latitude, -MAX_LATITUDE, MAX_LATITUDE)))
+    x = (np.asarray(longitude) + 180) / 360
+    y = 0.5 - np.log((1 + sine) / (1 - sine)) / (4 * np.pi)
+    return x, y
+
+
+def unproject(x, y):
+    """
+    Converts Web Mercator coordinates of the unit square back to degrees.
+
+    Args:
+        x (np.ndarray): The x coordinates.
+        y (np.ndarray): The y coordinates.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The longitudes and latitudes.
+    """
+    return x * 360 - 180, np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y))))
+
+
+def level_for_zoom(zoom):
+    """
+    Chooses the level of the pyramid whose cells are about 16 pixels wide at a zoom level of the
+    map.
+
+    Args:
+        zoom (float): The zoom level of the map.
+
+    Returns:
+        int: The level of the pyramid.
+    """
+    return int(np.clip(np.floor(zoom) + CELLS_PER_TILE_LEVELS, MIN_LEVEL, MAX_LEVEL))
+
+
+def cell_pixels(zoom, level):
+    """
+    Returns:
+        float: The width of a cell of a level, in pixels, at a zoom level of the map.
+    """
+    return TILE_SIZE * 2 ** (zoom - level)
+
+
+class BinPyramid:
+    """
+    Counts of accidents per cell of the map, year, season and day of the week, at every level.
+    """
+
+    def __init__(self, min_level=MIN_LEVEL, max_level=MAX_LEVEL):
+        """
+        Args:
+            min_level (int, optional): The coarsest level.
+            max_level (int, optional): The finest level, where the accidents are counted.
+        """
+        self.min_level = min_level
+        self.max_level = max_level
+        self._finest = None
+        self._levels = {}
+        self.unlocated = 0
+
+    def append(self, rows):
+        """
+        Adds accidents to the finest level. The accidents without a valid location are only counted.
+
+        Args:
+            rows (pd.DataFrame): Processed accidents, with the `latitude`, `longitude`,
+                `crash_year`, `season` and `crash_day_of_week_name` columns.
+        """
+        latitude, longitude = rows['latitude'].to_numpy(), rows['longitude'].to_numpy()
+        located = (np.isfinite(latitude) & np.isfinite(longitude)
+                   & (np.abs(latitude) <= MAX_LATITUDE) & (np.abs(longitude) <= 180)
+                   & ((latitude != 0) | (longitude != 0)))
+        self.unlocated += int((~located).sum())
+        rows = rows.loc[located]
+
+        x, y = project(longitude[located], latitude[located])
+        size = 2 ** self.max_level
+        seasons = pd.Categorical(rows['season'], categories=SEASON_ORDER).codes.astype(np.int64)
+        days = pd.Categorical(rows['crash_day_of_week_name'], categories=DAY_ORDER).codes
+        days = days.astype(np.int64)
+        counts = pd.DataFrame({
+            'x': np.minimum(x * size, size - 1).astype(np.int64),
+            'y': np.minimum(y * size, size - 1).astype(np.int64),
+            'group': rows['crash_year'].to_numpy().astype(np.int64) * GROUPS_PER_YEAR
+                     + seasons * len(DAY_ORDER) + days,
+        }).value_counts()
+        if self._finest is not None:
+            counts = counts.add(self._finest, fill_value=0).astype(np.int64)
+        self._finest = counts.sort_index()
+        self._levels = {}
+
+    def level(self, level):
+        """
+        Returns the counts of a level, summed from the finest level when first requested.
+
+        Args:
+            level (int): The level, between the coarsest and finest levels.
+
+        Returns:
+            Dict[str, np.ndarray]: The 'x', 'y', 'group' and 'count' arrays of the non-empty cells,
+            sorted by x, empty when no accident has a valid location.
+        """
+        if self._finest is None:
+            return {key: np.zeros(0, dtype=np.int64) for key in ('x', 'y', 'group', 'count')}
+        if level not in self._levels:
+            shift = self.max_level - level
+            finest = self._finest
+            index = finest.index
+            counts = finest.groupby([index.get_level_values('x').to_numpy() >> shift,
+                                     index.get_level_values('y').to_numpy() >> shift,
+                                     index.get_level_values('group').to_numpy()]).sum()
+            self._levels[level] = {
+                'x': counts.index.get_level_values(0).to_numpy(),
+                'y': counts.index.get_level_values(1).to_numpy(),
+                'group': counts.index.get_level_values(2).to_numpy(),
+                'count': counts.to_numpy(),
+            }
+        return self._levels[level]
+
+    def query(self, level, bounds, year_range, seasons, days):
+        """
+        Counts the accidents of the visible cells of a level matching the filters.
+
+        Args:
+            level (int): The level of the cells, clipped to the levels of the pyramid.
+            bounds (Tuple[float, float, float, float]): The west, south, east and north limits
+                of the visible area, in degrees.
+            year_range (List[int]): The first and last years to keep.
+            seasons (List[str]): The seasons to keep.
+            days (List[str]): The days of the week to keep.
+
+        Returns:
+            pd.DataFrame: The 'longitude', 'latitude' (of the cell centers) and 'count'
+            of the non-empty cells.
+        """
+        level = min(max(level, self.min_level), self.max_level)
+        table = self.level(level)
+        size = 2 ** level
+        west, south, east, north = bounds
+        (x0, x1), (y0, y1) = project(np.array([west, east]), np.array([north, south]))
+        x0, x1 = np.clip(np.floor(np.array([x0, x1]) * size), 0, size - 1).astype(np.int64)
+        y0, y1 = np.clip(np.floor(np.array([y0, y1]) * size), 0, size - 1).astype(np.int64)
+
+        start, end = np.searchsorted(table['x'], [x0, x1 + 1])
+        x, y, group, count = (table[key][start:end] for key in ('x', 'y', 'group', 'count'))
+        season_kept = np.isin(SEASON_ORDER, seasons)
+        day_kept = np.isin(DAY_ORDER, days)
+        year = group // GROUPS_PER_YEAR
+        kept = ((y >= y0) & (y <= y1) & (year >= year_range[0]) & (year <= year_range[1])
+                & season_kept[group // len(DAY_ORDER) % len(SEASON_ORDER)]
+                & day_kept[group % len(DAY_ORDER)])
+
+        cells, inverse = np.unique(x[kept] * size + y[kept], return_inverse=True)
+        longitude, latitude = unproject((cells // size + 0.5) / size, (cells % size + 0.5) / size)
+        return pd.DataFrame({
+            'longitude': longitude,
+            'latitude': latitude,
+            'count': np.bincount(inverse, weights=count[kept],
+                                 minlength=len(cells)).astype(np.int64),
+        })
+
+
+def view_bounds(center, zoom, width, height):
+    """
+    Computes the limits of the area visible on a map of a given size.
+
+    Args:
+        center (dict): The 'lon' and 'lat' of the center of the map.
+        zoom (float): The zoom level of the map.
+        width (int): The width of the map, in pixels.
+        height (int): The height of the map, in pixels.
+
+    Returns:
+        Tuple[float, float, float, float]: The west, south, east and north limits, in degrees.
+    """
+    x, y = project(center['lon'], center['lat'])
+    half_width, half_height = (np.array([width, height]) / 2) / (TILE_SIZE * 2 ** zoom)
+    (west, east), (north, south) = unproject(np.array([x - half_width, x + half_width]),
+                                             np.array([y - half_height, y + half_height]))
+    return float(west), float(south), float(east), float(north)
+
+
+def fit_view(bounds, width, height):
+    """
+    Finds the center and the zoom level showing a whole area on a map of a given size.
+    The zoom level is at most the one where the cells of the finest level are 16 pixels wide,
+    which is also the zoom level of an area without width nor height (a single point). An area
+    which is not finite, such as the quantiles of no location, gets the default view.
+
+    Args:
+        bounds (Tuple[float, float, float, float]): The west, south, east and north limits,
+            in degrees.
+        width (int): The width of the map, in pixels.
+        height (int): The height of the map, in pixels.
+
+    Returns:
+        Tuple[dict, float]: The 'lon' and 'lat' of the center, and the zoom level.
+    """
+    if not np.isfinite(bounds).all():
+        return dict(DEFAULT_CENTER), DEFAULT_ZOOM
+    west, south, east, north = bounds
+    (x0, x1), (y0, y1) = project(np.array([west, east]), np.array([north, south]))
+    lon, lat = unproject((x0 + x1) / 2, (y0 + y1) / 2)
+    spans = np.array([x1 - x0, y1 - y0])
+    # Beyond this zoom level, the cells of the finest level are wider than 16 pixels
+    zoom = float(MAX_LEVEL - CELLS_PER_TILE_LEVELS)
+    if (spans > 0).any():
+        with np.errstate(divide='ignore'):
+            scale = np.min(np.array([width, height]) / np.where(spans > 0, spans, 0))
+        zoom = min(float(np.floor(np.log2(scale / TILE_SIZE) * 2) / 2), zoom)
+    return {'lon': float(lon), 'lat': float(lat)}, zoom
@@ -0,0 +1,112 @@
+"""
+    Drill-down from the categories of the Sankey diagrams to the raw values they group.
+
+    `preprocess.map_categories` collapses the raw causes, weather conditions and
+    trafficway types of the dataset into a few categories. The number of accidents
+    per category *and* raw value is aggregated once, at startup, and split per
+    category into the few links which replace its node by the nodes of its raw
+    values. Expanding a node is then a dictionary lookup, not a new scan of the data.
+
+    An expansion is a tuple (raw values, links), the links being a DataFrame with
+    'source', 'target' and 'value' columns, like the links of the diagrams.
+"""
+import pandas as pd
+
+from const import INJURY_CATEGORIES, INJURY_LABEL_MAPPING, RAW_COLUMNS, SANKEY_DIMENSIONS
+
+LINK_COLUMNS = ['source', 'target', 'value']
+
+
+def sankey_expansions(counts, dimensions=SANKEY_DIMENSIONS):
+    """
+    Precomputes the expansions of the categories of a Sankey diagram.
+
+    Each raw value gets the links of its category with the categories of the
+    neighbouring dimensions. A category found in several dimensions is expanded
+    in the first one.
+
+    Args:
+        counts (pd.DataFrame): The number of accidents per combination of the dimensions and
+            of their raw columns, as returned by `sankey_counts`.
+        dimensions (List[str], optional): The columns of the Sankey, from left to right.
+            Defaults to SANKEY_DIMENSIONS.
+
+    Returns:
+        Dict[str, Tuple[List[str], pd.DataFrame]]: The expansion of each category.
+    """
+    expansions = {}
+    for i, dimension in enumerate(dimensions):
+        raw = RAW_COLUMNS.get(dimension)
+        if raw is None:
+            continue
+        parts = []
+        if i > 0:
+            left = dimensions[i - 1]
+            parts.append(counts.groupby([dimension, left, raw])['count'].sum().reset_index()
+                         .rename(columns={left: 'source', raw: 'target', 'count': 'value'}))
+        if i < len(dimensions) - 1:
+            right = dimensions[i + 1]
+            parts.append(counts.groupby([dimension, raw, right])['count'].sum().reset_index()
+                         .rename(columns={raw: 'source', right: 'target', 'count': 'value'}))
+        links = pd.concat(parts, ignore_index=True)
+        values = counts.groupby([dimension, raw])['count'].sum()
+        for category, group in links.groupby(dimension, sort=False):
+            if category not in expansions:
+                order = values.loc[category].sort_values(ascending=False).index
+                expansions[category] = (list(order), group[LINK_COLUMNS].reset_index(drop=True))
+    return expansions
+
+
+def injury_expansions(injury_sums):
+    """
+    Precomputes the expansions of the cause categories of the injury Sankey diagram of figure 4,
+    where the links go from the injury categories to the causes.
+
+    Args:
+        injury_sums (pd.DataFrame): The number of injuries of each category (columns) per cause
+            category and raw cause (rows), as returned by `injury_sums_by_raw_cause`.
+
+    Returns:
+        Dict[str, Tuple[List[str], pd.DataFrame]]: The expansion of each cause category.
+    """
+    links = (injury_sums[INJURY_CATEGORIES].rename(columns=INJURY_LABEL_MAPPING)
+             .rename_axis(columns='source').stack().rename('value').reset_index())
+    links = links.rename(columns={RAW_COLUMNS['cause_category']: 'target'})
+    links = links[links['value'] > 0]
+    totals = injury_sums[INJURY_CATEGORIES].sum(axis=1)
+    return {
+        category: (list(totals.loc[category].sort_values(ascending=False).index),
+                   group[LINK_COLUMNS].reset_index(drop=True))
+        for category, group in links.groupby('cause_category', sort=False)
+    }
+
+
+def expand(links, category, expansions):
+    """
+    Replaces the node of a category by the nodes of its raw values.
+
+    Args:
+        links (pd.DataFrame): The links of the diagram, with 'source', 'target' and 'value' columns.
+        category (str): The category to expand.
+        expansions (Dict[str, Tuple[List[str], pd.DataFrame]]): The precomputed expansions.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, str]]: The new links, and the category of each new node.
+    """
+    values, expansion = expansions[category]
+    kept = links[(links['source'] != category) & (links['target'] != category)]
+    return pd.concat([kept, expansion], ignore_index=True), dict.fromkeys(values, category)
+
+
+def clicked_label(click_data):
+    """
+    Reads the label of the node clicked in a diagram.
+
+    Args:
+        click_data (dict): The `clickData` property of the graph.
+
+    Returns:
+        Optional[str]: The label of the clicked node, or None when no node was clicked.
+    """
+    points = (click_data or {}).get('points') or [{}]
+    return points[0].get('label') or None
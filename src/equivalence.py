@@ -0,0 +1,506 @@
+"""
+    Equivalence harness between the legacy pipeline and the optimized engines.
+
+    The legacy pipeline is a frozen copy of the original preprocessing and
+    figures (see `reference/`): it categorizes every row with a lookup per
+    raw value, and draws every figure with a `go.Figure` built from the
+    processed rows. Each engine computes the same outputs the way the
+    dashboard does: the pandas or DuckDB backend, the aggregates merged
+    during the parallel preprocessing, the rows read back from the store at
+    a restart, the categories computed again when the mapping rules are
+    reloaded, the rollup tables of figure 1 and the figure templates. Both
+    run on the rows accepted by the validation, which the legacy pipeline
+    did not have.
+
+    On every dataset, the synthetic ones with a fraction of broken accidents
+    and the sample CSV, the harness compares each output of each engine with
+    the legacy one: the processed rows and the tables exactly, values and
+    types, and the figures through what they show, so that a difference in
+    a value, a label, a hover text or a color is reported with its path. The
+    rewritten figures differ from the legacy ones in their structure (traces
+    kept hidden, drill-down ring), which is not compared. The nodes and links
+    of the Sankey diagrams are compared in order. Only the legacy figure 3 is
+    renumbered first: it numbers its nodes in the order of a set, which
+    changes with the hash seed of the process, and the dashboard in the
+    order they appear in the links.
+    The tables and figures added since, like the series of figure 1, are
+    compared with a groupby over the legacy rows. The time of each stage is
+    printed next to the number of mismatches, and the script fails when any
+    output differs.
+
+    Usage:
+        python ./src/equivalence.py --rows 100000 1000000 --sample --workers 4
+"""
+import argparse
+import contextlib
+import copy
+import importlib.util
+import json
+import pathlib
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import plotly.io as pio
+
+import backends
+import drilldown
+import figure_1
+import figure_2
+import figure_3
+import figure_4
+import ingest
+import mappings
+import partitions
+import preprocess
+import rollups
+import store
+import synthetic
+import validation
+from const import DAY_ORDER, INJURY_CATEGORIES, RAW_COLUMNS, SEASON_ORDER
+from reference import figure_1 as legacy_figure_1
+from reference import figure_2 as legacy_figure_2
+from reference import figure_3 as legacy_figure_3
+from reference import figure_4 as legacy_figure_4
+from reference import preprocess as legacy_preprocess
+
+STAGES = ['preprocess', 'aggregates', 'figures']
+# Resolutions of the series view of figure 1
+SERIES_RESOLUTIONS = ['month', 'week', 'day']
+# Number of differences listed per output
+MAX_DIFFERENCES = 5
+
+
+@contextlib.contextmanager
+def stage(times, name):
+    """
+    Adds the time spent in the block to `times[name]`, in seconds.
+    """
+    start = time.perf_counter()
+    yield
+    times[name] = times.get(name, 0) + time.perf_counter() - start
+
+
+def rows_table(data, resolution, year_start, year_end):
+    """
+    Counts the accidents per period and season with a groupby over the rows, like
+    `rollups.Rollups.between`. A week belongs to the year of its Thursday.
+    """
+    dates = data['crash_date'].dt.normalize()
+    years = data['crash_year']
+    if resolution == 'week':
+        dates = dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')
+        years = (dates + pd.Timedelta(days=3)).dt.year
+    elif resolution == 'month':
+        dates = dates.dt.to_period('M').dt.to_timestamp()
+    kept = years.between(year_start, year_end)
+    table = data.loc[kept].groupby([years[kept].rename('year'), dates[kept].rename('period'),
+                                    'season']).size()
+    table = table.unstack(fill_value=0).reindex(columns=SEASON_ORDER, fill_value=0)
+    table.columns.name = None
+    return table
+
+
+def reference(path):
+    """
+    Runs the legacy pipeline: every table and figure is computed from the processed rows.
+
+    Args:
+        path (pathlib.Path): The CSV file of raw accidents.
+
+    Returns:
+        Tuple[dict, dict]: The outputs by name, and the time of each stage in seconds.
+    """
+    times = {}
+    with stage(times, 'preprocess'):
+        df, _, _ = validation.validate(pd.read_csv(path))
+        data = legacy_preprocess.convert_types(df)
+        data = legacy_preprocess.add_season(data)
+        data = legacy_preprocess.map_categories(data)
+        data = data.sort_values('crash_date', kind='stable', ignore_index=True)
+
+    with stage(times, 'aggregates'):
+        first, last = int(data['crash_year'].min()), int(data['crash_year'].max())
+        without_other = data[data['cause_category'] != 'Autre']
+        outputs = {
+            'rows': data,
+            'seasonal': legacy_preprocess.prepare_seasonal_accidents(data),
+            'figure 4 data': legacy_preprocess.prepare_figure_4(data),
+            'injuries by raw cause': without_other.groupby(
+                ['cause_category', RAW_COLUMNS['cause_category']])[INJURY_CATEGORIES].sum(),
+            'yearly totals': data.groupby(data['crash_year'].rename('year')).size()
+                                 .to_frame('total'),
+        }
+        outputs.update({f'series per {resolution}': rows_table(data, resolution, first, last)
+                        for resolution in SERIES_RESOLUTIONS})
+
+    with stage(times, 'figures'):
+        outputs.update({
+            'figure 1': legacy_figure_1.draw(legacy_figure_1.init_figure(), outputs['seasonal']),
+            'figure 2': legacy_figure_2.draw(data),
+            'figure 3': legacy_figure_3.draw(data),
+            'figure 4 sunburst': legacy_figure_4.generate_sunburst_figure_4(
+                outputs['figure 4 data']),
+            'figure 4 sankey': legacy_figure_4.generate_sankey_figure_4(outputs['figure 4 data']),
+        })
+    return outputs, times
+
+
+def optimized(data, aggregates, times):
+    """
+    Computes the outputs of an engine the way the dashboard does, from its processed rows
+    and an object answering the queries of the backends.
+
+    Args:
+        data (pd.DataFrame): The processed accidents.
+        aggregates (backends.PandasBackend | backends.DuckDBBackend | partitions.Aggregates):
+            The queries.
+        times (dict): The time of each stage, completed in place.
+
+    Returns:
+        dict: The outputs by name.
+    """
+    with stage(times, 'aggregates'):
+        if isinstance(aggregates, partitions.Aggregates):
+            hourly = aggregates.hourly_counts()
+            raw_causes = backends.PandasBackend(data).injury_sums_by_raw_cause()
+        else:
+            hourly = aggregates.hourly_counts(data['crash_date'].min(), data['crash_date'].max(),
+                                              DAY_ORDER)
+            raw_causes = aggregates.injury_sums_by_raw_cause()
+        rollup_tables = rollups.Rollups()
+        rollup_tables.append(data)
+        first, last = int(data['crash_year'].min()), int(data['crash_year'].max())
+        outputs = {
+            'rows': data,
+            'seasonal': aggregates.seasonal_accidents(),
+            'figure 4 data': preprocess.figure_4_table(aggregates.injury_sums_by_cause()),
+            'injuries by raw cause': raw_causes,
+            'yearly totals': rollup_tables.table('year'),
+        }
+        outputs.update({f'series per {resolution}': rollup_tables.between(resolution, first, last)
+                        for resolution in SERIES_RESOLUTIONS})
+
+    with stage(times, 'figures'):
+        outputs.update({
+            'figure 1': figure_1.draw(outputs['seasonal']),
+            'figure 2': figure_2.draw_counts(hourly),
+            'figure 3': figure_3.draw_counts(aggregates.sankey_counts()),
+            'figure 4 sunburst': figure_4.generate_sunburst_figure_4(
+                outputs['figure 4 data'], drilldown.injury_expansions(raw_causes)),
+            'figure 4 sankey': figure_4.generate_sankey_figure_4(outputs['figure 4 data']),
+        })
+    return outputs
+
+
+def pandas_engine(path):
+    """
+    Runs the serial preprocessing of the dashboard and the pandas backend.
+    """
+    times = {}
+    with stage(times, 'preprocess'):
+        data = ingest.preprocess_file(path, 1)[0]
+    return optimized(data, backends.PandasBackend(data), times), times
+
+
+def parallel_engine(path, workers):
+    """
+    Runs the parallel preprocessing, whose merged aggregates give the initial figures.
+    """
+    times = {}
+    with stage(times, 'preprocess'):
+        data, _, _, aggregates, _ = ingest.preprocess_file(path, max(workers, 2))
+    return optimized(data, aggregates, times), times
+
+
+def duckdb_engine(path):
+    """
+    Runs the serial preprocessing, then the DuckDB backend on a temporary Parquet store.
+    """
+    times = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with stage(times, 'preprocess'):
+            data = ingest.preprocess_file(path, 1)[0]
+            store.write_store(data, pathlib.Path(directory), 'equivalence')
+        return optimized(data, backends.DuckDBBackend(pathlib.Path(directory)), times), times
+
+
+def restart_engine(path, workers):
+    """
+    Starts the dashboard twice on a temporary cache: the first `ingest.load` preprocesses the CSV
+    with `workers` processes and writes the store, the second, timed, reads the rows back from it.
+    """
+    times = {}
+    with tempfile.TemporaryDirectory() as directory:
+        ingest.load(workers, path, pathlib.Path(directory))
+        with stage(times, 'preprocess'):
+            data = ingest.load(workers, path, pathlib.Path(directory))[0]
+    return optimized(data, backends.PandasBackend(data), times), times
+
+
+def other_rules(rules):
+    """
+    Returns:
+        mappings.MappingRules: The previous version of `rules`, where the raw values of the first
+        category of each column were still left in 'Autre'.
+    """
+    config = copy.deepcopy(rules.config)
+    for dimension_rules in config.values():
+        next(iter(dimension_rules['categories'].values()))['values'] = []
+    return mappings.MappingRules({'version': rules.version - 1, 'dimensions': config})
+
+
+def mappings_engine(path):
+    """
+    Runs the serial preprocessing under the previous mapping rules, then reloads the current ones
+    like `app.reload_categories`: the changed category columns are computed again, on a copy, from
+    the codes of their raw values.
+    """
+    times = {}
+    with stage(times, 'preprocess'):
+        data = ingest.preprocess_file(path, 1)[0]
+        rules = mappings.current()
+        previous = other_rules(rules)
+        codes = mappings.CategoryCodes(data)
+        data = codes.apply(data.copy(), previous)
+        data = codes.apply(data.copy(), rules, rules.changed_dimensions(previous))
+    return optimized(data, backends.PandasBackend(data), times), times
+
+
+ENGINES = {
+    'pandas': pandas_engine,
+    'parallel': parallel_engine,
+    'duckdb': duckdb_engine,
+    'restart': restart_engine,
+    'mappings': mappings_engine,
+}
+# Engines preprocessing the CSV with the processes given by --workers
+POOLED_ENGINES = {'parallel', 'restart'}
+
+
+def available_engines(names):
+    """
+    Returns:
+        List[str]: The engines among `names` whose dependencies are installed.
+    """
+    missing = {'duckdb': not store.available() or importlib.util.find_spec('duckdb') is None,
+               'restart': not store.available(), 'parallel': False, 'pandas': False,
+               'mappings': False}
+    for name in names:
+        if missing[name]:
+            print(f"Engine {name!r} skipped: its dependencies are not installed.", file=sys.stderr)
+    return [name for name in names if not missing[name]]
+
+
+def shown_bars(figure):
+    """
+    Returns:
+        Dict[str, list]: The year, value, text and hover text of the bars of each visible season.
+    """
+    return {trace['name']: [[year, int(value), text, hover] for year, value, text, hover
+                            in zip(trace['y'], trace['x'], trace['text'], trace['hovertext'])
+                            if value]
+            for trace in figure['data'] if trace.get('visible', True)}
+
+
+def shown_radars(figure):
+    """
+    Returns:
+        List[list]: The title, radii and hover texts of each visible radar, in order.
+    """
+    titles = [annotation['text'] for annotation in figure['layout']['annotations']
+              if annotation['text']]
+    radars = []
+    for title, trace in zip(titles, [trace for trace in figure['data']
+                                     if trace.get('visible', True)]):
+        if 'text' in trace:
+            hovers = [trace['hovertemplate'].replace('%{text}', text) for text in trace['text']]
+        else:
+            hovers = [trace['hovertemplate'].replace('%{theta}', theta)
+                      .replace('%{r:d}', str(int(r)))
+                      for theta, r in zip(trace['theta'], trace['r'])]
+        radars.append([title, [int(r) for r in trace['r']], hovers])
+    return radars
+
+
+def shown_sankey(figure):
+    """
+    Returns:
+        dict: The label and color of the nodes of a Sankey diagram, and the source, target and
+        value of its links, in order.
+    """
+    trace = figure['data'][0]
+    return {'labels': trace['node']['label'], 'colors': trace['node']['color'],
+            'sources': trace['link']['source'], 'targets': trace['link']['target'],
+            'values': [int(value) for value in trace['link']['value']]}
+
+
+def in_link_order(figure):
+    """
+    Numbers the nodes of a Sankey diagram in the order they first appear in its links, like
+    `figure_3.node_labels`.
+
+    Returns:
+        dict: The decoded figure, renumbered in place.
+    """
+    trace = figure['data'][0]
+    node, link = trace['node'], trace['link']
+    order = list(dict.fromkeys(link['source'] + link['target'] + list(range(len(node['label'])))))
+    number = {old: new for new, old in enumerate(order)}
+    node['label'] = [node['label'][old] for old in order]
+    node['color'] = [node['color'][old] for old in order]
+    link['source'] = [number[old] for old in link['source']]
+    link['target'] = [number[old] for old in link['target']]
+    return figure
+
+
+def shown_sunburst(figure):
+    """
+    Returns:
+        List[list]: The label, parent, value and color of the sectors of the first two rings,
+        sorted. The ring of the raw causes, added since, is left out.
+    """
+    trace = figure['data'][0]
+    rings = {'', 'Total'} | {label for label, parent in zip(trace['labels'], trace['parents'])
+                             if parent == 'Total'}
+    return sorted([label, parent, int(value), color] for label, parent, value, color
+                  in zip(trace['labels'], trace['parents'], trace['values'],
+                         trace['marker']['colors'])
+                  if parent in rings)
+
+
+# What each figure shows, compared between the engines and the legacy pipeline
+SHOWN = {
+    'figure 1': shown_bars,
+    'figure 2': shown_radars,
+    'figure 3': shown_sankey,
+    'figure 4 sunburst': shown_sunburst,
+    'figure 4 sankey': shown_sankey,
+}
+# Legacy figures whose arbitrary order is fixed before they are compared
+LEGACY_ORDER = {
+    'figure 3': in_link_order,
+}
+
+
+def json_differences(expected, actual, path=''):
+    """
+    Lists the differences between two decoded JSON documents.
+
+    Returns:
+        List[str]: The path of each difference, with both values.
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in list(expected) + [key for key in actual if key not in expected]:
+            if key not in actual:
+                differences.append(f"{path}.{key}: missing")
+            elif key not in expected:
+                differences.append(f"{path}.{key}: unexpected")
+            else:
+                differences += json_differences(expected[key], actual[key], f"{path}.{key}")
+        return differences
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: {len(expected)} items != {len(actual)} items"]
+        differences = []
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            differences += json_differences(left, right, f"{path}[{i}]")
+        return differences
+    if expected != actual or type(expected) is not type(actual):
+        return [f"{path}: {expected!r} != {actual!r}"]
+    return []
+
+
+def differences(name, expected, actual):
+    """
+    Compares an output of an engine with the legacy one: tables exactly, figures through what
+    they show.
+
+    Returns:
+        List[str]: The differences, empty when the outputs are identical.
+    """
+    if isinstance(expected, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_exact=True)
+        except AssertionError as error:
+            return [line for line in str(error).splitlines() if line.strip()]
+        return []
+    shown = SHOWN[name]
+    expected = json.loads(pio.to_json(expected, validate=False))
+    if name in LEGACY_ORDER:
+        expected = LEGACY_ORDER[name](expected)
+    return json_differences(shown(expected), shown(json.loads(pio.to_json(actual, validate=False))))
+
+
+def compare(dataset, path, engines, workers):
+    """
+    Runs the legacy pipeline and each engine on a dataset, and prints one line per engine.
+
+    Returns:
+        Dict[str, Dict[str, List[str]]]: The differences of each mismatching output, per engine.
+    """
+    expected, reference_times = reference(path)
+    print(f"{dataset:<22}{'legacy':<11}"
+          + "".join(f"{reference_times[name]:>16.2f}" for name in STAGES) + f"{'':>9}{'':>12}")
+    mismatches = {}
+    for name in engines:
+        actual, times = (ENGINES[name](path, workers) if name in POOLED_ENGINES
+                         else ENGINES[name](path))
+        found = {}
+        for output, value in expected.items():
+            lines = differences(output, value, actual[output])
+            if lines:
+                found[output] = lines
+        speedup = sum(reference_times.values()) / sum(times.values())
+        print(f"{dataset:<22}{name:<11}"
+              + "".join(f"{times[stage_name]:>16.2f}" for stage_name in STAGES)
+              + f"{speedup:>9.2f}{len(found):>12}")
+        if found:
+            mismatches[name] = found
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Equivalence harness between the legacy pipeline and the engines.')
+    parser.add_argument('--rows', type=int, nargs='*', default=[100000],
+                        help='Sizes of the synthetic datasets.')
+    parser.add_argument('--sample', action='store_true', help='Also compare on the source CSV.')
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument('--workers', type=int, default=4, help='Processes of the parallel engine.')
+    parser.add_argument('--bad-fraction', type=float, default=0.001,
+                        help='Fraction of the synthetic accidents to break.')
+    args = parser.parse_args()
+
+    engines = available_engines(args.engines)
+    print(f"{'dataset':<22}{'engine':<11}" + "".join(f"{name + ' (s)':>16}" for name in STAGES)
+          + f"{'speedup':>9}{'mismatches':>12}")
+    mismatches = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory).joinpath('accidents.csv')
+        for n_rows in args.rows:
+            df, _ = synthetic.corrupt(synthetic.generate(n_rows), args.bad_fraction)
+            df.to_csv(path, index=False)
+            del df
+            for name, found in compare(f"synthetic {n_rows}", path, engines,
+                                       args.workers).items():
+                mismatches[(f"synthetic {n_rows}", name)] = found
+    if args.sample:
+        for name, found in compare("sample", ingest.SOURCE_PATH, engines, args.workers).items():
+            mismatches[("sample", name)] = found
+
+    for (dataset, engine), found in mismatches.items():
+        for output, lines in found.items():
+            print(f"\n{dataset} / {engine} / {output}:")
+            for line in lines[:MAX_DIFFERENCES]:
+                print(f"    {line}")
+            if len(lines) > MAX_DIFFERENCES:
+                print(f"    ... {len(lines) - MAX_DIFFERENCES} more")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+    Batch export of figures 1 to 4 as static files, without starting the dashboard.
+
+    The data is loaded from the columnar store (or preprocessed once when it
+    is outdated), then the figures of every combination of filters are drawn
+    by the same figure modules as the dashboard and written in parallel by a
+    pool of processes:
+        - `html`: a standalone page, with plotly.js written once next to the
+          pages, so they open without network access;
+        - `svg` and `png`: static images, which require the kaleido package.
+
+    Each file is recorded in a manifest with a hash of its figure and of its
+    output settings: a file whose hash did not change is not written again.
+
+    The combinations are read from a JSON file, a list of objects such as:
+        {"name": "hiver-2020", "years": [2020, 2020], "seasons": ["Hiver"], "resolution": "week",
+         "days": ["Saturday", "Sunday"], "injury_view": "sankey"}
+    where every key but "name" is optional and defaults to no filtering.
+
+    Usage:
+        python ./src/export.py --output reports --formats html png --combinations combinations.json
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import plotly
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+import analytics
+import backends
+import drilldown
+import figure_1
+import figure_2
+import figure_3
+import figure_4
+import ingest
+import preprocess
+import rollups
+from const import DAY_ORDER, SEASON_ORDER
+
+FORMATS = ['html', 'svg', 'png']
+INJURY_VIEWS = ['sunburst', 'sankey']
+RESOLUTIONS = ['season', 'month', 'week', 'day']
+MANIFEST_FILE = 'manifest.json'
+PLOTLYJS_FILE = 'plotly.min.js'
+
+# Size of the static images, in pixels
+IMAGE_WIDTH = 1200
+IMAGE_SCALE = 2
+
+
+def load_combinations(path, years):
+    """
+    Reads the combinations of filters to export, and fills in the missing filters.
+
+    Args:
+        path (Optional[Path]): The JSON file of the combinations. Defaults to a single
+            combination named 'tout', without any filter.
+        years (List[int]): The first and last years of the data.
+
+    Returns:
+        List[dict]: The combinations, with every key.
+
+    Raises:
+        ValueError: If a combination has no valid name or an unknown filter value.
+    """
+    combinations = json.loads(path.read_text(encoding='utf-8')) if path else [{'name': 'tout'}]
+    filled = []
+    for combination in combinations:
+        combination = {'years': years, 'seasons': SEASON_ORDER, 'resolution': 'season',
+                       'days': DAY_ORDER, 'injury_view': 'sunburst', **combination}
+        if not re.fullmatch(r'[\w.-]+', str(combination.get('name', ''))):
+            raise ValueError(f"Invalid combination name: {combination.get('name')!r}")
+        unknown = ((set(combination['seasons']) - set(SEASON_ORDER))
+                   | (set(combination['days']) - set(DAY_ORDER)))
+        if (unknown or combination['injury_view'] not in INJURY_VIEWS
+                or combination['resolution'] not in RESOLUTIONS):
+            raise ValueError(f"Unknown filters in combination {combination['name']!r}")
+        filled.append(combination)
+    return filled
+
+
+def draw_figures(backend, data_fig_1, rollup_tables, anomalies, injury_figures, combination):
+    """
+    Draws the figures of the dashboard for one combination of filters.
+
+    Args:
+        backend (backends.PandasBackend | backends.DuckDBBackend): The query backend.
+        data_fig_1 (pd.DataFrame): The number of accidents per year and season.
+        rollup_tables (rollups.Rollups): The number of accidents per month, week and day,
+            for figure 1.
+        anomalies (pd.DataFrame): The seasonal anomalies annotated on figure 1.
+        injury_figures (Dict[str, go.Figure]): The figures of section 4, by injury view.
+        combination (dict): The filters, as returned by `load_combinations`.
+
+    Returns:
+        Dict[str, dict | go.Figure]: The figures, by file name without extension.
+    """
+    start_year, end_year = combination['years']
+    resolution = combination['resolution']
+    seasons = combination['seasons']
+    if resolution == 'season':
+        figures = {'figure_1': figure_1.draw(data_fig_1, start_year, end_year, seasons, anomalies)}
+    else:
+        figures = {'figure_1': figure_1.draw_series(
+            rollup_tables.between(resolution, start_year, end_year), rollup_tables.table('year'),
+            resolution, seasons)}
+    if combination['days']:
+        counts = backend.hourly_counts(f'{start_year}-01-01', f'{end_year}-12-31',
+                                       combination['days'])
+        figures['figure_2'] = figure_2.draw_counts(counts, combination['days'])
+    figures['figure_3'] = figure_3.draw_counts(
+        backend.sankey_counts(year_range=combination['years']))
+    figures['figure_4'] = injury_figures[combination['injury_view']]
+    return figures
+
+
+def content_hash(figure, file_format):
+    """
+    Hashes a figure with everything else that changes its file.
+
+    Args:
+        figure (dict | go.Figure): The figure.
+        file_format (str): The format of the file.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest.
+    """
+    content = pio.to_json(figure, validate=False, engine='json')
+    settings = [file_format, plotly.__version__, IMAGE_WIDTH, IMAGE_SCALE]
+    return hashlib.sha256(json.dumps([content, settings]).encode('utf-8')).hexdigest()
+
+
+def write_plotlyjs(output):
+    """
+    Writes the copy of plotly.js bundled with Plotly in the output directory, unless it is current.
+
+    Args:
+        output (Path): The output directory.
+    """
+    path = output.joinpath(PLOTLYJS_FILE)
+    plotlyjs = get_plotlyjs()
+    if not path.exists() or path.read_text(encoding='utf-8') != plotlyjs:
+        path.write_text(plotlyjs, encoding='utf-8')
+
+
+def render(figure, path, file_format):
+    """
+    Writes one figure to a file. Run in the worker processes.
+
+    Args:
+        figure (dict | go.Figure): The figure.
+        path (Path): The file to write.
+        file_format (str): The format of the file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if file_format == 'html':
+        # The pages share the copy of plotly.js written by `write_plotlyjs`, so they work offline
+        pio.write_html(figure, path, include_plotlyjs=f'../{PLOTLYJS_FILE}', full_html=True,
+                       validate=False)
+    else:
+        layout = figure['layout'] if isinstance(figure, dict) else figure.layout.to_plotly_json()
+        height = layout.get('height')
+        pio.write_image(figure, path, format=file_format, width=IMAGE_WIDTH, height=height,
+                        scale=IMAGE_SCALE, validate=False)
+
+
+def export(backend, data_fig_1, rollup_tables, anomalies, injury_figures, combinations, formats,
+           output, workers):
+    """
+    Writes the figures of every combination of filters which changed since the last export.
+
+    Args:
+        backend (backends.PandasBackend | backends.DuckDBBackend): The query backend.
+        data_fig_1 (pd.DataFrame): The number of accidents per year and season.
+        rollup_tables (rollups.Rollups): The number of accidents per month, week and day,
+            for figure 1.
+        anomalies (pd.DataFrame): The seasonal anomalies annotated on figure 1.
+        injury_figures (Dict[str, go.Figure]): The figures of section 4, by injury view.
+        combinations (List[dict]): The filters, as returned by `load_combinations`.
+        formats (List[str]): The formats of the files.
+        output (Path): The output directory.
+        workers (int): The number of processes writing the files.
+
+    Returns:
+        Tuple[int, int]: The number of files written and skipped.
+    """
+    manifest_path = output.joinpath(MANIFEST_FILE)
+    manifest = {}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+
+    output.mkdir(parents=True, exist_ok=True)
+    if 'html' in formats:
+        write_plotlyjs(output)
+
+    tasks = []
+    skipped = 0
+    for combination in combinations:
+        figures = draw_figures(backend, data_fig_1, rollup_tables, anomalies, injury_figures,
+                               combination)
+        for name, figure in figures.items():
+            for file_format in formats:
+                relative = f"{combination['name']}/{name}.{file_format}"
+                digest = content_hash(figure, file_format)
+                if manifest.get(relative) == digest and output.joinpath(relative).exists():
+                    skipped += 1
+                    continue
+                tasks.append((relative, digest, figure, file_format))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render, figure, output.joinpath(relative), file_format)
+                   for relative, _, figure, file_format in tasks]
+        for (relative, digest, _, _), future in zip(tasks, futures):
+            future.result()
+            manifest[relative] = digest
+
+    # The manifest is replaced at once, so an interrupted export never records a file it did not
+    # write
+    temporary = manifest_path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    temporary.replace(manifest_path)
+    return len(tasks), skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch export of the figures of the dashboard.')
+    parser.add_argument('--output', type=Path, default=Path('reports'), help='Output directory.')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['html'])
+    parser.add_argument('--combinations', type=Path,
+                        help='JSON file of the combinations of filters.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of processes writing the files.')
+    parser.add_argument('--ingest-workers', type=int,
+                        default=int(os.environ.get('DASHBOARD_INGEST_WORKERS', '1')),
+                        help='Number of processes preprocessing the source CSV when the store '
+                             'is outdated.')
+    parser.add_argument('--backend', choices=list(backends.BACKENDS),
+                        default=os.environ.get('DASHBOARD_BACKEND', 'pandas'))
+    args = parser.parse_args()
+
+    if set(args.formats) & {'svg', 'png'} and importlib.util.find_spec('kaleido') is None:
+        parser.error("The svg and png formats require the kaleido package.")
+
+    data = ingest.load_data(args.ingest_workers)
+    backend = backends.create_backend(args.backend, data, ingest.STORE_PATH)
+    trends = analytics.Trends()
+    trends.append(data)
+    rollup_tables = rollups.Rollups()
+    rollup_tables.append(data)
+    combinations = load_combinations(args.combinations, [trends.years[0], trends.years[-1]])
+
+    data_fig_4 = preprocess.figure_4_table(backend.injury_sums_by_cause())
+    injury_figures = {
+        'sunburst': figure_4.generate_sunburst_figure_4(
+            data_fig_4, drilldown.injury_expansions(backend.injury_sums_by_raw_cause())),
+        'sankey': figure_4.generate_sankey_figure_4(data_fig_4),
+    }
+    written, skipped = export(backend, backend.seasonal_accidents(), rollup_tables,
+                              trends.anomalies(), injury_figures, combinations, args.formats,
+                              args.output, args.workers)
+    print(f"{written} files written, {skipped} unchanged, in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
+import functools
+
+import numpy as np
 import plotly.graph_objects as go
 
+import labels
+import templates
 from const import SEASON_COLORS, SEASON_ORDER
 
 def init_figure():
@@ -30,46 +35,232 @@ def init_figure():
     )
     return fig
 
-def draw(fig, data, year_start = 2018, year_end = 2024, selected_seasons = SEASON_ORDER) :
+@functools.lru_cache(maxsize=None)
+def template():
+    """
+    Builds the skeleton of figure 1 once: its layout and one bar trace per season,
+    with every style but no data. The seasons keep the same trace index in every update.
+
+    Returns:
+        dict: The template of the figure.
+    """
+    fig = init_figure()
+    for season in SEASON_ORDER:
+        fig.add_trace(go.Bar(
+            name=season,
+            marker_color=SEASON_COLORS[season],
+            orientation='h',
+            textposition='inside',
+            insidetextanchor='middle',
+            textfont=dict(color='white', size=12),
+            hoverinfo='text',
+        ))
+    return templates.freeze(fig)
+
+# Title of the x axis, unit of the dates and prefix of the hover texts of each resolution of the
+# series view
+SERIES_RESOLUTIONS = {
+    'day': ('Jour', 'D', ''),
+    'week': ('Semaine', 'D', 'Semaine du '),
+    'month': ('Mois', 'M', ''),
+}
+
+@functools.lru_cache(maxsize=None)
+def series_template():
     """
-    Draws a stacked horizontal bar chart into the given Plotly figure, based on accident data
-    filtered by year range and selected seasons.
+    Builds the skeleton of the series view of figure 1 once: vertical bars over time, stacked
+    by season, with one trace per season like the yearly view.
+
+    Returns:
+        dict: The template of the figure.
+    """
+    fig = go.Figure()
+    fig.update_layout(
+        barmode='stack',
+        bargap=0.1,
+        yaxis_title="Nombre d'accidents",
+        showlegend=False,
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        xaxis=dict(type='date', title=dict(text='')),
+        margin=dict(l=60, r=20, t=40, b=60)
+    )
+    for season in SEASON_ORDER:
+        fig.add_trace(go.Bar(
+            name=season,
+            marker_color=SEASON_COLORS[season],
+            marker_line_width=0,
+            hoverinfo='text',
+        ))
+    return templates.freeze(fig)
+
+def series_updates(data, totals, resolution, selected_seasons = SEASON_ORDER) :
+    """
+    Computes the data arrays of the series view of figure 1, from a rollup table.
+    The work only depends on the number of periods, not on the number of accidents.
+
+    Args:
+        data (pd.DataFrame): The counts per period and season, as returned by
+            `rollups.Rollups.between`.
+        totals (pd.DataFrame): The yearly totals, as returned by `rollups.Rollups.table('year')`.
+        resolution (str): 'day', 'week' or 'month'.
+        selected_seasons (list[str], optional): List of seasons to include in the chart.
+            Defaults to SEASON_ORDER.
+
+    Returns:
+        List[Tuple[tuple, Any]]: The (path, value) updates of `series_template`.
+    """
+    axis_title, unit, prefix = SERIES_RESOLUTIONS[resolution]
+    periods = data.index.get_level_values('period').to_numpy().astype('datetime64[D]')
+    years = data.index.get_level_values('year').to_numpy()
+    period_texts = labels.concat(prefix, np.datetime_as_string(periods, unit=unit))
+    year_totals = totals['total'].reindex(years, fill_value=0).to_numpy()
+
+    changes = [(('layout', 'xaxis', 'title', 'text'), axis_title)]
+    for i, season in enumerate(SEASON_ORDER):
+        if season not in selected_seasons:
+            changes.append((('data', i, 'visible'), False))
+            continue
+        # A day or a month belongs to a single season: only the periods of the season are sent
+        values = data[season].to_numpy()
+        kept = values > 0
+        hover_texts = labels.concat(period_texts[kept], "<br>", season, " – ", values[kept],
+                                    " accidents<br>Total en ", years[kept], " : ",
+                                    year_totals[kept])
+        changes += [
+            (('data', i, 'visible'), True),
+            (('data', i, 'x'), periods[kept]),
+            (('data', i, 'y'), values[kept]),
+            (('data', i, 'hovertext'), hover_texts),
+        ]
+    return changes
+
+def updates(data, year_start = 2018, year_end = 2024, selected_seasons = SEASON_ORDER,
+            anomalies = None) :
+    """
+    Computes the data arrays of figure 1 for the given year range and seasons.
 
     Args:
-        fig (go.Figure): The base figure to update.
         data (pd.DataFrame): The dataframe to display.
         year_start (int, optional): Start year for filtering the data. Defaults to 2018.
         year_end (int, optional): End year for filtering the data. Defaults to 2024.
-        selected_seasons (list[str], optional): List of seasons to include in the chart. Defaults to SEASON_ORDER.
+        selected_seasons (list[str], optional): List of seasons to include in the chart.
+            Defaults to SEASON_ORDER.
+        anomalies (pd.DataFrame, optional): The seasonal anomalies to annotate, as returned by
+            `analytics.Trends.anomalies`. Defaults to no annotation.
 
     Returns:
-        go.Figure: The updated Plotly figure containing the bar traces.
+        List[Tuple[tuple, Any]]: The (path, value) updates of the template, for `templates.apply`.
     """
-    fig = go.Figure(fig)
-    fig.data = []
-    seasons_to_show = [season for season in SEASON_ORDER if season in selected_seasons]
     data_filtered = data.loc[data.index.to_series().between(year_start, year_end)]   
-    year_totals = data_filtered.sum(axis=1).to_dict()
     years = list(range(year_start, year_end + 1))
+    year_totals = data_filtered.sum(axis=1).reindex(years, fill_value=0).to_numpy()
 
-    for season in seasons_to_show:
-        values = [data_filtered.loc[year, season] if season in data_filtered.columns else 0 for year in years]
-        hover_texts = [
-        f"{season} – {int(v)} accidents<br>Total en {year} : {year_totals.get(year, 0)}"
-        if v > 0 else ''
-        for v, year in zip(values, years)
+    changes = []
+    for i, season in enumerate(SEASON_ORDER):
+        if season not in selected_seasons:
+            changes.append((('data', i, 'visible'), False))
+            continue
+        if season in data_filtered.columns:
+            values = data_filtered[season].reindex(years, fill_value=0).to_numpy()
+        else:
+            values = np.zeros(len(years), dtype=np.int64)
+        hover_texts = labels.where_positive(values, labels.concat(
+            f"{season} – ", values.astype(np.int64), " accidents<br>Total en ", years, " : ",
+            year_totals
+        ))
+        changes += [
+            (('data', i, 'visible'), True),
+            (('data', i, 'y'), years),
+            (('data', i, 'x'), values),
+            (('data', i, 'text'), labels.count_labels(values)),
+            (('data', i, 'hovertext'), hover_texts),
         ]
-        fig.add_trace(go.Bar(
-            y=years,
-            x=values,
-            name=season,
-            marker_color=SEASON_COLORS[season],
-            orientation='h',
-            text=[str(int(v)) if v > 0 else '' for v in values],
-            textposition='inside',
-            insidetextanchor='middle',
-            textfont=dict(color='white', size=12),
-            hoverinfo='text',
-            hovertext=hover_texts
+    return changes + annotation_updates(data_filtered, selected_seasons, anomalies)
+
+def annotation_updates(data, selected_seasons, anomalies) :
+    """
+    Annotates the end of the bars of the years with an anomaly among the selected seasons.
+    The x axis is extended to leave room for the annotations.
+
+    Args:
+        data (pd.DataFrame): The displayed years of the dataframe.
+        selected_seasons (list[str]): The displayed seasons.
+        anomalies (pd.DataFrame): The seasonal anomalies, as returned by
+            `analytics.Trends.anomalies`.
+
+    Returns:
+        List[Tuple[tuple, Any]]: The (path, value) updates of the annotations and of the x axis.
+    """
+    if anomalies is None or anomalies.empty:
+        return [(('layout', 'annotations'), []), (('layout', 'xaxis', 'range'), None)]
+
+    seasons = [season for season in SEASON_ORDER
+               if season in selected_seasons and season in data.columns]
+    totals = data[seasons].sum(axis=1)
+    shown = anomalies.loc[anomalies.index.get_level_values('crash_year').isin(data.index)
+                          & anomalies.index.get_level_values('season').isin(seasons)]
+
+    annotations = []
+    for year, rows in shown.groupby(level='crash_year', sort=True):
+        seasons_of_year = rows.index.get_level_values('season')
+        deviations = rows['deviation_pct']
+        annotations.append(dict(
+            x=int(totals[year]),
+            y=int(year),
+            xref='x',
+            yref='y',
+            xanchor='left',
+            xshift=6,
+            showarrow=False,
+            font=dict(size=11, color='#444'),
+            text=' · '.join(f"{'▲' if z > 0 else '▼'} {season} {deviation:+.0f} %"
+                            for season, z, deviation
+                            in zip(seasons_of_year, rows['zscore'], deviations)),
+            hovertext='<br>'.join(f"{season} {year} : {count} accidents, {deviation:+.0f} % "
+                                  "par rapport à la moyenne de la saison"
+                                  for season, count, deviation
+                                  in zip(seasons_of_year, rows['count'], deviations)),
         ))
-    return fig
\ No newline at end of file
+    x_range = [0, totals.max() * 1.3] if annotations else None
+    return [(('layout', 'annotations'), annotations), (('layout', 'xaxis', 'range'), x_range)]
+
+def draw_series(data, totals, resolution, selected_seasons = SEASON_ORDER) :
+    """
+    Draws the number of accidents per day, week or month as vertical bars stacked by season.
+
+    Args:
+        data (pd.DataFrame): The counts per period and season, as returned by
+            `rollups.Rollups.between`.
+        totals (pd.DataFrame): The yearly totals, as returned by `rollups.Rollups.table('year')`.
+        resolution (str): 'day', 'week' or 'month'.
+        selected_seasons (list[str], optional): List of seasons to include in the chart.
+            Defaults to SEASON_ORDER.
+
+    Returns:
+        dict: The figure containing the bar traces.
+    """
+    return templates.apply(series_template(),
+                           series_updates(data, totals, resolution, selected_seasons))
+
+def draw(data, year_start = 2018, year_end = 2024, selected_seasons = SEASON_ORDER,
+         anomalies = None) :
+    """
+    Draws a stacked horizontal bar chart based on accident data filtered by year range and selected
+    seasons.
+    The seasons which are not selected are hidden.
+
+    Args:
+        data (pd.DataFrame): The dataframe to display.
+        year_start (int, optional): Start year for filtering the data. Defaults to 2018.
+        year_end (int, optional): End year for filtering the data. Defaults to 2024.
+        selected_seasons (list[str], optional): List of seasons to include in the chart.
+            Defaults to SEASON_ORDER.
+        anomalies (pd.DataFrame, optional): The seasonal anomalies to annotate. Defaults to no
+            annotation.
+
+    Returns:
+        dict: The figure containing the bar traces.
+    """
+    return templates.apply(template(),
+                           updates(data, year_start, year_end, selected_seasons, anomalies))
@@ -1,36 +1,39 @@
+import functools
+
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 
+import analytics
+import labels
+import preprocess
+import templates
 from const import DAY_ORDER, DAY_LABELS
 
-color = "rgba(30,144,255,0.5)" 
+color = "rgba(30,144,255,0.5)"
 
-def draw(data, selected_days = DAY_ORDER) :
-    """
-    Draws a radar chart showing the hourly distribution of accidents for selected days of the week.
+ALL_HOURS = list(range(24))
+CATEGORIES = [str(h) for h in ALL_HOURS]
+THETA = CATEGORIES + [CATEGORIES[0]]  # Close loop
+THETA_HOURS = np.array(ALL_HOURS + [ALL_HOURS[0]])
 
-    Args:
-        data (pd.DataFrame): The dataframe to display.
-        selected_days (list[str], optional): List of days to include in the radar chart. Defaults to DAY_ORDER.
+@functools.lru_cache(maxsize=None)
+def template():
+    """
+    Builds the skeleton of figure 2 once: the 2x4 grid of polar subplots, the layout,
+    one subplot title and one radar trace per slot, with every style but no data.
+    The selected days fill the slots in order, like the subplots of the original chart.
 
     Returns:
-        go.Figure: A Plotly figure containing radar charts (subplots) for each selected day,
-                   displaying hourly accident distributions.
+        dict: The template of the figure.
     """
-    all_hours = list(range(24))
-    categories = [str(h) for h in all_hours]
-    day_names = [day for day in DAY_ORDER if day in selected_days and day in data['crash_day_of_week_name'].unique()]
-
     fig = make_subplots(
         rows=2, cols=4,
         specs=[[{'type': 'polar'}]*4, [{'type': 'polar'}]*4],
-        subplot_titles=[ 
-            f"{DAY_LABELS[day]}<br>Total: {data[data['crash_day_of_week_name'] == day].shape[0]} accidents"
-            for day in day_names
-        ] + [""],
-        vertical_spacing=0.08, 
-        horizontal_spacing=0.08 
+        subplot_titles=[DAY_LABELS[day] for day in DAY_ORDER],
+        vertical_spacing=0.08,
+        horizontal_spacing=0.08
     )
 
     fig.update_layout(
@@ -43,33 +46,20 @@ def draw(data, selected_days = DAY_ORDER) :
         },
         height=800,
         showlegend=False,
-        plot_bgcolor='rgba(0, 0, 0, 0)',  
+        plot_bgcolor='rgba(0, 0, 0, 0)',
         paper_bgcolor='rgba(0, 0, 0, 0)',
         margin=dict(t=120, b=50),
     )
 
-    for i, day_name in enumerate(day_names):
-        df_day = data[data['crash_day_of_week_name'] == day_name]
-        day_counts = df_day.groupby('crash_hour').size().reindex(all_hours, fill_value=0)
-        day_values = list(day_counts) + [day_counts.iloc[0]]  # Close loop
-
-        r = day_values
-        theta = categories + [categories[0]]
-
-        row = i // 4 + 1
-        col = i % 4 + 1
-
+    for i in range(len(DAY_ORDER)):
         fig.add_trace(go.Scatterpolar(
-            r=r,
-            theta=theta,
+            theta=THETA,
             fill='toself',
             mode='lines+markers',
-            text=[f"{DAY_LABELS[day_name]}<br>{h}h : {v} accidents" for h, v in zip(theta, r)],
-            hovertemplate="%{text}<extra></extra>",
             line=dict(color="black", width=1),
             marker=dict(size=4, opacity=0),
             fillcolor=color,
-        ), row=row, col=col)
+        ), row=i // 4 + 1, col=i % 4 + 1)
 
     fig.update_polars(
         angularaxis=dict(
@@ -83,6 +73,93 @@ def draw(data, selected_days = DAY_ORDER) :
     )
 
     for annotation in fig['layout']['annotations']:
-        annotation['yshift'] = 1  
+        annotation['yshift'] = 1
+
+    return templates.freeze(fig)
+
+def draw(data, selected_days = DAY_ORDER) :
+    """
+    Draws a radar chart showing the hourly distribution of accidents for selected days of the week.
+
+    Args:
+        data (pd.DataFrame): The dataframe to display.
+        selected_days (list[str], optional): List of days to include in the radar chart.
+            Defaults to DAY_ORDER.
+
+    Returns:
+        dict: A figure containing radar charts (subplots) for each selected day,
+              displaying hourly accident distributions.
+    """
+    return draw_counts(preprocess.prepare_hourly_counts(data), selected_days)
+
+def draw_counts(counts, selected_days = DAY_ORDER) :
+    """
+    Draws the radar chart of figure 2 from the number of accidents per day of the week and hour.
+
+    Args:
+        counts (pd.DataFrame): The counts, as returned by `preprocess.prepare_hourly_counts`.
+        selected_days (list[str], optional): List of days to include in the radar chart.
+            Defaults to DAY_ORDER.
+
+    Returns:
+        dict: A figure containing radar charts (subplots) for each selected day,
+              displaying hourly accident distributions.
+    """
+    return templates.apply(template(), updates(counts, selected_days))
+
+def updates(counts, selected_days = DAY_ORDER, errors = None, total_errors = None) :
+    """
+    Computes the data arrays and subplot titles of figure 2 for the given counts and days.
+    The peak hour of each day is marked on its radar. When the counts are estimates,
+    their errors are shown in the hover texts and the titles.
+
+    Args:
+        counts (pd.DataFrame): The counts, as returned by `preprocess.prepare_hourly_counts`.
+        selected_days (list[str], optional): List of days to include in the radar chart.
+            Defaults to DAY_ORDER.
+        errors (pd.DataFrame, optional): The half-widths of the confidence intervals of the counts,
+            in the same shape. Defaults to exact counts.
+        total_errors (pd.Series, optional): The half-widths of the confidence intervals of the
+            total of each day.
+
+    Returns:
+        List[Tuple[tuple, Any]]: The (path, value) updates of the template, for `templates.apply`.
+    """
+    day_names = [day for day in DAY_ORDER if day in selected_days and day in counts.index]
+    day_labels = [DAY_LABELS[day] for day in day_names]
+    radii = counts.loc[day_names].to_numpy()
+    radii = np.concatenate([radii, radii[:, :1]], axis=1)  # Close loop
+    totals = counts.loc[day_names].sum(axis=1).to_numpy()
+    if errors is None:
+        titles = labels.concat(day_labels, "<br>Total: ", totals, " accidents")
+        hover = "<br>%{theta}h : %{r:d} accidents<extra></extra>"
+    else:
+        titles = labels.concat(day_labels, "<br>Total: ~", totals, " ± ",
+                               total_errors.loc[day_names].to_numpy(), " accidents")
+        hover = "<br>%{theta}h : ~%{r:d} ± %{customdata:d} accidents (IC 95 %)<extra></extra>"
+        margins = errors.loc[day_names].to_numpy()
+        margins = np.concatenate([margins, margins[:, :1]], axis=1)  # Close loop
+    peaks = analytics.peak_hours(counts.loc[day_names]).to_numpy()
+    is_peak = (THETA_HOURS[None, :] == peaks[:, None]) & (radii > 0)
+
+    changes = []
+    for i in range(len(DAY_ORDER)):
+        if i >= len(day_names):
+            changes += [
+                (('data', i, 'visible'), False),
+                (('layout', 'annotations', i, 'text'), ""),
+            ]
+            continue
 
-    return fig
+        changes += [
+            (('data', i, 'visible'), True),
+            (('data', i, 'r'), radii[i]),
+            (('data', i, 'marker', 'opacity'), is_peak[i].astype(np.int8)),
+            (('data', i, 'marker', 'size'), np.where(is_peak[i], 9, 4)),
+            # The hover text is formatted by Plotly in the browser, not point by point here
+            (('data', i, 'hovertemplate'), day_labels[i] + hover),
+            (('layout', 'annotations', i, 'text'), titles[i]),
+        ]
+        if errors is not None:
+            changes.append((('data', i, 'customdata'), margins[i]))
+    return changes
@@ -1,46 +1,101 @@
+import pandas as pd
 import plotly.graph_objects as go
 
-from const import COLOR_MAP
+import mappings
+from const import SANKEY_DIMENSIONS
 
-def process_data(data):
+def process_data(data, dimensions=SANKEY_DIMENSIONS, progress=None):
     """
-    Processes the input data to generate categories and link data for a Sankey diagram, based on cause, weather, and trafficway categories.
+    Processes the input data to generate categories and link data for a Sankey diagram, based on the
+    given dimensions (by default the cause, weather, and trafficway categories). Links go from each
+    dimension to the next one.
 
     Args:
         data (pd.DataFrame): The dataframe to display.
+        dimensions (List[str], optional): The columns of the Sankey, from left to right.
+            Defaults to SANKEY_DIMENSIONS.
+        progress (Callable[[int, int], None], optional): Called with the number of done and total
+            steps.
 
     Returns:
         tuple: A tuple containing:
-            - The processed DataFrame with counts ('cause_category', 'weather_category', 'trafficway_category', 'count').
-            - A list of unique categories combining cause, weather, and trafficway categories.
+            - The processed DataFrame with counts (one column per dimension, and 'count').
+            - A list of unique categories combining all the dimensions.
             - A list of sources.
             - A list of targets.
             - A list of values.
     """
-    data = data.groupby(["cause_category", "weather_category", "trafficway_category"]).size().reset_index(name="count")
-    
-    categories = list(set(data["cause_category"]) | set(data["weather_category"]) | set(data["trafficway_category"]))
+    dimensions = list(dimensions)
+    data = data.groupby(dimensions).size().reset_index(name="count")
+    if progress:
+        progress(1, len(dimensions))
+    return process_counts(data, dimensions, progress)
+
+def process_counts(data, dimensions=SANKEY_DIMENSIONS, progress=None):
+    """
+    Generates the categories and link data of a Sankey diagram from the number of accidents
+    per combination of the given dimensions.
+
+    Args:
+        data (pd.DataFrame): The counts, with one column per dimension and 'count', sorted by the
+            dimensions.
+        dimensions (List[str], optional): The columns of the Sankey, from left to right.
+            Defaults to SANKEY_DIMENSIONS.
+        progress (Callable[[int, int], None], optional): Called with the number of done and total
+            steps.
+
+    Returns:
+        tuple: The same tuple as `process_data`.
+    """
+    links = link_table(data, dimensions, progress)
+    categories = node_labels(links)
     label_to_index = {label: i for i, label in enumerate(categories)}
-    
-    links_cause_weather = data.groupby(["cause_category", "weather_category"])["count"].sum().reset_index()
-    source1 = [label_to_index[row["cause_category"]] for _, row in links_cause_weather.iterrows()]
-    target1 = [label_to_index[row["weather_category"]] for _, row in links_cause_weather.iterrows()]
-    value1 = links_cause_weather["count"].tolist()
+    source = [label_to_index[label] for label in links["source"]]
+    target = [label_to_index[label] for label in links["target"]]
+    return data, categories, source, target, links["value"].tolist()
 
-    links_weather_traffic = data.groupby(["weather_category", "trafficway_category"])["count"].sum().reset_index()
-    source2 = [label_to_index[row["weather_category"]] for _, row in links_weather_traffic.iterrows()]
-    target2 = [label_to_index[row["trafficway_category"]] for _, row in links_weather_traffic.iterrows()]
-    value2 = links_weather_traffic["count"].tolist()
+def link_table(data, dimensions=SANKEY_DIMENSIONS, progress=None):
+    """
+    Sums the number of accidents flowing between the categories of each pair of consecutive
+    dimensions.
 
-    source = source1 + source2
-    target = target1 + target2
-    value = value1 + value2
+    Args:
+        data (pd.DataFrame): The counts, with one column per dimension and 'count', sorted by the
+            dimensions.
+        dimensions (List[str], optional): The columns of the Sankey, from left to right.
+            Defaults to SANKEY_DIMENSIONS.
+        progress (Callable[[int, int], None], optional): Called with the number of done and total
+            steps.
 
-    return data, categories, source, target, value
+    Returns:
+        pd.DataFrame: The links, with 'source', 'target' and 'value' columns, from left to right.
+    """
+    dimensions = list(dimensions)
+    n_steps = len(dimensions)
+    tables = []
+    for step, (left, right) in enumerate(zip(dimensions, dimensions[1:]), start=2):
+        links = data.groupby([left, right])["count"].sum().reset_index()
+        tables.append(links.set_axis(["source", "target", "value"], axis=1))
+        if progress:
+            progress(step, n_steps)
+    return pd.concat(tables, ignore_index=True)
+
+def node_labels(links):
+    """
+    Lists the nodes of a Sankey diagram in the order they first appear in its links,
+    so the nodes of a dimension stay together and the order does not change between runs.
+
+    Args:
+        links (pd.DataFrame): The links, with 'source' and 'target' columns.
+
+    Returns:
+        List[str]: The labels of the nodes.
+    """
+    return list(pd.unique(pd.concat([links["source"], links["target"]], ignore_index=True)))
 
 def get_node_colors(labels):
     """
-    Returns a list of colors for the given labels, using a predefined color map. 
+    Returns a list of colors for the given labels, using the colors of the current mapping rules.
     If a label is not found in the color map, a default color is used.
 
     Args:
@@ -50,22 +105,64 @@ def get_node_colors(labels):
         List[str]: A list of color codes corresponding to the labels.
     """
     default_color = "#bdc3c7"
-    return [COLOR_MAP.get(label, default_color) for label in labels]
+    colors = mappings.current().colors
+    return [colors.get(label, default_color) for label in labels]
 
-def draw(data):
+def draw(data, dimensions=SANKEY_DIMENSIONS, progress=None):
     """
     Draws a Sankey diagram visualizing the relationship between accident causes, weather conditions, 
     and trafficway categories based on the provided data.
 
     Args:
         data (pd.DataFrame): The dataframe to display.
+        dimensions (List[str], optional): The columns of the Sankey, from left to right.
+            Defaults to SANKEY_DIMENSIONS.
+        progress (Callable[[int, int], None], optional): Called with the number of done and total
+            steps.
 
     Returns:
         go.Figure: A Plotly figure containing a Sankey diagram with nodes representing the categories
                    and links representing the relationships between them.
     """
-    data, categories, source, target, value = process_data(data)
-    node_colors = get_node_colors(categories)
+    data = data.groupby(list(dimensions)).size().reset_index(name="count")
+    if progress:
+        progress(1, len(dimensions))
+    return draw_counts(data, dimensions, progress)
+
+def draw_counts(data, dimensions=SANKEY_DIMENSIONS, progress=None):
+    """
+    Draws the Sankey diagram of figure 3 from the number of accidents per combination of the
+    dimensions.
+
+    Args:
+        data (pd.DataFrame): The counts, with one column per dimension and 'count', sorted by the
+            dimensions.
+        dimensions (List[str], optional): The columns of the Sankey, from left to right.
+            Defaults to SANKEY_DIMENSIONS.
+        progress (Callable[[int, int], None], optional): Called with the number of done and total
+            steps.
+
+    Returns:
+        go.Figure: The Sankey diagram.
+    """
+    return draw_links(link_table(data, dimensions, progress))
+
+def draw_links(links, parents=None):
+    """
+    Draws the Sankey diagram of figure 3 from its links.
+
+    Args:
+        links (pd.DataFrame): The links, as returned by `link_table` or `drilldown.expand`.
+        parents (Dict[str, str], optional): The category of the nodes of raw values, whose color
+            they take.
+
+    Returns:
+        go.Figure: The Sankey diagram.
+    """
+    categories = node_labels(links)
+    label_to_index = {label: i for i, label in enumerate(categories)}
+    parents = parents or {}
+    node_colors = get_node_colors([parents.get(label, label) for label in categories])
     fig = go.Figure(go.Sankey(
         arrangement="snap",
         node=dict(
@@ -76,9 +173,9 @@ def draw(data):
             color=node_colors
         ),
         link=dict(
-            source=source,
-            target=target,
-            value=value,
+            source=links["source"].map(label_to_index).tolist(),
+            target=links["target"].map(label_to_index).tolist(),
+            value=links["value"].tolist(),
             color="rgba(0,0,0,0.2)"
         )
     ))
@@ -1,41 +1,76 @@
+import pandas as pd
 import plotly.graph_objects as go
+import mappings
 from const import INJURY_CATEGORIES, INJURY_LABEL_MAPPING, COLORS_MAP_FIG_4
 
-def generate_sunburst_figure_4(data):
+def color_map():
+    """
+    Returns:
+        Dict[str, str]: The colors of the nodes of figure 4, with the colors of the causes of the
+        current mapping rules.
+    """
+    return {**COLORS_MAP_FIG_4, **mappings.current().injury_colors}
+
+def generate_sunburst_figure_4(data, expansions=None):
     """
     Generates a Sunburst chart visualizing the distribution of accident injuries and their causes.
 
+    When the raw causes are given, they form a third ring, hidden until a cause is clicked.
+
     Args:
         data (pd.DataFrame): The dataframe to display.
+        expansions (Dict[str, Tuple[List[str], pd.DataFrame]], optional): The raw causes of each cause
+            category, as returned by `drilldown.injury_expansions`.
 
     Returns:
-        go.Figure: A Plotly figure containing a Sunburst chart showing injury categories 
+        go.Figure: A Plotly figure containing a Sunburst chart showing injury categories
                    and their corresponding cause categories.
     """
+    ids = ["Total"]
     labels = ["Total"]
     parents = [""]
     values = [data["count"].sum()]
+    color_of = color_map()
+    colors = [color_of["Total"]]
 
     for inj in INJURY_CATEGORIES:
         mapped_inj = INJURY_LABEL_MAPPING.get(inj, inj.replace("_", " "))
         inj_sum = data[data["injury_category"] == inj]["count"].sum()
+        ids.append(mapped_inj)
         labels.append(mapped_inj)
         parents.append("Total")
         values.append(inj_sum)
+        colors.append(color_of.get(mapped_inj, "#bdc3c7"))
 
         for _, row in data[data["injury_category"] == inj].iterrows():
+            # The causes repeat under each injury: their ids must stay unique
+            cause_id = f"{mapped_inj}/{row['cause_category']}"
+            ids.append(cause_id)
             labels.append(row["cause_category"])
             parents.append(mapped_inj)
             values.append(row["count"])
+            colors.append(color_of.get(row["cause_category"], "#bdc3c7"))
+
+            if expansions is None or row["cause_category"] not in expansions:
+                continue
+            _, links = expansions[row["cause_category"]]
+            links = links[links["source"] == mapped_inj]
+            ids.extend(cause_id + "/" + links["target"])
+            labels.extend(links["target"])
+            parents.extend([cause_id] * len(links))
+            values.extend(links["value"])
+            colors.extend([colors[-1]] * len(links))
 
     fig = go.Figure(go.Sunburst(
+        ids=ids,
         labels=labels,
         parents=parents,
         values=values,
         branchvalues="total",
+        maxdepth=3,
         textfont=dict(size=17),
         marker=dict(
-            colors=[COLORS_MAP_FIG_4.get(label, "#bdc3c7") for label in labels],
+            colors=colors,
             line=dict(color='black', width=1)
         )
     ))
@@ -54,44 +89,65 @@ def generate_sunburst_figure_4(data):
 
     return fig
 
-def generate_sankey_figure_4(data):
+def sankey_links(data):
     """
-    Generates a Sankey diagram visualizing the distribution of injuries and their corresponding causes.
+    Lists the links of the Sankey diagram of figure 4: from the total to the injury categories,
+    and from each injury category to the causes.
 
     Args:
         data (pd.DataFrame): The dataframe to display.
 
     Returns:
-        go.Figure: A Plotly figure containing a Sankey diagram that illustrates the flow from total injuries
-                   to injury categories and their associated causes.
+        pd.DataFrame: The links, with 'source', 'target' and 'value' columns.
     """
-    node_labels = ["Total"]
-    injury_nodes = [INJURY_LABEL_MAPPING[i] for i in INJURY_CATEGORIES]
-    cause_nodes = list(data["cause_category"].unique())
-
-    node_labels.extend(injury_nodes)
-    node_labels.extend([c for c in cause_nodes])
-
-    label_to_index = {label: idx for idx, label in enumerate(node_labels)}
-
     sources = []
     targets = []
     values = []
 
     for inj in INJURY_CATEGORIES:
         inj_label = INJURY_LABEL_MAPPING[inj]
-        inj_total = data[data["injury_category"] == inj]["count"].sum()
+        inj_data = data[data["injury_category"] == inj]
 
-        sources.append(label_to_index["Total"])
-        targets.append(label_to_index[inj_label])
-        values.append(inj_total)
+        sources.append("Total")
+        targets.append(inj_label)
+        values.append(inj_data["count"].sum())
 
-        for _, row in data[data["injury_category"] == inj].iterrows():
-            sources.append(label_to_index[inj_label])
-            targets.append(label_to_index[row["cause_category"]])
-            values.append(row["count"])
+        sources.extend([inj_label] * len(inj_data))
+        targets.extend(inj_data["cause_category"])
+        values.extend(inj_data["count"])
+
+    return pd.DataFrame({"source": sources, "target": targets, "value": values})
 
-    node_colors = [COLORS_MAP_FIG_4.get(label, "#cccccc") for label in node_labels]
+def generate_sankey_figure_4(data):
+    """
+    Generates a Sankey diagram visualizing the distribution of injuries and their corresponding causes.
+
+    Args:
+        data (pd.DataFrame): The dataframe to display.
+
+    Returns:
+        go.Figure: A Plotly figure containing a Sankey diagram that illustrates the flow from total injuries
+                   to injury categories and their associated causes.
+    """
+    return draw_sankey_links(sankey_links(data))
+
+def draw_sankey_links(links, parents=None):
+    """
+    Draws the Sankey diagram of figure 4 from its links.
+
+    Args:
+        links (pd.DataFrame): The links, as returned by `sankey_links` or `drilldown.expand`.
+        parents (Dict[str, str], optional): The cause category of the nodes of raw causes, whose
+            color they take.
+
+    Returns:
+        go.Figure: The Sankey diagram.
+    """
+    node_labels = list(pd.unique(pd.concat([links["source"], links["target"]], ignore_index=True)))
+    label_to_index = {label: idx for idx, label in enumerate(node_labels)}
+    parents = parents or {}
+    color_of = color_map()
+    node_colors = [color_of.get(parents.get(label, label), "#cccccc") for label in node_labels]
 
     fig = go.Figure(go.Sankey(
         node=dict(
@@ -101,9 +157,9 @@ def generate_sankey_figure_4(data):
             color=node_colors
         ),
         link=dict(
-            source=sources,
-            target=targets,
-            value=values,
+            source=links["source"].map(label_to_index).tolist(),
+            target=links["target"].map(label_to_index).tolist(),
+            value=links["value"].tolist(),
             color="rgba(169, 169, 169, 0.6)",
             line=dict(color="rgba(169, 169, 169, 0.6)", width=2)
         )
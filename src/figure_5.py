@@ -0,0 +1,125 @@
+import functools
+
+import numpy as np
+
+import density
+import templates
+
+# Size of the map assumed before the browser reports the visible area
+MAP_WIDTH = 1000
+MAP_HEIGHT = 600
+
+@functools.lru_cache(maxsize=None)
+def template():
+    """
+    Builds the skeleton of figure 5 once: a map with one trace of markers, one per cell of the
+    density pyramid, colored on a logarithmic scale.
+
+    The figure is written as a dict since Plotly only validates the map traces
+    its version knows, while the renderer of Dash draws `scattermapbox` anyway.
+
+    Returns:
+        dict: The template of the figure.
+    """
+    return {
+        'data': [{
+            'type': 'scattermapbox',
+            'mode': 'markers',
+            'lon': [],
+            'lat': [],
+            'customdata': [],
+            'marker': {
+                'size': 16,
+                'color': [],
+                'colorscale': 'YlOrRd',
+                'opacity': 0.75,
+                'showscale': True,
+                'colorbar': {'title': {'text': 'Accidents'}},
+            },
+            'hovertemplate': '%{customdata} accidents<extra></extra>',
+        }],
+        'layout': {
+            'title': {
+                'text': '<b>Densité des accidents</b>',
+                'x': 0.5,
+                'xanchor': 'center',
+                'yanchor': 'top',
+                'y': 0.97,
+            },
+            'height': MAP_HEIGHT,
+            'margin': {'t': 60, 'b': 20, 'l': 20, 'r': 20},
+            'mapbox': {'style': 'open-street-map'},
+            # Keeps the position of the map chosen by the user when the bins are updated
+            'uirevision': 'map',
+            'paper_bgcolor': 'rgba(0, 0, 0, 0)',
+        },
+    }
+
+def draw(bins, zoom, level, center):
+    """
+    Draws the density map of figure 5.
+
+    Args:
+        bins (pd.DataFrame): The visible cells, as returned by `density.BinPyramid.query`.
+        zoom (float): The zoom level of the map.
+        level (int): The level of the cells.
+        center (dict): The 'lon' and 'lat' of the center of the map.
+
+    Returns:
+        dict: The figure.
+    """
+    changes = updates(bins, zoom, level) + [
+        (('layout', 'mapbox', 'center'), center),
+        (('layout', 'mapbox', 'zoom'), zoom),
+    ]
+    return templates.apply(template(), changes)
+
+def updates(bins, zoom, level):
+    """
+    Computes the markers of figure 5 for the visible cells.
+
+    Args:
+        bins (pd.DataFrame): The visible cells, as returned by `density.BinPyramid.query`.
+        zoom (float): The zoom level of the map.
+        level (int): The level of the cells.
+
+    Returns:
+        List[Tuple[tuple, Any]]: The (path, value) updates of the template, for `templates.apply`.
+    """
+    counts = bins['count'].to_numpy()
+    top = max(int(np.ceil(np.log10(counts.max()))), 1) if len(counts) else 1
+    ticks = np.arange(top + 1)
+    return [
+        (('data', 0, 'lon'), bins['longitude'].to_numpy()),
+        (('data', 0, 'lat'), bins['latitude'].to_numpy()),
+        (('data', 0, 'customdata'), counts),
+        (('data', 0, 'marker', 'color'), np.log10(counts)),
+        (('data', 0, 'marker', 'size'), round(density.cell_pixels(zoom, level))),
+        (('data', 0, 'marker', 'cmin'), 0),
+        (('data', 0, 'marker', 'cmax'), top),
+        (('data', 0, 'marker', 'colorbar', 'tickvals'), ticks),
+        (('data', 0, 'marker', 'colorbar', 'ticktext'), (10 ** ticks).astype(str)),
+    ]
+
+def viewport(relayout_data, center, zoom):
+    """
+    Reads the visible area of the map from its last move.
+
+    Args:
+        relayout_data (Optional[dict]): The `relayoutData` of the map graph.
+        center (dict): The center of the map before any move.
+        zoom (float): The zoom level of the map before any move.
+
+    Returns:
+        Tuple[dict, float, Tuple[float, float, float, float]]: The center, the zoom level and
+        the west, south, east and north limits of the visible area.
+    """
+    relayout_data = relayout_data or {}
+    if 'mapbox.zoom' in relayout_data:
+        zoom = relayout_data['mapbox.zoom']
+        center = relayout_data.get('mapbox.center', center)
+    corners = relayout_data.get('mapbox._derived', {}).get('coordinates')
+    if corners:
+        longitudes, latitudes = zip(*corners)
+        return center, zoom, (min(longitudes), min(latitudes), max(longitudes), max(latitudes))
+    return center, zoom, density.view_bounds(center, zoom, MAP_WIDTH, MAP_HEIGHT)
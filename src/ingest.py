@@ -0,0 +1,201 @@
+"""
+    Loading of the processed accidents, shared by the dashboard and the command line tools.
+
+    The source CSV is validated and preprocessed once, then saved to the
+    columnar store; later loads read the store back as long as the CSV does
+    not change. The preprocessing can be split over several processes (see
+    `partitions.py`). Nothing here imports Dash, so the batch tools can load the
+    data without starting the dashboard.
+"""
+import json
+import logging
+import pathlib
+import time
+
+import pandas as pd
+
+import mappings
+import partitions
+import preprocess
+import store
+import validation
+
+PATH = pathlib.Path(__file__).parent
+DATA_PATH = PATH.joinpath("data").resolve()
+CACHE_PATH = PATH.joinpath("cache").resolve()
+SOURCE_PATH = DATA_PATH.joinpath("traffic_accidents.csv")
+STORE_PATH = CACHE_PATH.joinpath("accidents")
+QUARANTINE_PATH = CACHE_PATH.joinpath("quarantine.csv")
+# Fingerprints of the mapping rules the categories of the store were computed with
+STORE_MAPPINGS_PATH = STORE_PATH.joinpath("_mappings.json")
+
+
+def data_version(path):
+    """
+    Returns a string identifying the current version of a data file, as validated.
+
+    Args:
+        path (pathlib.Path): The data file.
+
+    Returns:
+        str: The size and modification time of the file, and the version of the checks deciding
+        which of its rows are kept.
+    """
+    stat = path.stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}-{validation.VERSION}"
+
+
+def preprocess_file(path, workers=1) :
+    """
+    Validates and preprocesses a CSV file of accidents, in this process or with a pool of processes.
+
+    Args:
+        path (pathlib.Path): The CSV file.
+        workers (int, optional): The number of processes. Defaults to 1.
+
+    Returns:
+        tuple: A tuple containing:
+            - The processed accidents, sorted by date.
+            - The rejected accidents.
+            - The number of rows failing each check.
+            - The `partitions.Aggregates` of the processed accidents, or None when they were
+              preprocessed in this process.
+            - The throughput, in rows per second and per worker.
+    """
+    if workers > 1:
+        result = partitions.preprocess_parallel(path, workers)
+        if result is not None:
+            return result
+        logging.getLogger(__name__).warning(
+            "%s has rows spanning several lines and cannot be split: preprocessing it in this "
+            "process", path)
+
+    started = time.perf_counter()
+    df = pd.read_csv(path)
+    df, quarantine, summary = validation.validate(df)
+    data = preprocess.convert_types(df)
+    data = preprocess.add_season(data)
+    data = preprocess.map_categories(data)
+    data = data.sort_values('crash_date', kind='stable', ignore_index=True)
+    throughput = (len(data) + len(quarantine)) / (time.perf_counter() - started)
+    return data, quarantine, summary, None, throughput
+
+
+def load_data(workers=1) :
+    """
+    Loads the traffic accident data from a CSV file, processes it, and returns the cleaned
+    DataFrame. See `load`.
+
+    Args:
+        workers (int, optional): The number of processes preprocessing the CSV. Defaults to 1.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the processed traffic accident data, sorted by date.
+    """
+    return load(workers)[0]
+
+
+def load(workers=1, source_path=SOURCE_PATH, cache_path=CACHE_PATH) :
+    """
+    Loads the traffic accident data from a CSV file, processes it, and returns the cleaned
+    DataFrame. The rows failing validation are set aside in the quarantine file before
+    preprocessing.
+    The processed data is also saved to the columnar store when it is outdated, and read back
+    from it when it is current, which avoids preprocessing the CSV again at every start.
+    The category columns read back are only computed again when their mapping rules changed.
+
+    With several workers, the CSV is preprocessed in parallel by byte ranges (see `partitions.py`),
+    which also gives the aggregates of the figures, merged from those of the ranges.
+
+    Args:
+        workers (int, optional): The number of processes preprocessing the CSV. Defaults to 1.
+        source_path (pathlib.Path, optional): The CSV file. Defaults to SOURCE_PATH.
+        cache_path (pathlib.Path, optional): The directory of the store and of the quarantine
+            file. Defaults to CACHE_PATH.
+
+    Returns:
+        Tuple[pd.DataFrame, partitions.Aggregates]: The processed traffic accident data, sorted
+        by date, and its aggregates, or None when the data was not preprocessed in parallel.
+    """
+    store_path = cache_path.joinpath(STORE_PATH.name)
+    quarantine_path = cache_path.joinpath(QUARANTINE_PATH.name)
+    fingerprints_path = store_path.joinpath(STORE_MAPPINGS_PATH.name)
+    version = data_version(source_path)
+    rules = mappings.current()
+    if store.available() and store.is_current(store_path, version):
+        data = store.read_store(store_path)
+        stale = stale_dimensions(rules, fingerprints_path)
+        if stale:
+            mappings.CategoryCodes(data, stale).apply(data, rules)
+            store.write_store(data, store_path, version)
+            write_fingerprints(rules, fingerprints_path)
+        return data, None
+
+    started = time.perf_counter()
+    data, quarantine, summary, aggregates, throughput = preprocess_file(source_path, workers)
+    logging.getLogger(__name__).info(
+        "%d rows preprocessed in %.1f s with %d worker(s): %.0f rows/s per core",
+        len(data) + len(quarantine), time.perf_counter() - started, workers, throughput)
+
+    validation.write_quarantine(quarantine, summary, quarantine_path)
+    log_validation(quarantine, summary, quarantine_path)
+
+    if store.available():
+        store.write_store(data, store_path, version)
+        write_fingerprints(rules, fingerprints_path)
+    return data, aggregates
+
+
+def log_validation(quarantine, summary, path):
+    """
+    Logs the rows quarantined, and apart the raw values unknown to the mapping rules.
+
+    Args:
+        quarantine (pd.DataFrame): The rejected accidents, as returned by `validation.validate`.
+        summary (pd.Series): The number of rows failing each check, as returned by
+            `validation.validate`.
+        path (pathlib.Path): The quarantine file.
+    """
+    unmapped = summary.index.str.startswith('unmapped ')
+    if len(quarantine):
+        logging.getLogger(__name__).warning(
+            "%d rows quarantined in %s: %s", len(quarantine), path,
+            ", ".join(f"{reason} ({count})"
+                      for reason, count in summary[~unmapped & (summary > 0)].items()))
+    if summary[unmapped].any():
+        logging.getLogger(__name__).warning(
+            "Raw values unknown to the mapping rules, counted in 'Autre': %s",
+            ", ".join(f"{reason} ({count})"
+                      for reason, count in summary[unmapped & (summary > 0)].items()))
+
+
+def stale_dimensions(rules, path=STORE_MAPPINGS_PATH):
+    """
+    Compares the mapping rules with those the categories of the store were computed with.
+
+    Args:
+        rules (mappings.MappingRules): The current rules.
+        path (pathlib.Path, optional): The file of the fingerprints, in the store.
+            Defaults to STORE_MAPPINGS_PATH.
+
+    Returns:
+        List[str]: The category columns whose rules changed since, all of them without the file.
+    """
+    saved = {}
+    if path.exists():
+        saved = json.loads(path.read_text(encoding='utf-8'))
+    return [dimension for dimension in rules.lookups
+            if saved.get(dimension) != rules.fingerprint(dimension)]
+
+
+def write_fingerprints(rules, path=STORE_MAPPINGS_PATH):
+    """
+    Saves the fingerprints of the mapping rules the categories of the store were computed with.
+
+    Args:
+        rules (mappings.MappingRules): The rules.
+        path (pathlib.Path, optional): The file of the fingerprints, in the store.
+            Defaults to STORE_MAPPINGS_PATH.
+    """
+    fingerprints = {dimension: rules.fingerprint(dimension) for dimension in rules.lookups}
+    path.write_text(json.dumps(fingerprints), encoding='utf-8')
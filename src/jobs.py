@@ -0,0 +1,68 @@
+"""
+    Background job manager for the expensive ad-hoc analyses.
+
+    Background callbacks run in a separate process started by Dash, so they
+    never block the threads serving the other requests. Their state, their
+    progress and their results are kept in a local diskcache directory: no
+    external broker is needed. Results are cached by the callback inputs and
+    by the version of the data file (and, for the jobs grouping the
+    accidents by category, of the mapping rules), so a job is only computed
+    once per combination of inputs until the data changes.
+
+    diskcache and the process pool of Dash are only loaded when the first
+    background callback runs, not when the app starts.
+"""
+import threading
+
+from ingest import data_version
+
+JOB_EXPIRE = 24 * 60 * 60  # seconds
+
+
+class LazyManager:
+    """
+    Stands for a background callback manager, created when Dash first uses it.
+
+    Dash only reads the manager given to the app or to a callback when a background callback
+    is requested, and a manager registers every background callback declared before it, so
+    the creation can wait until then.
+    """
+
+    def __init__(self, factory):
+        """
+        Args:
+            factory (Callable[[], DiskcacheManager]): Creates the manager.
+        """
+        self._factory = factory
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._factory()
+        return getattr(self._manager, name)
+
+
+def create_manager(cache_path, data_file, cache_by=()):
+    """
+    Creates the manager running the background callbacks of the app.
+
+    Args:
+        cache_path (pathlib.Path): The directory of the job cache.
+        data_file (pathlib.Path): The data file the results depend on.
+        cache_by (List[Callable[[], str]], optional): Other versions the results depend on.
+
+    Returns:
+        LazyManager: The background callback manager, a DiskcacheManager created on first use.
+    """
+    def factory():
+        # pylint: disable=import-outside-toplevel
+        import diskcache
+        from dash import DiskcacheManager
+
+        cache = diskcache.Cache(str(cache_path))
+        return DiskcacheManager(cache, cache_by=[lambda: data_version(data_file), *cache_by],
+                                expire=JOB_EXPIRE)
+
+    return LazyManager(factory)
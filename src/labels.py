@@ -0,0 +1,65 @@
+"""
+    Vectorized generation of the labels and hover texts of the figures.
+
+    The labels are built with numpy string operations on whole arrays instead
+    of formatting every point in a Python loop. Numbers are converted with
+    `astype(str)`, which gives the same text as `str()` on each value.
+"""
+import numpy as np
+
+
+def as_text(values):
+    """
+    Converts values to an array of strings.
+
+    Args:
+        values (array-like | scalar): The values to convert.
+
+    Returns:
+        np.ndarray: The values as strings.
+    """
+    return np.asarray(values).astype(str)
+
+
+def concat(*parts):
+    """
+    Concatenates strings and arrays element-wise, broadcasting the scalars.
+
+    Args:
+        *parts (str | array-like): The parts of the labels.
+
+    Returns:
+        np.ndarray: The concatenated labels.
+    """
+    result = as_text(parts[0])
+    for part in parts[1:]:
+        result = np.char.add(result, as_text(part))
+    return result
+
+
+def where_positive(values, labels):
+    """
+    Keeps the labels of the strictly positive values and blanks the others.
+
+    Args:
+        values (array-like): The values labelled.
+        labels (array-like): One label per value.
+
+    Returns:
+        List[str]: The labels, or '' where the value is not positive.
+    """
+    return np.where(np.asarray(values) > 0, labels, '').tolist()
+
+
+def count_labels(values):
+    """
+    Labels counts with their integer value, and zero counts with ''.
+
+    Args:
+        values (array-like): The counts, as integers or floats.
+
+    Returns:
+        List[str]: The labels.
+    """
+    values = np.asarray(values)
+    return where_positive(values, as_text(values.astype(np.int64)))
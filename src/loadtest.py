@@ -0,0 +1,563 @@
+"""
+    Load-testing harness for the dashboard callbacks.
+
+    Virtual users replay dashboard sessions against the `/_dash-update-component`
+    endpoint of a server, exactly like the Dash renderer does: year-slider drags,
+    season toggles, resolution changes, day-checklist changes, date-range picks
+    and injury tab switches. Each user keeps the state the browser would keep
+    (button classes, and the `figure1-state` store of the selected seasons of
+    figure 1), so the request bodies have realistic sizes.
+
+    Sessions are either generated (synthetic, reproducible with --seed) or
+    replayed from a JSON file previously written with --record. The run is
+    repeated at increasing concurrency levels, and the throughput, the latency
+    percentiles and the error rate are reported per callback. Every level
+    replays the same sessions, so --record only saves those of the first level.
+
+    Usage:
+        python ./src/loadtest.py --start-server --concurrency 1 4 16 --sessions 20
+        python ./src/loadtest.py --url http://localhost:8050 --replay sessions.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+import mappings
+from const import DAY_ORDER, SEASON_ORDER
+from debounce import CLIENT_COOKIE
+
+SEASON_BUTTONS = [f'button-{season}' for season in SEASON_ORDER]
+RESOLUTIONS = ['season', 'month', 'week', 'day']
+YEARS = list(range(2018, 2025))
+FIRST_DATE = date(2018, 1, 1)
+LAST_DATE = date(2024, 12, 31)
+# Area of the accidents on the density map
+MAP_LONGITUDES = (-87.94, -87.52)
+MAP_LATITUDES = (41.64, 42.02)
+
+# Callback function names in app.py, by Dash callback id
+CALLBACK_NAMES = {
+    'dynamic-title.children': 'update_dynamic_title',
+    '..' + '...'.join(f'{b}.className' for b in SEASON_BUTTONS)
+    + '...figure1.figure...figure1-state.data..': 'update_figure_1',
+    'radar-graph.figure': 'update_figure_2',
+    'injury-graph.figure': 'switch_injury_graph',
+    'sankey-graph.figure': 'expand_sankey_node',
+    'map-graph.figure': 'update_map',
+    '..injury-title.children...injury-description.children..': 'update_injury_section',
+}
+
+
+def _prop(component_id, prop, value=None):
+    """
+    Builds the description of a callback input or state, as sent by the Dash renderer.
+    """
+    return {'id': component_id, 'property': prop, 'value': value}
+
+
+def _output_id(outputs):
+    """
+    Builds the callback id used by Dash to find the callback from its outputs.
+    """
+    if len(outputs) == 1:
+        return f"{outputs[0]['id']}.{outputs[0]['property']}"
+    return '..' + '...'.join(f"{o['id']}.{o['property']}" for o in outputs) + '..'
+
+
+def build_payload(outputs, inputs, state=(), changed=()):
+    """
+    Builds the JSON body of a `/_dash-update-component` request.
+
+    Args:
+        outputs (List[Tuple[str, str]]): The (id, property) pairs of the callback outputs.
+        inputs (List[dict]): The inputs of the callback, built with `_prop`.
+        state (List[dict], optional): The states of the callback, built with `_prop`.
+        changed (List[str], optional): The ids of the inputs that triggered the callback.
+
+    Returns:
+        dict: The request body.
+    """
+    outputs = [{'id': i, 'property': p} for i, p in outputs]
+    return {
+        'output': _output_id(outputs),
+        'outputs': outputs if len(outputs) > 1 else outputs[0],
+        'inputs': list(inputs),
+        'state': list(state),
+        'changedPropIds': list(changed),
+    }
+
+
+class VirtualUser:
+    """
+    Holds the client-side state of one browser tab and builds the requests
+    the Dash renderer sends when the user interacts with the page.
+    """
+
+    def __init__(self):
+        self.year_range = [YEARS[0], YEARS[-1]]
+        self.resolution = 'season'
+        self.classes = {button: 'button-season selected' for button in SEASON_BUTTONS}
+        self.clicks = {button: None for button in SEASON_BUTTONS}
+        self.figure1_state = {'seasons': list(SEASON_ORDER)}
+        self.days = list(DAY_ORDER)
+        self.dates = [FIRST_DATE.isoformat(), LAST_DATE.isoformat()]
+        self.tab = 'sunburst'
+        self.map_view = None
+
+    def figure_1_request(self, changed):
+        """
+        Builds the request of `update_figure_1`, triggered by `changed`.
+        """
+        return build_payload(
+            [(button, 'className') for button in SEASON_BUTTONS]
+            + [('figure1', 'figure'), ('figure1-state', 'data')],
+            [_prop('year-slider', 'value', self.year_range),
+             _prop('resolution-radio', 'value', self.resolution)]
+            + [_prop(button, 'n_clicks', self.clicks[button]) for button in SEASON_BUTTONS],
+            [_prop('figure1-state', 'data', self.figure1_state)],
+            [changed],
+        )
+
+    def map_request(self, changed):
+        """
+        Builds the request of `update_map`, triggered by `changed`.
+        """
+        return build_payload(
+            [('map-graph', 'figure')],
+            [_prop('map-graph', 'relayoutData', self.map_view),
+             _prop('year-slider', 'value', self.year_range),
+             _prop('day-checklist', 'value', self.days)]
+            + [_prop(button, 'className', self.classes[button]) for button in SEASON_BUTTONS],
+            changed=[changed],
+        )
+
+    def title_request(self, changed='year-slider.value'):
+        """
+        Builds the request of `update_dynamic_title`, triggered by `changed`.
+        """
+        return build_payload(
+            [('dynamic-title', 'children')],
+            [_prop('year-slider', 'value', self.year_range),
+             _prop('resolution-radio', 'value', self.resolution)],
+            changed=[changed],
+        )
+
+    def figure_2_request(self, *changed):
+        """
+        Builds the request of `update_figure_2`, triggered by the properties in `changed`.
+        """
+        return build_payload(
+            [('radar-graph', 'figure')],
+            [_prop('day-checklist', 'value', self.days),
+             _prop('date-picker-range', 'start_date', self.dates[0]),
+             _prop('date-picker-range', 'end_date', self.dates[1]),
+             _prop('radar-exact', 'data', None)],
+            changed=changed,
+        )
+
+    def injury_requests(self):
+        """
+        Builds the two requests triggered by the injury tabs.
+        """
+        return [
+            build_payload([('injury-graph', 'figure')],
+                          [_prop('injury-tabs', 'value', self.tab),
+                           _prop('injury-graph', 'clickData')],
+                          changed=['injury-tabs.value']),
+            build_payload([('injury-title', 'children'), ('injury-description', 'children')],
+                          [_prop('injury-tabs', 'value', self.tab)],
+                          changed=['injury-tabs.value']),
+        ]
+
+    def sankey_request(self, label):
+        """
+        Builds the request of `expand_sankey_node`, for a click on the node with the given label.
+        """
+        return build_payload([('sankey-graph', 'figure')],
+                             [_prop('sankey-graph', 'clickData', {'points': [{'label': label}]})],
+                             changed=['sankey-graph.clickData'])
+
+    def apply_response(self, body):
+        """
+        Updates the client-side state from the response of a callback.
+
+        Args:
+            body (dict): The decoded JSON response of the server.
+        """
+        response = body.get('response', {})
+        for button in SEASON_BUTTONS:
+            if 'className' in response.get(button, {}):
+                self.classes[button] = response[button]['className']
+        if 'data' in response.get('figure1-state', {}):
+            self.figure1_state = response['figure1-state']['data']
+
+
+def drag_slider(user, rng, _):
+    """
+    Moves one handle of the year slider. The slider only sends its value when the handle is
+    released (`updatemode='mouseup'`), so a drag triggers its callbacks once.
+    """
+    user.year_range[rng.randrange(2)] = rng.choice(YEARS)
+    user.year_range = sorted(user.year_range)
+    yield user.figure_1_request('year-slider.value')
+    yield user.title_request()
+    yield user.map_request('year-slider.value')
+
+
+def toggle_season(user, rng, _):
+    """
+    Clicks one of the season buttons of figure 1.
+    """
+    button = rng.choice(SEASON_BUTTONS)
+    user.clicks[button] = (user.clicks[button] or 0) + 1
+    yield user.figure_1_request(f'{button}.n_clicks')
+    yield user.map_request(f'{button}.className')
+
+
+def change_resolution(user, rng, _):
+    """
+    Picks another resolution for figure 1.
+    """
+    user.resolution = rng.choice([r for r in RESOLUTIONS if r != user.resolution])
+    yield user.figure_1_request('resolution-radio.value')
+    yield user.title_request('resolution-radio.value')
+
+
+def change_days(user, rng, _):
+    """
+    Checks or unchecks one day of the checklist of figure 2.
+    """
+    day = rng.choice(DAY_ORDER)
+    if day in user.days:
+        user.days = [d for d in user.days if d != day]
+    else:
+        user.days = [d for d in DAY_ORDER if d in user.days or d == day]
+    yield user.figure_2_request('day-checklist.value')
+    yield user.map_request('day-checklist.value')
+
+
+def pick_dates(user, rng, _):
+    """
+    Picks a new date range in the date picker of figure 2. The picker only sends the dates once
+    both ends are picked (`updatemode='bothdates'`), so the range triggers a single request.
+    """
+    span = (LAST_DATE - FIRST_DATE).days
+    start = FIRST_DATE + timedelta(days=rng.randrange(span))
+    end = start + timedelta(days=rng.randrange((LAST_DATE - start).days + 1))
+    user.dates = [start.isoformat(), end.isoformat()]
+    yield user.figure_2_request('date-picker-range.start_date', 'date-picker-range.end_date')
+
+
+def switch_tab(user, _rng, _):
+    """
+    Switches the injury tab.
+    """
+    user.tab = 'sankey' if user.tab == 'sunburst' else 'sunburst'
+    yield from user.injury_requests()
+
+
+def expand_node(user, rng, _):
+    """
+    Clicks a category of figure 3 to expand it, then a raw value to collapse it.
+    """
+    yield user.sankey_request(rng.choice(list(mappings.current().colors)))
+    yield user.sankey_request('UNKNOWN')
+
+
+def move_map(user, rng, map_moves):
+    """
+    Pans and zooms the density map around the city, one move at a time.
+    """
+    zoom = (user.map_view or {}).get('mapbox.zoom', 10.5)
+    for _ in range(rng.randint(1, map_moves)):
+        zoom = min(max(zoom + rng.choice([-1, 0, 0, 1]), 9), 16)
+        lon, lat = rng.uniform(*MAP_LONGITUDES), rng.uniform(*MAP_LATITUDES)
+        half_width, half_height = 360 / 2 ** zoom * 2, 180 / 2 ** zoom * 2
+        user.map_view = {
+            'mapbox.center': {'lon': lon, 'lat': lat},
+            'mapbox.zoom': zoom,
+            'mapbox._derived': {'coordinates': [
+                [lon - half_width, lat + half_height], [lon + half_width, lat + half_height],
+                [lon + half_width, lat - half_height], [lon - half_width, lat - half_height],
+            ]},
+        }
+        yield user.map_request('map-graph.relayoutData')
+
+
+# Relative frequency of each interaction in synthetic sessions
+ACTIONS = [
+    (drag_slider, 3),
+    (toggle_season, 2),
+    (change_resolution, 1),
+    (change_days, 2),
+    (pick_dates, 2),
+    (switch_tab, 1),
+    (expand_node, 1),
+    (move_map, 2),
+]
+
+
+def synthetic_session(rng, n_actions, think_time):
+    """
+    Generates the script of one synthetic session.
+
+    The payloads depending on the server responses (button classes, `figure1-state` store)
+    are built lazily while the session is replayed, so a step is a generator
+    factory rather than a fixed payload.
+
+    Args:
+        rng (random.Random): The random generator.
+        n_actions (int): The number of user interactions in the session.
+        think_time (float): The mean pause between two interactions, in seconds.
+
+    Returns:
+        List[Tuple[Callable, int, float]]: The actions, their seed and the pause before each one.
+    """
+    actions, weights = zip(*ACTIONS)
+    return [
+        (action, rng.randrange(2 ** 32), rng.expovariate(1 / think_time) if think_time else 0)
+        for action in rng.choices(actions, weights, k=n_actions)
+    ]
+
+
+def session_requests(script, map_moves):
+    """
+    Yields the (payload, think time) pairs of a synthetic session, together
+    with the virtual user whose state must be updated with each response.
+    The map is moved at most `map_moves` times per interaction.
+    """
+    user = VirtualUser()
+    for action, seed, think in script:
+        first = True
+        for payload in action(user, random.Random(seed), map_moves):
+            yield user, payload, think if first else 0
+            first = False
+
+
+def recorded_requests(steps):
+    """
+    Yields the (payload, think time) pairs of a recorded session.
+    """
+    for step in steps:
+        yield None, step['payload'], step.get('think', 0)
+
+
+class Stats:
+    """
+    Thread-safe collection of the latencies and errors of each callback.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.request_bytes = defaultdict(int)
+
+    def add(self, name, latency, ok, size):
+        with self.lock:
+            if ok:
+                self.latencies[name].append(latency)
+            else:
+                self.errors[name] += 1
+            self.request_bytes[name] += size
+
+
+def post(url, payload, client, timeout=60):
+    """
+    Posts a callback request and measures its latency.
+
+    Args:
+        url (str): The base url of the server.
+        payload (dict): The request body.
+        client (str): The client id cookie of the virtual user, as set by the server for a browser.
+        timeout (float, optional): The timeout of the request, in seconds.
+
+    Returns:
+        Tuple[float, bool, dict, int]: The latency in seconds, whether the request
+        succeeded, the decoded response and the size of the request body.
+    """
+    data = json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(
+        url.rstrip('/') + '/_dash-update-component',
+        data=data,
+        headers={'Content-Type': 'application/json', 'Cookie': f'{CLIENT_COOKIE}={client}'},
+    )
+    start = time.perf_counter()
+    body = {}
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            content = response.read()
+            ok = response.status in (200, 204)
+            if response.status == 200:
+                body = json.loads(content)
+    except (OSError, ValueError):
+        ok = False
+    return time.perf_counter() - start, ok, body, len(data)
+
+
+def replay(url, requests, stats, sleep, record=None):
+    """
+    Replays one session, waiting between interactions when `sleep` is set.
+    The payloads sent are appended to `record` when it is given.
+    """
+    client = uuid.uuid4().hex
+    for user, payload, think in requests:
+        if record is not None:
+            record.append({'payload': payload, 'think': think})
+        if sleep and think:
+            time.sleep(think)
+        latency, ok, body, size = post(url, payload, client)
+        stats.add(CALLBACK_NAMES.get(payload['output'], payload['output']), latency, ok, size)
+        if user is not None and ok:
+            user.apply_response(body)
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile (0-100) of the given values, using the nearest rank.
+    """
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def run_level(url, sessions, concurrency, sleep, records=None):
+    """
+    Replays all the sessions with `concurrency` virtual users in parallel.
+
+    Returns:
+        Tuple[Stats, float]: The collected statistics and the elapsed time in seconds.
+    """
+    stats = Stats()
+    records = records if records is not None else [None] * len(sessions)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(replay, url, requests(), stats, sleep, record)
+                   for requests, record in zip(sessions, records)]
+        for future in futures:
+            future.result()
+    return stats, time.perf_counter() - start
+
+
+def report(concurrency, stats, elapsed):
+    """
+    Prints the statistics of one concurrency level.
+    """
+    print(f"\nconcurrency={concurrency}  ({elapsed:.1f}s)")
+    print(f"{'callback':<24}{'req/s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{'p99 (ms)':>10}{'errors':>9}{'req KB':>9}")
+    for name in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = stats.latencies[name]
+        total = len(latencies) + stats.errors[name]
+        print(f"{name:<24}{len(latencies) / elapsed:>9.1f}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}"
+              f"{percentile(latencies, 95) * 1000:>10.1f}"
+              f"{percentile(latencies, 99) * 1000:>10.1f}"
+              f"{stats.errors[name] / total:>9.1%}"
+              f"{stats.request_bytes[name] / total / 1024:>9.1f}")
+
+
+def check_callbacks(url, sessions):
+    """
+    Checks that every callback used by the sessions is registered on the server,
+    using the callback list the Dash renderer downloads at startup.
+    """
+    with urllib.request.urlopen(url.rstrip('/') + '/_dash-dependencies') as response:
+        registered = {dependency['output'] for dependency in json.loads(response.read())}
+    used = {payload['output'] for requests in sessions for _, payload, _ in requests()}
+    missing = used - registered
+    if missing:
+        sys.exit(f"Unknown callbacks on the server: {', '.join(sorted(missing))}")
+
+
+def start_server(port, workers, threads):
+    """
+    Starts the production server of this repository and waits until it answers.
+
+    Returns:
+        subprocess.Popen: The server process.
+    """
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name('server.py')), '--prod',
+         '--port', str(port), '--workers', str(workers), '--threads', str(threads)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://localhost:{port}'
+    for _ in range(300):
+        try:
+            with urllib.request.urlopen(url + '/_dash-layout', timeout=1):
+                return process, url
+        except OSError:
+            if process.poll() is not None:
+                sys.exit('The server exited before answering.')
+            time.sleep(0.5)
+    process.terminate()
+    sys.exit('The server did not start in time.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the dashboard callbacks.')
+    parser.add_argument('--url', default='http://localhost:8050')
+    parser.add_argument('--start-server', action='store_true',
+                        help='Start `server.py --prod` locally and test it.')
+    parser.add_argument('--port', type=int, default=8051)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--sessions', type=int, default=16, help='Synthetic sessions per level.')
+    parser.add_argument('--actions', type=int, default=10, help='Interactions per session.')
+    parser.add_argument('--map-moves', type=int, default=6,
+                        help='Maximum pans and zooms of the map per interaction.')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Mean pause between interactions, in seconds.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replay', type=Path, help='Replay the sessions of a recorded JSON file.')
+    parser.add_argument('--record', type=Path,
+                        help='Save the sessions replayed at the first concurrency level to a JSON '
+                             'file.')
+    args = parser.parse_args()
+
+    if args.replay:
+        recorded = json.loads(args.replay.read_text(encoding='utf-8'))
+        sessions = [lambda s=session: recorded_requests(s['steps']) for session in recorded]
+    else:
+        rng = random.Random(args.seed)
+        scripts = [synthetic_session(rng, args.actions, args.think_time)
+                   for _ in range(args.sessions)]
+        sessions = [lambda s=script: session_requests(s, args.map_moves) for script in scripts]
+
+    process = None
+    url = args.url
+    if args.start_server:
+        process, url = start_server(args.port, args.workers, args.threads)
+    try:
+        check_callbacks(url, sessions)
+        recorded_steps = records = [[] for _ in sessions] if args.record else None
+        for concurrency in args.concurrency:
+            stats, elapsed = run_level(url, sessions, concurrency, args.think_time > 0, records)
+            report(concurrency, stats, elapsed)
+            records = None
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.record:
+        args.record.write_text(json.dumps([{'steps': steps} for steps in recorded_steps]),
+                               encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+    Rules grouping the raw values of the accidents into the categories of the figures.
+
+    The rules are read from `mappings.json`: for each category column, the
+    raw values of each category, its colors, and the raw values left in
+    'Autre' on purpose. The file carries a version, which must be increased
+    with every change: it is the key under which the results depending on
+    the rules are cached.
+
+    The rules are compiled into one dictionary per column, from raw value to
+    category. The raw values are factorized once into integer codes, so the
+    categories of all the rows are found by looking up the few distinct raw
+    values, then taking the result by code. When the file changes while the
+    dashboard runs, only the columns whose rules changed are recomputed, from
+    the same codes, and the caller is told which ones, so it only invalidates
+    the aggregates depending on them.
+"""
+import hashlib
+import json
+import logging
+import pathlib
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from const import RAW_COLUMNS
+
+MAPPINGS_PATH = pathlib.Path(__file__).parent.joinpath("mappings.json")
+DEFAULT_CATEGORY = "Autre"
+CHECK_INTERVAL = 1.0  # seconds
+
+_current = None
+_modified = None
+_checked = 0.0
+_lock = threading.RLock()
+
+
+class MappingRules:
+    """
+    The compiled rules of one version of the mapping file.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config (dict): The content of the mapping file.
+
+        Raises:
+            ValueError: If the version is not an integer, a column is unknown,
+                or a raw value belongs to several categories of the same column.
+        """
+        if not isinstance(config.get("version"), int):
+            raise ValueError("The mapping file must have an integer 'version'.")
+        unknown = set(config["dimensions"]) - set(RAW_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown category columns: {sorted(unknown)}")
+
+        self.version = config["version"]
+        self.config = config["dimensions"]
+        self.lookups = {}
+        for dimension, rules in self.config.items():
+            lookup = {}
+            for category, category_rules in rules["categories"].items():
+                for value in category_rules["values"]:
+                    if lookup.setdefault(value, category) != category:
+                        raise ValueError(
+                            f"{value!r} is mapped to both {lookup[value]!r} and {category!r}.")
+            self.lookups[dimension] = lookup
+        self.colors = self._colors("color")
+        self.injury_colors = self._colors("injury_color")
+
+    def _colors(self, key):
+        """
+        Returns:
+            Dict[str, str]: The color of each category having one, under the given key.
+        """
+        return {category: category_rules[key]
+                for rules in self.config.values()
+                for category, category_rules in rules["categories"].items()
+                if key in category_rules}
+
+    def groups(self, dimension):
+        """
+        Args:
+            dimension (str): The category column.
+
+        Returns:
+            Dict[str, List[str]]: The raw values of each category of the column.
+        """
+        return {category: category_rules["values"]
+                for category, category_rules in self.config[dimension]["categories"].items()}
+
+    def known_values(self, dimension):
+        """
+        Args:
+            dimension (str): The category column.
+
+        Returns:
+            List[str]: The raw values known in the column: the mapped ones, and those left in
+            'Autre' on purpose. The validation reports the others.
+        """
+        return list(self.lookups[dimension]) + self.config[dimension].get("other", [])
+
+    def labels(self, dimension, values):
+        """
+        Finds the categories of some distinct raw values.
+
+        Args:
+            dimension (str): The category column.
+            values (array-like): The distinct raw values.
+
+        Returns:
+            np.ndarray: The category of each value, followed by 'Autre' for the missing values.
+        """
+        lookup = self.lookups[dimension]
+        return np.array([lookup.get(value, DEFAULT_CATEGORY) for value in values]
+                        + [DEFAULT_CATEGORY], dtype=object)
+
+    def fingerprint(self, dimension):
+        """
+        Args:
+            dimension (str): The category column.
+
+        Returns:
+            str: A hash of the categories given to the raw values of the column, ignoring the
+            colors and the raw values left in 'Autre' on purpose.
+        """
+        content = json.dumps(sorted(self.lookups[dimension].items()), ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def changed_dimensions(self, other):
+        """
+        Args:
+            other (MappingRules): Other rules, usually the previous version.
+
+        Returns:
+            List[str]: The category columns whose raw values are not grouped the same way by
+            both rules.
+        """
+        return [dimension for dimension in RAW_COLUMNS
+                if dimension in self.lookups
+                and self.lookups[dimension] != other.lookups.get(dimension)]
+
+
+class CategoryCodes:
+    """
+    The raw values of the mapped columns of the accidents, factorized once into integer codes.
+    """
+
+    def __init__(self, df, dimensions=None):
+        """
+        Args:
+            df (pd.DataFrame): The accidents, with the raw columns of `const.RAW_COLUMNS`.
+            dimensions (List[str], optional): The category columns to prepare.
+                Defaults to all of them.
+        """
+        # A missing value gets the code -1, which picks the trailing 'Autre' of
+        # `MappingRules.labels`
+        self.codes = {dimension: pd.factorize(df[RAW_COLUMNS[dimension]])
+                      for dimension in (RAW_COLUMNS if dimensions is None else dimensions)}
+
+    def apply(self, df, rules, dimensions=None):
+        """
+        Writes the category columns of the accidents, in place.
+
+        Args:
+            df (pd.DataFrame): The accidents this object was built from.
+            rules (MappingRules): The rules to apply.
+            dimensions (List[str], optional): The category columns to write.
+                Defaults to all the prepared ones.
+
+        Returns:
+            pd.DataFrame: The accidents.
+        """
+        for dimension in self.codes if dimensions is None else dimensions:
+            codes, uniques = self.codes[dimension]
+            df[dimension] = rules.labels(dimension, uniques)[codes]
+        return df
+
+
+def load(path=MAPPINGS_PATH):
+    """
+    Reads and compiles the mapping file.
+
+    Args:
+        path (pathlib.Path, optional): The mapping file.
+
+    Returns:
+        MappingRules: The rules.
+    """
+    return MappingRules(json.loads(path.read_text(encoding="utf-8")))
+
+
+def current():
+    """
+    Returns:
+        MappingRules: The rules in use, read from the mapping file on the first call.
+    """
+    global _current, _modified
+    with _lock:
+        if _current is None:
+            _modified = MAPPINGS_PATH.stat().st_mtime_ns
+            _current = load()
+        return _current
+
+
+def refresh(on_change, path=MAPPINGS_PATH):
+    """
+    Reads the mapping file again when it was modified, makes its rules the current ones if its
+    version changed, then calls `on_change` while the other reloads wait. A file which cannot
+    be read, or whose content changed without a new version, is ignored with an error in the
+    log, and the current rules are kept.
+
+    Args:
+        on_change (Callable[[MappingRules, MappingRules], None]): Called with the previous
+            and the new rules.
+        path (pathlib.Path, optional): The mapping file.
+
+    Returns:
+        bool: Whether the rules changed.
+    """
+    global _current, _modified
+    with _lock:
+        previous = current()
+        try:
+            modified = path.stat().st_mtime_ns
+            if modified == _modified:
+                return False
+            _modified = modified
+            rules = load(path)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logging.getLogger(__name__).error("Mapping file %s ignored: %s", path, error)
+            return False
+        if rules.version == previous.version:
+            if rules.config != previous.config:
+                logging.getLogger(__name__).error(
+                    "Mapping file %s ignored: its content changed but not its version %d",
+                    path, rules.version)
+            return False
+        _current = rules
+        on_change(previous, rules)
+    logging.getLogger(__name__).warning(
+        "Mapping rules reloaded: version %d -> %d", previous.version, rules.version)
+    return True
+
+
+def init_app(server, on_change, interval=CHECK_INTERVAL):
+    """
+    Makes the Flask server check the mapping file before the requests, at most once per interval.
+    The check is per process, so each gunicorn worker reloads the rules by itself.
+
+    Args:
+        server (flask.Flask): The Flask server of the Dash app.
+        on_change (Callable[[MappingRules, MappingRules], None]): Called with the previous
+            and the new rules.
+        interval (float, optional): The minimum time between two checks, in seconds.
+    """
+    @server.before_request
+    def check_mappings():  # pylint: disable=unused-variable
+        global _checked
+        now = time.monotonic()
+        if now - _checked < interval:
+            return
+        _checked = now
+        refresh(on_change)
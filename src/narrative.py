@@ -0,0 +1,233 @@
+"""
+    Texts of the story told around figures 1 and 2.
+
+    The numbers of the texts (the drops, the rebound, the busiest day and
+    the peak hours) are read from `analytics.Trends`, so the story follows
+    the data instead of quoting a fixed version of it. The interpretations
+    (the commutes, the seasonal variations, the strong rise, the night peak)
+    are only written when the numbers support them, else the texts state
+    the numbers plainly.
+"""
+import analytics
+from const import DAY_LABELS, DAY_ORDER, SEASON_ORDER
+
+SEASON_PHRASES = {
+    'Hiver': "en hiver",
+    'Printemps': "au printemps",
+    'Été': "en été",
+    'Automne': "en automne",
+}
+
+SEASON_SUBJECTS = {
+    'Hiver': "l’hiver",
+    'Printemps': "le printemps",
+    'Été': "l’été",
+    'Automne': "l’automne",
+}
+
+SEASON_ADJECTIVES = {
+    'Hiver': "hivernales",
+    'Printemps': "printanières",
+    'Été': "estivales",
+    'Automne': "automnales",
+}
+
+WORKING_DAYS = DAY_ORDER[:4]
+
+# Year of the lockdowns, when a drop of the accidents has a known cause
+PANDEMIC_YEAR = 2020
+
+# Rush hours of the commutes, matched against the peak windows of the working days
+COMMUTE_HOURS = [(7, 9), (16, 18)]
+
+# Minimal increase over the previous year, in percent, to call the rise of a season strong
+MIN_RISE_PCT = 10
+
+# Minimal ratio between the accidents of the Sunday night peak and of the same hour on the
+# working days, to call it unexpected
+MIN_NIGHT_RATIO = 1.5
+
+# First hour of the evening, to say that the Saturday peak falls in the evening
+EVENING_START = 18
+
+
+def format_count(count):
+    """
+    Formats a number of accidents the French way, grouping the thousands from 10 000.
+
+    Args:
+        count (int): The number to format.
+
+    Returns:
+        str: The formatted number.
+    """
+    count = int(count)
+    return f"{count:,}".replace(',', ' ') if count >= 10000 else str(count)
+
+
+def seasonal_paragraphs(trends):
+    """
+    Writes the texts below figure 1, on the yearly totals and the seasonal anomalies.
+
+    Args:
+        trends (analytics.Trends): The trends of the accidents.
+
+    Returns:
+        List[str]: The paragraphs.
+    """
+    seasonal = trends.seasonal
+    if seasonal.empty:
+        return []
+    years = trends.years
+    totals = seasonal.sum(axis=1)
+    stable = totals.std(ddof=0) <= 0.1 * totals.mean()
+    anomalies = trends.anomalies()
+    varies = not anomalies.empty
+
+    if stable:
+        first = (f"Entre {years[0]} et {years[-1]}, le nombre total d’accidents de la route reste "
+                 "étonnamment stable d’une année à l’autre, se situant autour des "
+                 f"{format_count(round(totals.mean(), -3))} cas.")
+        if varies:
+            first += (" Mais derrière cette régularité apparente, les saisons racontent une autre "
+                      "histoire.")
+    else:
+        first = (f"Entre {years[0]} et {years[-1]}, le nombre total d’accidents de la route varie "
+                 f"d’une année à l’autre, de {format_count(totals.min())} à "
+                 f"{format_count(totals.max())} cas.")
+        if varies:
+            first += " Et derrière ces totaux, les saisons racontent leur propre histoire."
+
+    drops = anomalies[anomalies['zscore'] < 0]
+    drop_year = None
+    if not drops.empty:
+        drop_year = int(drops.index[0][0])
+        worst = drops.loc[drop_year]
+        seasons = list(worst.index)
+        if drop_year == PANDEMIC_YEAR:
+            first += f" En {drop_year}, la pandémie de COVID-19 a provoqué une chute historique : "
+        else:
+            first += f" En {drop_year}, les accidents connaissent une baisse inhabituelle : "
+        first += (f"{SEASON_PHRASES[seasons[0]]}, les accidents tombent à "
+                  f"{format_count(worst['count'].iloc[0])}")
+        if len(seasons) > 1:
+            first += (f", et {SEASON_SUBJECTS[seasons[1]]} n’en compte que "
+                      f"{format_count(worst['count'].iloc[1])}")
+        if drop_year == PANDEMIC_YEAR:
+            first += (" — un effet direct des confinements et de la réduction massive des "
+                      "déplacements")
+        first += "."
+
+    second = ""
+    rebound = trends.rebound()
+    if rebound is not None and trends.trends().loc[rebound[:2], 'delta_pct'] >= MIN_RISE_PCT:
+        year, season, count = rebound
+        if drop_year == PANDEMIC_YEAR and year == PANDEMIC_YEAR + 1:
+            second = (f"Dès {SEASON_SUBJECTS[season]} {year}, le relâchement post-confinement "
+                      f"provoque un effet rebond spectaculaire, avec {format_count(count)} "
+                      "accidents. Depuis, ")
+        else:
+            second = (f"La plus forte hausse survient {SEASON_PHRASES[season]} {year}, "
+                      f"avec {format_count(count)} accidents. Au fil des années, ")
+
+    means = seasonal.mean().sort_values(ascending=False)
+    busiest, calmest = list(means.index[:2]), means.index[-1]
+    every_year = ", chaque année," if (seasonal.idxmin(axis=1) == calmest).all() else ""
+    busiest = sorted(busiest, key=SEASON_ORDER.index)
+    sentence = (f"les saisons {SEASON_ADJECTIVES[busiest[0]]} et "
+                f"{SEASON_ADJECTIVES[busiest[1]]} restent les plus accidentogènes, tandis que "
+                f"{SEASON_SUBJECTS[calmest]}{every_year} demeure la plus « calme ».")
+    second += sentence if second else sentence[0].upper() + sentence[1:]
+    if varies:
+        second += (f" {'La stabilité annuelle' if stable else 'L’évolution annuelle'} masque "
+                   "ainsi de fortes variations saisonnières, reflets de nos habitudes, de nos "
+                   "libertés retrouvées… et parfois de nos excès.")
+    else:
+        second += " D’une année à l’autre, chaque saison reste toutefois proche de sa moyenne."
+    return [first, second]
+
+
+def overlaps(window, hours):
+    """
+    Args:
+        window (Tuple[int, int]): The first and last hour of a window.
+        hours (Tuple[int, int]): The first and last hour of another window.
+
+    Returns:
+        bool: Whether the two windows share at least one hour.
+    """
+    return window[0] <= hours[1] and hours[0] <= window[1]
+
+
+def hourly_paragraphs(trends):
+    """
+    Writes the texts below figure 2, on the peak hours of the working days, the busiest day and
+    the weekend.
+
+    Args:
+        trends (analytics.Trends): The trends of the accidents.
+
+    Returns:
+        List[str]: The paragraphs.
+    """
+    hourly = trends.hourly()
+    working_days = hourly.loc[WORKING_DAYS].sum()
+    morning = analytics.peak_window(working_days, analytics.MORNING_HOURS)
+    evening = analytics.peak_window(working_days, analytics.EVENING_HOURS)
+    commutes = [overlaps(morning, COMMUTE_HOURS[0]), overlaps(evening, COMMUTE_HOURS[1])]
+    if all(commutes):
+        weekdays = (
+            "En semaine, du lundi au jeudi, les journées suivent un rythme presque chorégraphique. "
+            f"Deux pics se détachent nettement : un premier entre {morning[0]}h et {morning[1]}h "
+            f"du matin, l'autre entre {evening[0]}h et {evening[1]}h. Sans surprise, ces créneaux "
+            "coïncident avec les allers-retours domicile-travail, ces moments où les routes "
+            "débordent de stress, de fatigue et... de distractions.")
+    else:
+        weekdays = (
+            "En semaine, du lundi au jeudi, les accidents sont les plus nombreux entre "
+            f"{morning[0]}h et {morning[1]}h, puis entre {evening[0]}h et {evening[1]}h.")
+        if any(commutes):
+            weekdays += (f" Le {'premier' if commutes[0] else 'second'} de ces créneaux coïncide "
+                         "avec les trajets domicile-travail.")
+    paragraphs = [weekdays]
+
+    day_totals = hourly.sum(axis=1).sort_values(ascending=False)
+    busiest, runner_up = day_totals.index[0], day_totals.iloc[1]
+    if day_totals.iloc[0] >= 1.05 * runner_up:
+        busiest_day = (f"Mais le {DAY_LABELS[busiest].lower()} change la donne. Avec "
+                       f"{format_count(day_totals.iloc[0])} accidents recensés, il dépasse "
+                       "largement les autres jours.")
+        if busiest == 'Friday':
+            busiest_day += (" Pourquoi ? Peut-être parce qu'on est déjà tourné vers le week-end, "
+                            "moins concentré, plus pressé de rentrer ou de partir. Les "
+                            "comportements changent, et les routes en font les frais.")
+    else:
+        busiest_day = (f"Le {DAY_LABELS[busiest].lower()} est le jour le plus chargé, avec "
+                       f"{format_count(day_totals.iloc[0])} accidents recensés, mais il devance "
+                       "de peu les autres jours.")
+    paragraphs.append(busiest_day)
+
+    saturday = analytics.peak_window(hourly.loc['Saturday'], analytics.EVENING_HOURS)
+    if saturday[0] >= EVENING_START and saturday != evening:
+        paragraphs.append(
+            "Le week-end, justement, affiche un tout autre visage. Fini le rythme "
+            "métro-boulot-dodo. Les pics d'accidents se déplacent, s'étalent sur la journée et "
+            "prennent d'assaut la soirée. Le samedi, les accidents culminent entre "
+            f"{saturday[0]}h et {saturday[1]}h, suivant le tempo des sorties et des loisirs.")
+    else:
+        paragraphs.append(
+            f"Le samedi, les accidents culminent entre {saturday[0]}h et {saturday[1]}h.")
+
+    sunday = analytics.peak_hours(hourly.loc[['Sunday']], analytics.NIGHT_HOURS).iloc[0]
+    usual = hourly.loc[WORKING_DAYS, sunday].mean()
+    if hourly.loc['Sunday', sunday] >= MIN_NIGHT_RATIO * usual:
+        paragraphs.append(
+            f"Mais c'est le dimanche à {sunday}h du matin qui interpelle le plus : un pic "
+            "inattendu, inquiétant. Un moment où la majorité dort... sauf ceux qui rentrent de "
+            "soirée. Ce rebond nocturne traduit sans doute les conséquences d'un samedi soir trop "
+            "arrosé ou d'un retour tardif, souvent dans des conditions loin d'être idéales.")
+    else:
+        paragraphs.append(
+            f"La nuit du samedi au dimanche, les accidents culminent vers {sunday}h du matin, "
+            "sans dépasser nettement les nuits de semaine.")
+    return paragraphs
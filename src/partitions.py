@@ -0,0 +1,224 @@
+"""
+    Parallel preprocessing of the source CSV, split into byte ranges.
+
+    The file is cut into ranges of about the same size, each ending at a line
+    break, and every range is parsed, validated and preprocessed by its own
+    process, with the same functions as the serial load. The source CSV holds
+    one accident per line, so a range always contains whole rows. A quoted
+    field spanning several lines would break that: each range checks that it
+    parsed one row per line, and the whole file is otherwise preprocessed by
+    the serial load.
+
+    Besides its rows, each process returns the partial aggregates of its
+    range: the accidents per year and season, per year, day of the week and
+    hour, per combination of the Sankey dimensions, and the injuries per
+    cause category. These are counts and sums, so the totals of the whole file
+    are exactly the sums of the partial ones, and the figures do not need to
+    scan the merged rows again at startup.
+"""
+import functools
+import io
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import preprocess
+import validation
+from const import INJURY_CATEGORIES, RAW_COLUMNS, SANKEY_DIMENSIONS
+
+# Text columns, read as strings in every range, even when they are empty in some of them
+TEXT_COLUMNS = ['crash_date', *RAW_COLUMNS.values()]
+# Number of ranges per worker, so that a slower range does not leave the other workers idle
+RANGES_PER_WORKER = 4
+
+
+class Aggregates:
+    """
+    Counts and sums of accidents which add up exactly over disjoint sets of rows.
+    """
+
+    def __init__(self, seasonal, hourly, sankey, injuries):
+        """
+        Args:
+            seasonal (pd.Series): The number of accidents per year and season.
+            hourly (pd.Series): The number of accidents per year, day of the week and hour.
+            sankey (pd.Series): The number of accidents per combination of the Sankey dimensions.
+            injuries (pd.DataFrame): The number of injuries of each category (columns) per cause
+                category.
+        """
+        self.seasonal = seasonal
+        self.hourly = hourly
+        self.sankey = sankey
+        self.injuries = injuries
+
+    @classmethod
+    def of(cls, data):
+        """
+        Args:
+            data (pd.DataFrame): Processed accidents.
+
+        Returns:
+            Aggregates: The aggregates of the accidents.
+        """
+        return cls(
+            data.groupby(['crash_year', 'season']).size(),
+            data.groupby(['crash_year', 'crash_day_of_week_name', 'crash_hour']).size(),
+            data.groupby(SANKEY_DIMENSIONS).size(),
+            data.groupby('cause_category')[INJURY_CATEGORIES].sum(),
+        )
+
+    def merge(self, other):
+        """
+        Args:
+            other (Aggregates): The aggregates of other accidents.
+
+        Returns:
+            Aggregates: The aggregates of both sets of accidents.
+        """
+        return Aggregates(*(_add(mine, theirs) for mine, theirs in zip(
+            (self.seasonal, self.hourly, self.sankey, self.injuries),
+            (other.seasonal, other.hourly, other.sankey, other.injuries))))
+
+    def seasonal_accidents(self):
+        """
+        Returns:
+            pd.DataFrame: The number of accidents per year (rows) and season (columns),
+            as returned by `preprocess.prepare_seasonal_accidents`.
+        """
+        return preprocess.seasonal_table(self.seasonal.reset_index(name='count'))
+
+    def hourly_counts(self):
+        """
+        Returns:
+            pd.DataFrame: The number of accidents per day of the week and hour over all the dates,
+            as returned by `preprocess.prepare_hourly_counts`.
+        """
+        counts = self.hourly.groupby(level=['crash_day_of_week_name', 'crash_hour']).sum()
+        return preprocess.hourly_table(counts.reset_index(name='count'))
+
+    def sankey_counts(self):
+        """
+        Returns:
+            pd.DataFrame: One column per Sankey dimension and 'count', sorted by the dimensions.
+        """
+        return self.sankey.reset_index(name='count')
+
+    def injury_sums_by_cause(self):
+        """
+        Returns:
+            pd.DataFrame: The number of injuries of each category (columns) per cause category
+                          (rows, sorted, without 'Autre').
+        """
+        return self.injuries.drop(index='Autre', errors='ignore')
+
+
+def _add(mine, theirs):
+    """
+    Adds two counts or sums aligned on their index, a missing entry counting as zero.
+    """
+    return mine.add(theirs, fill_value=0).astype(np.int64).sort_index()
+
+
+def split(path, n_ranges):
+    """
+    Cuts a CSV file into byte ranges of about the same size, each ending at a line break.
+
+    Args:
+        path (pathlib.Path): The CSV file.
+        n_ranges (int): The number of ranges wanted. Small files may get fewer.
+
+    Returns:
+        Tuple[bytes, List[Tuple[int, int]]]: The header line, and the start and end offsets of
+        each range.
+    """
+    size = path.stat().st_size
+    with open(path, 'rb') as file:
+        header = file.readline()
+        boundaries = [file.tell()]
+        for i in range(1, n_ranges):
+            file.seek(max(boundaries[-1], size * i // n_ranges))
+            file.readline()
+            if file.tell() >= size:
+                break
+            if file.tell() > boundaries[-1]:
+                boundaries.append(file.tell())
+    boundaries.append(size)
+    return header, [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def preprocess_range(path, header, start, end):
+    """
+    Parses, validates and preprocesses one byte range of the source CSV.
+
+    Args:
+        path (pathlib.Path): The source CSV.
+        header (bytes): Its header line.
+        start (int): The offset of the first row of the range.
+        end (int): The offset following the last row of the range.
+
+    Returns:
+        tuple: The processed accidents of the range, its rejected accidents, the number of its rows
+        failing each check, and its `Aggregates`, or None if the range does not hold one row per
+        line, as when a quoted field contains a line break.
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        content = file.read(end - start)
+    try:
+        df = pd.read_csv(io.BytesIO(header + content), dtype=dict.fromkeys(TEXT_COLUMNS, str))
+    except pd.errors.ParserError:
+        return None
+    if len(df) != content.count(b'\n') + (not content.endswith(b'\n')):
+        return None
+    df, quarantine, summary = validation.validate(df)
+    data = preprocess.convert_types(df)
+    data = preprocess.add_season(data)
+    data = preprocess.map_categories(data)
+    return data, quarantine, summary, Aggregates.of(data)
+
+
+def preprocess_parallel(path, workers):
+    """
+    Preprocesses the source CSV with a pool of processes, one byte range at a time.
+    The rows come out exactly as from the serial load: same values, types and order.
+    The file cannot be split when a row spans several lines, which the caller then preprocesses
+    serially.
+
+    Args:
+        path (pathlib.Path): The source CSV.
+        workers (int): The number of processes.
+
+    Returns:
+        tuple: A tuple containing the following, or None if the file cannot be split:
+            - The processed accidents, sorted by date.
+            - The rejected accidents.
+            - The number of rows failing each check.
+            - The `Aggregates` of the processed accidents.
+            - The throughput, in rows per second and per worker.
+    """
+    started = time.perf_counter()
+    header, ranges = split(path, workers * RANGES_PER_WORKER)
+    # An odd number of quotes leaves a field of the header open on the next line
+    if header.count(b'"') % 2:
+        return None
+    starts, ends = zip(*ranges)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(preprocess_range, itertools.repeat(path), itertools.repeat(header),
+                                starts, ends))
+    if any(result is None for result in results):
+        return None
+
+    # The ranges follow each other in the file, so a stable sort gives the order of the serial load
+    data = pd.concat([result[0] for result in results], ignore_index=True)
+    data = data.sort_values('crash_date', kind='stable', ignore_index=True)
+    quarantine = pd.concat([result[1] for result in results], ignore_index=True)
+    summary = functools.reduce(pd.Series.add, (result[2] for result in results))
+    aggregates = functools.reduce(Aggregates.merge, (result[3] for result in results))
+
+    n_rows = len(data) + len(quarantine)
+    throughput = n_rows / (time.perf_counter() - started) / workers
+    return data, quarantine, summary, aggregates, throughput
+
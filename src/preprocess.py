@@ -1,5 +1,5 @@
 import pandas as pd
-from categories_const import CAUSE_MAP, WEATHER_MAP, TRAFFIC_MAP
+import mappings
 from const import INJURY_CATEGORIES
 
 
@@ -23,8 +23,8 @@ def convert_types(df):
 
 def map_categories(df):
     """
-    Maps and categorizes the 'prim_contributory_cause', 'weather_condition', and 'trafficway_type' columns 
-    into separate categories using the 'categorize_all' function.
+    Maps the 'prim_contributory_cause', 'weather_condition', and 'trafficway_type' columns
+    to their categories, following the rules of the mapping file (see `mappings.py`).
 
     Args:
         df (pd.DataFrame): Base Dataframe
@@ -32,56 +32,8 @@ def map_categories(df):
     Returns:
         pd.DataFrame: The updated DataFrame with updated colums for the categories.
     """
-    df[["cause_category", "weather_category", "trafficway_category"]] = df.apply(
-    lambda row: categorize_all(
-        row["prim_contributory_cause"],
-        row["weather_condition"],
-        row["trafficway_type"]
-    ),
-    axis=1,
-    result_type='expand'
-    )
+    return mappings.CategoryCodes(df).apply(df, mappings.current())
 
-    return df
-
-
-def categorize_all(cause, weather, traffic):
-    """
-    Categorizes the given cause, weather, and traffic conditions by mapping them to predefined categories 
-    using their respective maps.
-
-    Args:
-        cause (str): The primary contributory cause of the accident.
-        weather (str): The weather condition during the accident.
-        traffic (str): The traffic type at the time of the accident.
-
-    Returns:
-        Tuple[str, str, str]: A tuple containing the categorized values for cause, weather, and traffic.
-    """
-    return (
-        get_category(cause, CAUSE_MAP),
-        get_category(weather, WEATHER_MAP),
-        get_category(traffic, TRAFFIC_MAP)
-    )
-
-
-def get_category(value, mapping):
-    """
-    Retrieves the category for a given value based on a predefined mapping.
-
-    Args:
-        value (str): The value to be categorized.
-        mapping (Dict[str, list]): A dictionary where the keys are category names 
-                                   and the values are lists of possible values for each category.
-
-    Returns:
-        str: The category corresponding to the given value, or 'Autre' if no match is found.
-    """
-    for cat, values in mapping.items():
-        if value in values:
-            return cat
-    return "Autre"
-    
 def add_season(df) :
     """
     Adds a 'season' column to the DataFrame based on the 'crash_month_name' column.
@@ -117,6 +69,53 @@ def prepare_seasonal_accidents(df) :
     seasonal_accidents = df.groupby(['crash_year', 'season']).size().unstack().fillna(0)
     return seasonal_accidents
 
+def seasonal_table(counts) :
+    """
+    Pivots the number of accidents per year and season, computed by a query backend,
+    into the table returned by `prepare_seasonal_accidents`.
+
+    Args:
+        counts (pd.DataFrame): A DataFrame with 'crash_year', 'season' and 'count' columns,
+                               sorted by year and season.
+
+    Returns:
+        pd.DataFrame: A DataFrame where each row corresponds to a year and each column represents
+                      a season, with the number of accidents in each season.
+    """
+    return counts.set_index(['crash_year', 'season'])['count'].unstack().fillna(0)
+
+def prepare_hourly_counts(df) :
+    """
+    Counts the accidents for each day of the week and each hour of the day.
+
+    Args:
+        df (pd.DataFrame): A DataFrame with 'crash_day_of_week_name' and 'crash_hour' columns.
+
+    Returns:
+        pd.DataFrame: A DataFrame with one row per day of the week present in the data
+                      and one column per hour (0 to 23).
+    """
+    counts = df.groupby(['crash_day_of_week_name', 'crash_hour']).size().reset_index(name='count')
+    return hourly_table(counts)
+
+def hourly_table(counts) :
+    """
+    Pivots the number of accidents per day of the week and hour into the table
+    returned by `prepare_hourly_counts`.
+
+    Args:
+        counts (pd.DataFrame): A DataFrame with 'crash_day_of_week_name', 'crash_hour' and 'count'
+            columns.
+
+    Returns:
+        pd.DataFrame: A DataFrame with one row per day of the week present in the counts
+                      and one column per hour (0 to 23).
+    """
+    table = counts.pivot(index='crash_day_of_week_name', columns='crash_hour', values='count')
+    table = table.reindex(columns=range(24)).fillna(0).astype('int64')
+    table.columns.name = 'crash_hour'
+    return table
+
 def prepare_figure_4(df) : 
     """
     Prepares aggregated data for figure 4 by filtering out 'Autre' cause categories,
@@ -129,9 +128,22 @@ def prepare_figure_4(df) :
         pd.DataFrame: A DataFrame to display.
     """
     df_filtered = df[df["cause_category"] != 'Autre']
+    return figure_4_table(df_filtered.groupby("cause_category")[INJURY_CATEGORIES].sum())
+
+def figure_4_table(injury_sums) :
+    """
+    Reshapes the number of injuries per cause category into the long table used by figure 4.
+
+    Args:
+        injury_sums (pd.DataFrame): A DataFrame indexed by 'cause_category' (sorted, without
+                                    'Autre'), with one column per injury category.
+
+    Returns:
+        pd.DataFrame: A DataFrame to display.
+    """
     agg_data = pd.DataFrame(columns=["injury_category", "cause_category", "count"])
     for injury in INJURY_CATEGORIES:
-        temp_data = df_filtered.groupby("cause_category")[injury].sum().reset_index(name="count")
+        temp_data = injury_sums[injury].reset_index(name="count")
         temp_data["injury_category"] = injury
         agg_data = pd.concat([agg_data, temp_data], ignore_index=True)
 
@@ -0,0 +1,7 @@
+"""
+    Frozen copy of the original preprocessing and figures, the legacy pipeline of `equivalence.py`.
+
+    The modules are those of the first version of the dashboard, unchanged but for their imports,
+    made relative so that they keep their own `const.py` and `categories_const.py`. They must not
+    be modified: the optimized engines are checked against them.
+"""
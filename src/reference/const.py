@@ -0,0 +1,76 @@
+# Figure 1
+
+SEASON_COLORS = {
+        'Hiver': '#636EFA',
+        'Printemps': '#77DD77',
+        'Été': '#FFD700',
+        'Automne': '#FFB347'
+}
+
+SEASON_ORDER = ['Hiver', 'Printemps', 'Été', 'Automne']
+
+# Figure 2
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+DAY_LABELS = {
+        'Monday': 'Lundi',
+        'Tuesday': 'Mardi',
+        'Wednesday': 'Mercredi',
+        'Thursday': 'Jeudi',
+        'Friday': 'Vendredi',
+        'Saturday': 'Samedi',
+        'Sunday': 'Dimanche'
+    }
+
+# Figure 3
+
+COLOR_MAP = {
+    # Causes
+    "Infractions au Code de la route": "#e74c3c",
+    "Conduite imprudente": "#d35400",
+    "Conduite inexpérimentée": "#c0392b",
+    "Déficiences du conducteur": "#e67e22",
+    "Distractions du conducteur": "#f39c12",
+    "Facteurs environnementaux et externes": "#7f8c8d",
+
+    # Météo
+    "Temps clair": "#3498db",
+    "Pluie / Neige": "#2980b9",
+    "Temps nuageux ou brouillard": "#95a5a6",
+    "Conditions météorologiques extrêmes": "#34495e",
+
+    # Routes
+    "Routes standards": "#2ecc71",
+    "Intersections et routes divisées": "#27ae60",
+    "Routes spéciales ou inconnues": "#16a085",
+}
+
+# Figure 4
+
+INJURY_CATEGORIES = [
+    "injuries_non_incapacitating",
+    "injuries_incapacitating",
+    "injuries_fatal"
+]
+
+INJURY_LABEL_MAPPING = {
+    "injuries_non_incapacitating": "Blessures légères",
+    "injuries_incapacitating": "Blessures graves",
+    "injuries_fatal": "Blessures mortelles"
+}
+
+COLORS_MAP_FIG_4 = {
+    "Infractions au Code de la route": "#9ea9ff",
+    "Conduite imprudente": "#7b9fff",
+    "Conduite inexpérimentée": "#7b9fff",
+    "Déficiences du conducteur": "#7b9fff",
+    "Distractions du conducteur": "#7b9fff",
+    "Facteurs environnementaux et externes": "#9ea9ff",
+    "Conditions météorologiques": "#9ea9ff",
+    "Autre": "#d3d3d3",
+    "Blessures légères": "#FF6F61",
+    "Blessures graves": "#D14B3A",
+    "Blessures mortelles": "#A42D2A",
+    "Total": "#bdc3c7"
+}
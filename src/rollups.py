@@ -0,0 +1,110 @@
+"""
+    Number of accidents per day, week, month, season and year, for figure 1.
+
+    The accidents are counted per day and season in a single pass over the
+    rows, when they are appended. Every coarser table is summed from a finer
+    one when first requested: weeks and months from days, seasons from
+    months, years from seasons. Their size only depends on the number of
+    periods, so filtering and drawing a resolution never scans the accidents.
+
+    Weeks are ISO weeks, starting on Monday and belonging to the year of
+    their Thursday, so a week never straddles two years of the filter.
+"""
+import numpy as np
+import pandas as pd
+
+from const import SEASON_ORDER
+
+# Resolutions of figure 1, from the finest to the coarsest
+RESOLUTIONS = ['day', 'week', 'month', 'season', 'year']
+
+
+class Rollups:
+    """
+    Counts of accidents per period and season, at every resolution.
+    """
+
+    def __init__(self):
+        self._daily = None
+        self._tables = {}
+
+    def append(self, rows):
+        """
+        Adds accidents to the daily counts. The coarser tables are summed again when next requested.
+
+        Args:
+            rows (pd.DataFrame): Processed accidents, with the `crash_date` and `season` columns.
+        """
+        if rows.empty:
+            return
+        days = rows['crash_date'].dt.normalize().rename('period')
+        daily = rows.groupby([days, 'season']).size().unstack(fill_value=0)
+        daily = daily.reindex(columns=SEASON_ORDER, fill_value=0).astype(np.int64)
+        if self._daily is not None:
+            daily = daily.add(self._daily, fill_value=0).astype(np.int64)
+        daily.columns.name = None
+        self._daily = daily.sort_index()
+        self._tables = {}
+
+    def table(self, resolution):
+        """
+        Returns the counts of a resolution, summed from the finer one when first requested.
+
+        Args:
+            resolution (str): One of `RESOLUTIONS`.
+
+        Returns:
+            pd.DataFrame: One column per season. For 'day', 'week' and 'month', the rows are indexed
+            by the year and the first day of each period with at least one accident; for 'season'
+            and 'year', by the year only. 'year' only has a 'total' column.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {RESOLUTIONS}.")
+        if resolution not in self._tables:
+            self._tables[resolution] = self._build(resolution)
+        return self._tables[resolution]
+
+    def _build(self, resolution):
+        """
+        Sums the table of a resolution from the finer one.
+        """
+        if resolution == 'day':
+            daily = self._daily if self._daily is not None else _empty_daily()
+            return daily.set_index(daily.index.year.rename('year'), append=True).swaplevel()
+        days = self.table('day')
+        periods = days.index.get_level_values('period')
+        if resolution == 'week':
+            starts = periods - pd.to_timedelta(periods.dayofweek, unit='D')
+            # The Thursday of the week tells its ISO year
+            years = (starts + pd.Timedelta(days=3)).year
+            return days.groupby([years.rename('year'), starts.rename('period')]).sum()
+        if resolution == 'month':
+            return days.groupby([days.index.get_level_values('year'),
+                                 periods.to_period('M').to_timestamp().rename('period')]).sum()
+        if resolution == 'season':
+            return self.table('month').groupby(level='year').sum()
+        return self.table('season').sum(axis=1).to_frame('total')
+
+    def between(self, resolution, year_start, year_end):
+        """
+        Returns the counts of a resolution for a range of years.
+
+        Args:
+            resolution (str): One of `RESOLUTIONS`.
+            year_start (int): The first year.
+            year_end (int): The last year.
+
+        Returns:
+            pd.DataFrame: The rows of `table(resolution)` of the years in the range.
+        """
+        table = self.table(resolution)
+        return table.loc[year_start:year_end]
+
+
+def _empty_daily():
+    """
+    Returns:
+        pd.DataFrame: The daily counts before any accident is appended.
+    """
+    return pd.DataFrame(columns=SEASON_ORDER, index=pd.DatetimeIndex([], name='period'),
+                        dtype=np.int64)
@@ -0,0 +1,160 @@
+"""
+    Approximate counts from a stratified sample of the accidents.
+
+    The sample is built at ingestion with one reservoir per month (the
+    strata): each reservoir keeps a uniform random sample of at most `size`
+    accidents of its month, and new rows can be appended at any time. The
+    counts of a query are estimated by weighting the matching sampled rows of
+    each month by its sampling rate, and their 95 % confidence interval comes
+    from the variance of the stratified estimator. Months whose accidents all
+    fit in their reservoir are counted exactly.
+"""
+import numpy as np
+import pandas as pd
+
+from const import DAY_ORDER
+
+SAMPLE_COLUMNS = ['crash_date', 'crash_day_of_week_name', 'crash_hour']
+
+# z-value of a two-sided 95 % confidence interval
+Z_95 = 1.96
+
+
+class StratifiedSample:
+    """
+    Reservoirs of accidents, one per month, answering count queries approximately.
+    """
+
+    def __init__(self, size, seed=0):
+        """
+        Args:
+            size (int): The maximal number of accidents kept per month.
+            seed (int, optional): The seed of the random generator.
+        """
+        self.size = size
+        self._rng = np.random.default_rng(seed)
+        self._reservoirs = {}
+        self._population = {}
+        # Sample size and number of accidents of each stratum, in the order of `frame`
+        self._sizes = np.zeros(0, dtype=np.float64)
+        self._populations = np.zeros(0, dtype=np.float64)
+        self._frame = None
+
+    def append(self, rows):
+        """
+        Adds accidents to the reservoirs of their months.
+
+        When a reservoir overflows, the number of rows it keeps from its previous sample
+        is drawn from a hypergeometric distribution, so the reservoir stays a uniform
+        sample of all the accidents of its month.
+
+        Args:
+            rows (pd.DataFrame): Processed accidents, with the `SAMPLE_COLUMNS` columns.
+        """
+        strata = rows['crash_date'].dt.year * 100 + rows['crash_date'].dt.month
+        for stratum, group in rows[SAMPLE_COLUMNS].groupby(strata):
+            seen = self._population.get(stratum, 0)
+            reservoir = self._reservoirs.get(stratum, group.iloc[:0])
+            if seen + len(group) <= self.size:
+                reservoir = pd.concat([reservoir, group])
+            else:
+                kept = self._rng.hypergeometric(seen, len(group), self.size)
+                reservoir = pd.concat([
+                    reservoir.iloc[self._rng.choice(len(reservoir), kept, replace=False)],
+                    group.iloc[self._rng.choice(len(group), self.size - kept, replace=False)],
+                ])
+            self._reservoirs[stratum] = reservoir
+            self._population[stratum] = seen + len(group)
+        self._sizes = np.array([len(reservoir) for reservoir in self._reservoirs.values()],
+                               dtype=np.float64)
+        self._populations = np.array(list(self._population.values()), dtype=np.float64)
+        self._frame = None
+
+    @property
+    def frame(self):
+        """
+        pd.DataFrame: All the sampled accidents, with the index of their `stratum`
+        and the index of their `cell` (day of the week and hour) in the arrays of `estimate`.
+        """
+        if self._frame is None:
+            frame = pd.concat(self._reservoirs.values(), ignore_index=True)
+            days = pd.Categorical(frame['crash_day_of_week_name'], categories=DAY_ORDER).codes
+            self._frame = frame.assign(
+                stratum=np.repeat(np.arange(len(self._sizes)), self._sizes.astype(np.int64)),
+                cell=days.astype(np.int64) * 24 + frame['crash_hour'].to_numpy(),
+            )
+        return self._frame
+
+    def population(self, start_date, end_date):
+        """
+        Counts the accidents of the months overlapping a date range, an upper bound of the
+        accidents between the two dates read without scanning them.
+
+        Args:
+            start_date (str): The first date of the range.
+            end_date (str): The last date of the range.
+
+        Returns:
+            int: The number of accidents of the months of the range.
+        """
+        start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+        first, last = start.year * 100 + start.month, end.year * 100 + end.month
+        return sum(count for stratum, count in self._population.items()
+                   if first <= stratum <= last)
+
+    def estimate(self, mask):
+        """
+        Estimates the number of accidents matching a filter, per day of the week and hour.
+
+        Args:
+            mask (pd.Series): The sampled accidents matching the filter.
+
+        Returns:
+            Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]: The estimated
+            counts and their variances, first per day of the week and hour (arrays of shape
+            (7, 24)), then per day of the week (arrays of shape (7, 1)).
+        """
+        frame = self.frame
+        strata = len(self._sizes)
+        keys = frame['stratum'].to_numpy()[mask] * 168 + frame['cell'].to_numpy()[mask]
+        hits = np.bincount(keys, minlength=strata * 168).reshape(strata, 7, 24)
+        sizes, populations = self._sizes[:, None, None], self._populations[:, None, None]
+        # Variance of the estimated count of each stratum, with the finite population correction
+        correction = populations ** 2 * (1 - sizes / populations) / np.maximum(sizes - 1, 1)
+
+        results = []
+        for counts in (hits, hits.sum(axis=2, keepdims=True)):
+            rate = counts / sizes
+            results.append(((populations * rate).sum(axis=0),
+                            (correction * rate * (1 - rate)).sum(axis=0)))
+        return results
+
+    def hourly_counts(self, start_date, end_date, days):
+        """
+        Estimates the accidents per day of the week and hour between two dates,
+        like `backends.PandasBackend.hourly_counts`.
+
+        Args:
+            start_date (str): The first date of the range.
+            end_date (str): The last date of the range.
+            days (List[str]): The names of the days of the week to keep.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame, pd.Series]: The estimated counts, as returned by
+            `preprocess.prepare_hourly_counts`, the half-widths of their 95 % confidence
+            intervals in the same shape, and the half-widths for the total of each day.
+        """
+        frame = self.frame
+        mask = ((frame['crash_date'] >= pd.to_datetime(start_date))
+                & (frame['crash_date'] <= pd.to_datetime(end_date))
+                & frame['crash_day_of_week_name'].isin(days)).to_numpy()
+        (counts, variances), (totals, total_variances) = self.estimate(mask)
+        rows = [i for i, day in enumerate(DAY_ORDER) if day in days and totals[i, 0] > 0]
+        index = pd.Index([DAY_ORDER[i] for i in rows], name='crash_day_of_week_name')
+        columns = pd.Index(range(24), name='crash_hour')
+
+        errors = np.ceil(Z_95 * np.sqrt(variances[rows]))
+        total_errors = np.ceil(Z_95 * np.sqrt(total_variances[rows, 0]))
+        return (pd.DataFrame(np.round(counts[rows]), index=index, columns=columns).astype('int64'),
+                pd.DataFrame(errors, index=index, columns=columns).astype('int64'),
+                pd.Series(total_errors, index=index).astype('int64'))
@@ -1,9 +1,19 @@
 """
     Contains the server to run our application.
+
+    By default the application runs on the Flask development server, behind
+    flask_failsafe and with debug mode on. With --prod, the same Flask server
+    is served by gunicorn with several workers and threads per worker. The
+    data is loaded once in the master process before the workers are forked.
 """
-from flask_failsafe import failsafe
+import argparse
+import os
+
+DEFAULT_PORT = 8050
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 4)
+DEFAULT_THREADS = 4
+
 
-@failsafe
 def create_app():
     """
         Gets the underlying Flask server from our Dash app.
@@ -16,6 +26,94 @@ def create_app():
     return app.server
 
 
-server = create_app()
+def create_dev_app():
+    """
+        Gets the Flask server wrapped by flask_failsafe, so that a syntax error
+        while editing the code does not kill the development server.
+
+        Returns:
+            The server to be run
+    """
+    from flask_failsafe import failsafe  # pylint: disable=import-outside-toplevel
+    return failsafe(create_app)()
+
+
+def __getattr__(name):
+    """
+        Lazily creates the module-level `server` attribute, so that
+        `gunicorn server:server` still works without loading the data
+        when this module is only imported.
+    """
+    if name == 'server':
+        production = os.environ.get('DASHBOARD_ENV') == 'production'
+        server = create_app() if production else create_dev_app()
+        globals()['server'] = server
+        return server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def run_production(port, workers, threads):
+    """
+        Serves the Flask server with gunicorn, using `workers` processes with
+        `threads` threads each. The app is preloaded in the master process so
+        the data is read once and shared copy-on-write by the workers.
+
+        Args:
+            port (int): The port to bind to.
+            workers (int): The number of worker processes.
+            threads (int): The number of threads per worker.
+    """
+    # gunicorn is only needed in production and does not exist on Windows
+    from gunicorn.app.base import BaseApplication  # pylint: disable=import-outside-toplevel
+
+    class DashboardApplication(BaseApplication):  # pylint: disable=abstract-method
+        """
+            Minimal gunicorn application serving our Flask server.
+        """
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return create_app()
+
+    DashboardApplication({
+        'bind': f'0.0.0.0:{port}',
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': 120,
+    }).run()
+
+
+def parse_args():
+    """
+        Parses the command line arguments of the server.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--prod', action='store_true',
+                        default=os.environ.get('DASHBOARD_ENV') == 'production',
+                        help='Serve with gunicorn instead of the development server.')
+    parser.add_argument('--port', type=int,
+                        default=int(os.environ.get('DASHBOARD_PORT', DEFAULT_PORT)))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('DASHBOARD_WORKERS', DEFAULT_WORKERS)))
+    parser.add_argument('--threads', type=int,
+                        default=int(os.environ.get('DASHBOARD_THREADS', DEFAULT_THREADS)))
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    server.run(port="8050", debug=True)
+    args = parse_args()
+    if args.prod:
+        run_production(args.port, args.workers, args.threads)
+    else:
+        create_dev_app().run(port=str(args.port), debug=True)
@@ -0,0 +1,126 @@
+"""
+    Columnar on-disk store of the preprocessed accident data.
+
+    The preprocessed DataFrame is saved as a Parquet dataset partitioned by
+    year and month (`year=2020/month=4/...`). Rows are sorted by date, so the
+    min/max statistics of each row group are tight. A date-range query only
+    opens the partitions overlapping the range, skips the row groups outside
+    of it, and only reads the requested columns. Range queries therefore stay
+    fast and bounded in memory however long the history is.
+"""
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # the store is optional, callers fall back to in-memory filtering
+    pa = ds = None
+
+VERSION_FILE = '_source_version'
+ROWS_PER_GROUP = 64 * 1024
+PARTITIONING = ['year', 'month']
+
+
+def available():
+    """
+    Returns:
+        bool: Whether pyarrow is installed, and so whether the store can be used.
+    """
+    return ds is not None
+
+
+def is_current(path, version):
+    """
+    Tells whether the store at `path` was built from the given version of the source data.
+
+    Args:
+        path (pathlib.Path): The directory of the store.
+        version (str): The version of the source data.
+
+    Returns:
+        bool: True if the store exists and is up to date.
+    """
+    version_file = path.joinpath(VERSION_FILE)
+    return version_file.exists() and version_file.read_text(encoding='utf-8') == version
+
+
+def write_store(df, path, version):
+    """
+    Saves the preprocessed data as a Parquet dataset partitioned by year and month.
+
+    Args:
+        df (pd.DataFrame): The preprocessed data, with a datetime 'crash_date' column.
+        path (pathlib.Path): The directory of the store, replaced if it exists.
+        version (str): The version of the source data, saved with the store.
+    """
+    df = df.sort_values('crash_date', kind='stable')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.append_column('year', pa.array(df['crash_date'].dt.year.to_numpy(), pa.int16()))
+    table = table.append_column('month', pa.array(df['crash_date'].dt.month.to_numpy(), pa.int8()))
+
+    path.mkdir(parents=True, exist_ok=True)
+    path.joinpath(VERSION_FILE).unlink(missing_ok=True)
+    ds.write_dataset(
+        table,
+        str(path),
+        format='parquet',
+        partitioning=ds.partitioning(table.select(PARTITIONING).schema, flavor='hive'),
+        existing_data_behavior='delete_matching',
+        max_partitions=max(len(df['crash_date'].dt.to_period('M').unique()), 1),
+        max_rows_per_group=ROWS_PER_GROUP,
+        min_rows_per_group=ROWS_PER_GROUP // 2,
+    )
+    path.joinpath(VERSION_FILE).write_text(version, encoding='utf-8')
+
+
+def read_store(path):
+    """
+    Reads the whole store back, so that a restart does not preprocess the source data again.
+
+    Args:
+        path (pathlib.Path): The directory of the store.
+
+    Returns:
+        pd.DataFrame: The preprocessed data, sorted by date, as saved by `write_store`.
+    """
+    dataset = ds.dataset(str(path), format='parquet', partitioning='hive')
+    df = dataset.to_table().to_pandas()
+    return df.drop(columns=PARTITIONING).sort_values('crash_date', kind='stable', ignore_index=True)
+
+
+def _month_filter(start, end):
+    """
+    Builds a filter on the partition keys keeping the months between `start` and `end`.
+    """
+    year, month = ds.field('year'), ds.field('month')
+    after_start = (year > start.year) | ((year == start.year) & (month >= start.month))
+    before_end = (year < end.year) | ((year == end.year) & (month <= end.month))
+    return after_start & before_end
+
+
+def read_range(path, columns, start_date, end_date, days=None):
+    """
+    Reads the rows of the store between two dates (both included, like the
+    date picker of figure 2), optionally restricted to some days of the week.
+
+    Args:
+        path (pathlib.Path): The directory of the store.
+        columns (List[str]): The columns to read.
+        start_date (str | pd.Timestamp): The first date of the range.
+        end_date (str | pd.Timestamp): The last date of the range.
+        days (List[str], optional): The names of the days of the week to keep.
+
+    Returns:
+        pd.DataFrame: The matching rows, with only the requested columns.
+    """
+    start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+    dataset = ds.dataset(str(path), format='parquet', partitioning='hive')
+    crash_date_type = dataset.schema.field('crash_date').type
+    condition = (
+        _month_filter(start, end)
+        & (ds.field('crash_date') >= pa.scalar(start, crash_date_type))
+        & (ds.field('crash_date') <= pa.scalar(end, crash_date_type))
+    )
+    if days is not None:
+        condition = condition & ds.field('crash_day_of_week_name').isin(list(days))
+    return dataset.to_table(columns=list(columns), filter=condition).to_pandas()
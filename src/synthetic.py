@@ -0,0 +1,79 @@
+"""
+    Generator of synthetic traffic accident data, with the same columns as the
+    source CSV, used to benchmark and test the pipeline on any number of rows.
+"""
+import numpy as np
+import pandas as pd
+
+import mappings
+
+# Bounding box of the city of Chicago
+LATITUDE_RANGE = (41.64, 42.02)
+LONGITUDE_RANGE = (-87.94, -87.52)
+
+
+def generate(n_rows, seed=0, start='2018-01-01', end='2024-12-31 23:59'):
+    """
+    Generates random accidents spread uniformly between two dates.
+
+    Args:
+        n_rows (int): The number of accidents to generate.
+        seed (int, optional): The seed of the random generator.
+        start (str, optional): The first possible date.
+        end (str, optional): The last possible date.
+
+    Returns:
+        pd.DataFrame: The accidents, with the columns of the source CSV before any preprocessing.
+    """
+    rng = np.random.default_rng(seed)
+    rules = mappings.current()
+    causes = rules.known_values('cause_category')
+    weather = rules.known_values('weather_category')
+    traffic = rules.known_values('trafficway_category')
+    seconds = rng.integers(pd.Timestamp(start).value // 10 ** 9, pd.Timestamp(end).value // 10 ** 9,
+                           n_rows)
+    dates = pd.to_datetime(seconds, unit='s')
+    return pd.DataFrame({
+        'crash_date': dates.strftime('%m/%d/%Y %I:%M:%S %p'),
+        'weather_condition': rng.choice(weather, n_rows),
+        'trafficway_type': rng.choice(traffic, n_rows),
+        'prim_contributory_cause': rng.choice(causes, n_rows),
+        'injuries_fatal': rng.poisson(0.01, n_rows),
+        'injuries_incapacitating': rng.poisson(0.05, n_rows),
+        'injuries_non_incapacitating': rng.poisson(0.3, n_rows),
+        'crash_hour': dates.hour,
+        'crash_day_of_week': dates.dayofweek + 1,
+        'crash_month': dates.month,
+        'latitude': rng.uniform(*LATITUDE_RANGE, n_rows),
+        'longitude': rng.uniform(*LONGITUDE_RANGE, n_rows),
+    })
+
+
+def corrupt(df, fraction, seed=0):
+    """
+    Breaks a random fraction of the accidents in place, each with one of the problems found in
+    real exports: an unparseable date, an hour out of range or a negative injury count. A quarter
+    as many of the other accidents get an unknown weather condition, which the validation keeps,
+    in 'Autre'.
+
+    Args:
+        df (pd.DataFrame): Accidents, as returned by `generate`.
+        fraction (float): The fraction of the accidents to break.
+        seed (int, optional): The seed of the random generator.
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray]: The accidents, and the positions of the broken ones.
+    """
+    rng = np.random.default_rng(seed)
+    broken = rng.choice(len(df), int(len(df) * fraction), replace=False)
+    problems = [
+        ('crash_date', 'not a date'),
+        ('crash_hour', 24),
+        ('injuries_fatal', -1),
+    ]
+    for i, (column, value) in enumerate(problems):
+        df.loc[df.index[broken[i::len(problems)]], column] = value
+    unknown = rng.choice(np.setdiff1d(np.arange(len(df)), broken), len(broken) // 4,
+                         replace=False)
+    df.loc[df.index[unknown], 'weather_condition'] = 'UNKNOWN WEATHER'
+    return df, np.sort(broken)
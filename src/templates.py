@@ -0,0 +1,50 @@
+"""
+    Reusable figure templates updated in place.
+
+    A figure module builds its layout and trace skeleton once, as a plain
+    dict, and then describes each update as a list of (path, value) pairs
+    changing only the data arrays, e.g. (('data', 0, 'x'), [...]).
+
+    The updates are applied to the template, which copies only the dicts and
+    lists along the updated paths and shares the rest.
+"""
+
+
+def freeze(fig):
+    """
+    Converts a Plotly figure into the plain dict used as a template.
+
+    Args:
+        fig (go.Figure): The skeleton of the figure.
+
+    Returns:
+        dict: The figure as a dict, validated once by Plotly.
+    """
+    return fig.to_plotly_json()
+
+
+def apply(template, updates):
+    """
+    Builds a full figure from a template and a list of updates.
+
+    Args:
+        template (dict): The template of the figure. It is never modified.
+        updates (List[Tuple[tuple, Any]]): The (path, value) pairs to set.
+
+    Returns:
+        dict: The updated figure.
+    """
+    fig = dict(template)
+    copied = {id(fig)}
+    for path, value in updates:
+        node = fig
+        for key in path[:-1]:
+            child = node[key]
+            if id(child) not in copied:
+                child = list(child) if isinstance(child, list) else dict(child)
+                node[key] = child
+                copied.add(id(child))
+            node = child
+        node[path[-1]] = value
+    return fig
+
@@ -0,0 +1,24 @@
+"""
+    Startup budget of the dashboard, as measured by `check_startup.py`.
+
+    The check starts the production server and measures wall-clock times, so it
+    only runs when asked for, with `DASHBOARD_STARTUP_TEST=1`, and never on
+    Windows, where gunicorn does not run.
+"""
+import os
+import sys
+
+import pytest
+
+import check_startup
+
+
+@pytest.mark.skipif(os.environ.get('DASHBOARD_STARTUP_TEST') != '1',
+                    reason='Set DASHBOARD_STARTUP_TEST=1 to measure the startup budget.')
+@pytest.mark.skipif(sys.platform == 'win32', reason='gunicorn does not run on Windows.')
+def test_startup_within_budget():
+    pytest.importorskip('gunicorn')
+    checks = check_startup.measure()
+    over = [f"{name}: {measured:.3f} s > {budget:.3f} s"
+            for name, measured, budget in checks if measured > budget]
+    assert not over, ', '.join(over)
@@ -0,0 +1,65 @@
+"""
+    Expansion of the categories of the Sankey diagrams into their raw values.
+"""
+import pandas as pd
+
+import drilldown
+
+
+def links(rows):
+    """
+    Returns the links of a diagram from (source, target, value) tuples.
+    """
+    return pd.DataFrame(rows, columns=drilldown.LINK_COLUMNS)
+
+
+LINKS = links([
+    ('Vitesse', 'Clair', 5),
+    ('Vitesse', 'Pluie', 2),
+    ('Météo', 'Pluie', 4),
+    ('Clair', 'Route', 7),
+    ('Pluie', 'Route', 6),
+])
+
+EXPANSIONS = {
+    'Pluie': (['RAIN', 'FREEZING RAIN'], links([
+        ('Vitesse', 'RAIN', 2),
+        ('Météo', 'RAIN', 1),
+        ('Météo', 'FREEZING RAIN', 3),
+        ('RAIN', 'Route', 3),
+        ('FREEZING RAIN', 'Route', 3),
+    ])),
+}
+
+
+def test_expand_replaces_the_node_of_the_category():
+    expanded, parents = drilldown.expand(LINKS, 'Pluie', EXPANSIONS)
+
+    assert parents == {'RAIN': 'Pluie', 'FREEZING RAIN': 'Pluie'}
+    assert 'Pluie' not in set(expanded['source']) | set(expanded['target'])
+    pd.testing.assert_frame_equal(expanded.iloc[:2], LINKS.iloc[[0, 3]].reset_index(drop=True))
+    pd.testing.assert_frame_equal(expanded.iloc[2:].reset_index(drop=True), EXPANSIONS['Pluie'][1])
+
+
+def test_expand_keeps_the_flows_of_the_category():
+    expanded, _ = drilldown.expand(LINKS, 'Pluie', EXPANSIONS)
+
+    incoming = LINKS[LINKS['target'] == 'Pluie']['value'].sum()
+    outgoing = LINKS[LINKS['source'] == 'Pluie']['value'].sum()
+    raw = expanded['source'].isin(['RAIN', 'FREEZING RAIN'])
+    assert expanded[expanded['target'].isin(['RAIN', 'FREEZING RAIN'])]['value'].sum() == incoming
+    assert expanded[raw]['value'].sum() == outgoing
+
+
+def test_expand_does_not_modify_the_links():
+    original = LINKS.copy()
+
+    drilldown.expand(LINKS, 'Pluie', EXPANSIONS)
+
+    pd.testing.assert_frame_equal(LINKS, original)
+
+
+def test_clicked_label():
+    assert drilldown.clicked_label({'points': [{'label': 'Pluie'}]}) == 'Pluie'
+    assert drilldown.clicked_label({'points': [{}]}) is None
+    assert drilldown.clicked_label(None) is None
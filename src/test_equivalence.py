@@ -0,0 +1,19 @@
+"""
+    Equivalence of the optimized engines with the legacy pipeline, on a small synthetic dataset.
+"""
+import pytest
+
+import equivalence
+import synthetic
+
+
+@pytest.mark.parametrize('engine', equivalence.available_engines(list(equivalence.ENGINES)))
+def test_engine_matches_legacy_pipeline(tmp_path, engine):
+    path = tmp_path.joinpath('accidents.csv')
+    df, _ = synthetic.corrupt(synthetic.generate(3000), 0.01)
+    df.to_csv(path, index=False)
+
+    mismatches = equivalence.compare('synthetic 3000', path, [engine], workers=2)
+
+    assert not mismatches, {output: lines[:equivalence.MAX_DIFFERENCES]
+                            for output, lines in mismatches.get(engine, {}).items()}
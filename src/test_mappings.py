@@ -0,0 +1,80 @@
+"""
+    Fingerprints and changes of the mapping rules.
+"""
+import copy
+
+import mappings
+
+CONFIG = {
+    "version": 1,
+    "dimensions": {
+        "cause_category": {
+            "categories": {
+                "Vitesse": {"color": "#e74c3c", "values": ["SPEEDING", "EXCEEDING SAFE SPEED"]},
+                "Météo": {"color": "#3498db", "values": ["WEATHER"]},
+            },
+            "other": ["UNABLE TO DETERMINE"],
+        },
+        "weather_category": {
+            "categories": {
+                "Clair": {"values": ["CLEAR"]},
+                "Pluie": {"values": ["RAIN", "FREEZING RAIN"]},
+            },
+        },
+    },
+}
+
+
+def changed(edit):
+    """
+    Returns rules of a copy of `CONFIG` modified by a function.
+    """
+    config = copy.deepcopy(CONFIG)
+    edit(config["dimensions"])
+    return mappings.MappingRules(config)
+
+
+def test_fingerprint_ignores_colors_and_order():
+    def edit(dimensions):
+        categories = dimensions["cause_category"]["categories"]
+        categories["Vitesse"]["color"] = "#000000"
+        categories["Vitesse"]["values"].reverse()
+        dimensions["cause_category"]["categories"] = dict(reversed(categories.items()))
+
+    rules, other = mappings.MappingRules(CONFIG), changed(edit)
+
+    assert other.fingerprint("cause_category") == rules.fingerprint("cause_category")
+    assert other.changed_dimensions(rules) == []
+
+
+def test_fingerprint_changes_with_the_grouping():
+    def edit(dimensions):
+        dimensions["cause_category"]["categories"]["Vitesse"]["values"].remove("SPEEDING")
+        dimensions["cause_category"]["categories"]["Météo"]["values"].append("SPEEDING")
+
+    rules, other = mappings.MappingRules(CONFIG), changed(edit)
+
+    assert other.fingerprint("cause_category") != rules.fingerprint("cause_category")
+    assert other.fingerprint("weather_category") == rules.fingerprint("weather_category")
+    assert other.changed_dimensions(rules) == ["cause_category"]
+
+
+def test_fingerprint_ignores_the_other_values():
+    def edit(dimensions):
+        dimensions["cause_category"]["other"].append("NOT APPLICABLE")
+
+    rules, other = mappings.MappingRules(CONFIG), changed(edit)
+
+    # The new value is no longer reported as unknown, but its category is still 'Autre'
+    assert other.fingerprint("cause_category") == rules.fingerprint("cause_category")
+    assert "NOT APPLICABLE" in other.known_values("cause_category")
+    assert other.changed_dimensions(rules) == []
+
+
+def test_fingerprint_of_a_column_without_other_values():
+    def edit(dimensions):
+        dimensions["weather_category"]["other"] = []
+
+    rules, other = mappings.MappingRules(CONFIG), changed(edit)
+
+    assert other.fingerprint("weather_category") == rules.fingerprint("weather_category")
@@ -0,0 +1,107 @@
+"""
+    Byte ranges of the parallel preprocessing, and merging of their aggregates.
+"""
+import pandas as pd
+import pytest
+
+import ingest
+import partitions
+import preprocess
+import synthetic
+import validation
+
+
+def processed(df):
+    """
+    Validates and preprocesses raw accidents like a range of the parallel load.
+    """
+    data = validation.validate(df)[0]
+    return preprocess.map_categories(preprocess.add_season(preprocess.convert_types(data)))
+
+
+@pytest.mark.parametrize('n_ranges', [1, 3, 7, 500])
+def test_split_ranges_end_at_line_breaks(tmp_path, n_ranges):
+    path = tmp_path.joinpath('accidents.csv')
+    synthetic.generate(200).to_csv(path, index=False)
+    content = path.read_bytes()
+
+    header, ranges = partitions.split(path, n_ranges)
+
+    assert content.startswith(header) and header.endswith(b'\n')
+    assert 1 <= len(ranges) <= n_ranges
+    assert ranges[0][0] == len(header) and ranges[-1][1] == len(content)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+    for start, end in ranges:
+        assert start < end
+        assert content[start - 1:start] == b'\n' and content[end - 1:end] == b'\n'
+
+
+def test_split_file_without_rows(tmp_path):
+    path = tmp_path.joinpath('accidents.csv')
+    synthetic.generate(0).to_csv(path, index=False)
+
+    header, ranges = partitions.split(path, 4)
+
+    assert header == path.read_bytes()
+    assert ranges == []
+
+
+def test_rows_crossing_the_nominal_edges_are_read_once(tmp_path):
+    path = tmp_path.joinpath('accidents.csv')
+    synthetic.generate(300).to_csv(path, index=False)
+    content = path.read_bytes()
+
+    header, ranges = partitions.split(path, 7)
+    results = [partitions.preprocess_range(path, header, start, end) for start, end in ranges]
+
+    # The even cuts fall inside rows, which are read whole by the range they start in
+    edges = [len(content) * i // 7 for i in range(1, 7)]
+    assert any(content[edge - 1:edge] != b'\n' for edge in edges)
+    data = pd.concat([result[0] for result in results], ignore_index=True)
+    pd.testing.assert_frame_equal(data.sort_values('crash_date', kind='stable', ignore_index=True),
+                                  ingest.preprocess_file(path)[0])
+
+
+def test_rows_spanning_several_lines_are_preprocessed_serially(tmp_path):
+    path = tmp_path.joinpath('accidents.csv')
+    df = synthetic.generate(300)
+    df.loc[150, 'prim_contributory_cause'] = 'UNABLE TO\nDETERMINE'
+    df.to_csv(path, index=False)
+    content = path.read_bytes()
+    header, _ = partitions.split(path, 1)
+
+    # A range ending inside the quoted field, or holding all of it, is refused
+    inside = content.index(b'UNABLE TO\n') + len(b'UNABLE TO\n')
+    assert partitions.preprocess_range(path, header, len(header), inside) is None
+    assert partitions.preprocess_range(path, header, len(header), len(content)) is None
+    assert partitions.preprocess_parallel(path, 2) is None
+
+    data = ingest.preprocess_file(path, 2)[0]
+    assert len(data) == 300
+    pd.testing.assert_frame_equal(data, ingest.preprocess_file(path)[0])
+
+
+def test_merge_matches_aggregates_of_all_rows():
+    data = processed(synthetic.generate(2000))
+    # The first rows miss some of the combinations of the others, counted as zero when merged
+    first, rest = data.iloc[:50], data.iloc[50:]
+
+    merged = partitions.Aggregates.of(first).merge(partitions.Aggregates.of(rest))
+    expected = partitions.Aggregates.of(data)
+
+    pd.testing.assert_series_equal(merged.seasonal, expected.seasonal)
+    pd.testing.assert_series_equal(merged.hourly, expected.hourly)
+    pd.testing.assert_series_equal(merged.sankey, expected.sankey)
+    pd.testing.assert_frame_equal(merged.injuries, expected.injuries)
+
+
+def test_merge_is_symmetric():
+    data = processed(synthetic.generate(500))
+    first = partitions.Aggregates.of(data.iloc[:100])
+    rest = partitions.Aggregates.of(data.iloc[100:])
+
+    pd.testing.assert_frame_equal(first.merge(rest).sankey_counts(),
+                                  rest.merge(first).sankey_counts())
+    pd.testing.assert_frame_equal(first.merge(rest).seasonal_accidents(),
+                                  rest.merge(first).seasonal_accidents())
@@ -0,0 +1,58 @@
+"""
+    Counts of accidents per period, around the ISO weeks straddling two years.
+"""
+import pandas as pd
+
+import rollups
+from const import SEASON_ORDER
+
+
+def accidents(*dates):
+    """
+    Returns processed accidents on the given dates, all in winter.
+    """
+    return pd.DataFrame({'crash_date': pd.to_datetime(list(dates)), 'season': 'Hiver'})
+
+
+def counted(table):
+    """
+    Returns the number of accidents of each period of a table.
+    """
+    return {(year, period.strftime('%Y-%m-%d')): int(count)
+            for (year, period), count in table.sum(axis=1).items()}
+
+
+def test_week_belongs_to_the_year_of_its_thursday():
+    tables = rollups.Rollups()
+    # Thursday 2020-12-31 puts the week of Monday 2020-12-28 in 2020, with 2021-01-01 and 01-03,
+    # and Thursday 2020-01-02 puts the week of Monday 2019-12-30 in 2020 too
+    tables.append(accidents('2019-12-30 08:00', '2020-01-01 12:00', '2020-12-31 23:00',
+                            '2021-01-01 01:00', '2021-01-03 10:00', '2021-01-04 00:30'))
+
+    assert counted(tables.between('week', 2019, 2019)) == {}
+    assert counted(tables.between('week', 2020, 2020)) == {
+        (2020, '2019-12-30'): 2,
+        (2020, '2020-12-28'): 3,
+    }
+    assert counted(tables.between('week', 2021, 2021)) == {(2021, '2021-01-04'): 1}
+
+
+def test_days_and_months_belong_to_their_calendar_year():
+    tables = rollups.Rollups()
+    tables.append(accidents('2019-12-30 08:00', '2020-12-31 23:00', '2021-01-01 01:00'))
+
+    assert counted(tables.between('day', 2019, 2019)) == {(2019, '2019-12-30'): 1}
+    assert counted(tables.between('month', 2021, 2021)) == {(2021, '2021-01-01'): 1}
+    assert tables.between('year', 2019, 2021)['total'].tolist() == [1, 1, 1]
+
+
+def test_totals_of_every_resolution_match():
+    tables = rollups.Rollups()
+    dates = pd.date_range('2019-12-20', '2021-01-15', freq='17h')
+    tables.append(accidents(*dates[:300]))
+    tables.append(accidents(*dates[300:]))
+
+    for resolution in rollups.RESOLUTIONS:
+        table = tables.between(resolution, 2019, 2021)
+        assert int(table.to_numpy().sum()) == len(dates), resolution
+    assert list(tables.table('day').columns) == SEASON_ORDER
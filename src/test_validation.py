@@ -0,0 +1,72 @@
+"""
+    Checks of the raw accidents and the reasons given to the rejected ones.
+"""
+import numpy as np
+import pytest
+
+import synthetic
+import validation
+
+
+def test_valid_rows_are_kept():
+    df = synthetic.generate(50)
+
+    valid, quarantine, summary = validation.validate(df)
+
+    assert len(valid) == 50 and quarantine.empty
+    assert (summary == 0).all()
+
+
+def test_reasons_list_every_failed_check_in_order():
+    df = synthetic.generate(6)
+    df.loc[0, 'crash_date'] = 'not a date'
+    df.loc[1, 'crash_hour'] = 24
+    df.loc[1, 'injuries_fatal'] = -1
+    df.loc[2, 'injuries_incapacitating'] = np.nan
+    df.loc[3, ['crash_hour', 'injuries_non_incapacitating']] = [-1, -2]
+
+    valid, quarantine, summary = validation.validate(df)
+
+    assert valid.index.tolist() == [4, 5]
+    assert quarantine['reasons'].to_dict() == {
+        0: 'unparseable crash_date',
+        1: 'crash_hour outside 0-23; negative or missing injuries_fatal',
+        2: 'negative or missing injuries_incapacitating',
+        3: 'crash_hour outside 0-23; negative or missing injuries_non_incapacitating',
+    }
+    assert summary['crash_hour outside 0-23'] == 2
+    assert summary['unparseable crash_date'] == 1
+    assert summary.sum() == 6
+
+
+def test_unknown_raw_values_are_kept_and_reported():
+    df = synthetic.generate(6)
+    df.loc[2, 'prim_contributory_cause'] = 'UNKNOWN CAUSE'
+    df.loc[3, ['weather_condition', 'trafficway_type']] = ['UNKNOWN WEATHER', np.nan]
+    df.loc[4, ['crash_hour', 'prim_contributory_cause']] = [-1, 'UNKNOWN CAUSE']
+
+    valid, quarantine, summary = validation.validate(df)
+
+    assert valid.index.tolist() == [0, 1, 2, 3, 5]
+    assert quarantine['reasons'].to_dict() == {4: 'crash_hour outside 0-23'}
+    assert summary[['unmapped prim_contributory_cause', 'unmapped weather_condition',
+                    'unmapped trafficway_type']].tolist() == [2, 1, 1]
+
+
+def test_rows_sharing_failures_share_reasons():
+    df = synthetic.generate(100)
+    broken = np.arange(0, 100, 10)
+    df.loc[broken, 'injuries_incapacitating'] = np.nan
+
+    _, quarantine, summary = validation.validate(df)
+
+    assert quarantine.index.tolist() == broken.tolist()
+    assert set(quarantine['reasons']) == {'negative or missing injuries_incapacitating'}
+    assert summary['negative or missing injuries_incapacitating'] == len(broken)
+
+
+def test_missing_column_is_an_error():
+    df = synthetic.generate(5).drop(columns='crash_hour')
+
+    with pytest.raises(ValueError, match='crash_hour'):
+        validation.validate(df)
@@ -0,0 +1,111 @@
+"""
+    Validation of the raw accidents, before they are preprocessed.
+
+    Every check tests a whole column at once. The failed checks of each row
+    are packed as the bits of a single integer, so the data is scanned once
+    per column whatever the number of problems, and the reasons are only
+    spelled out for the rejected rows. Those rows are removed from the data
+    and written, with their reasons, to a quarantine file, instead of
+    failing later in the figures or silently skewing the counts.
+
+    A raw cause, weather or trafficway value unknown to the mapping rules is
+    not invalid: the row is kept, its category is 'Autre', and it is only
+    counted in the summary, so that the rules can be completed.
+"""
+import numpy as np
+import pandas as pd
+
+import mappings
+from const import INJURY_CATEGORIES, RAW_COLUMNS
+
+# Format of the dates of the source CSV
+DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+# Increased with every change of the checks, since they decide which rows are kept
+VERSION = 2
+
+REQUIRED_COLUMNS = ['crash_date', 'crash_hour', *INJURY_CATEGORIES, *RAW_COLUMNS.values()]
+
+
+def run_checks(df):
+    """
+    Runs every check on the raw accidents.
+
+    Args:
+        df (pd.DataFrame): The accidents, as read from the source CSV.
+
+    Returns:
+        Tuple[pd.Series, List[Tuple[str, np.ndarray]], List[Tuple[str, np.ndarray]]]: The parsed
+        dates, then for each check rejecting rows, and for each category column, its reason and
+        the rows failing it.
+
+    Raises:
+        ValueError: If a column needed by the dashboard is missing.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+    dates = pd.to_datetime(df['crash_date'], format=DATE_FORMAT, errors='coerce')
+    checks = [('unparseable crash_date', dates.isna().to_numpy())]
+
+    hours = pd.to_numeric(df['crash_hour'], errors='coerce')
+    checks.append(('crash_hour outside 0-23',
+                   ~(hours.between(0, 23) & (hours % 1 == 0)).to_numpy()))
+
+    for column in INJURY_CATEGORIES:
+        counts = pd.to_numeric(df[column], errors='coerce')
+        checks.append((f'negative or missing {column}', ~(counts >= 0).to_numpy()))
+
+    # The raw values known in each category column are those of the current mapping rules
+    rules = mappings.current()
+    unmapped = [(f'unmapped {column}', ~df[column].isin(rules.known_values(dimension)).to_numpy())
+                for dimension, column in RAW_COLUMNS.items()]
+    return dates, checks, unmapped
+
+
+def validate(df):
+    """
+    Splits the raw accidents into the valid rows and the rows to quarantine.
+
+    Args:
+        df (pd.DataFrame): The accidents, as read from the source CSV.
+
+    Returns:
+        tuple: A tuple containing:
+            - The valid accidents, with `crash_date` already parsed.
+            - The rejected accidents, with a 'reasons' column listing their failed checks.
+            - The number of rows failing each check, followed by the number of rows of each
+              category column whose raw value is unknown to the mapping rules.
+    """
+    dates, checks, unmapped = run_checks(df)
+    failures = np.zeros(len(df), dtype=np.uint32)
+    for bit, (_, failed) in enumerate(checks):
+        failures |= failed.astype(np.uint32) << bit
+    rejected = failures != 0
+
+    # Only the few distinct combinations of failed checks are turned into text
+    reasons = {
+        code: '; '.join(reason for bit, (reason, _) in enumerate(checks) if code >> bit & 1)
+        for code in np.unique(failures[rejected]).tolist()
+    }
+    codes = pd.Series(failures[rejected], index=df.index[rejected])
+    quarantine = df.loc[rejected].assign(reasons=codes.map(reasons))
+    valid = df.loc[~rejected].assign(crash_date=dates[~rejected])
+    summary = pd.Series({reason: int(failed.sum()) for reason, failed in checks + unmapped},
+                        name='rows')
+    return valid, quarantine, summary
+
+
+def write_quarantine(quarantine, summary, path):
+    """
+    Writes the rejected accidents and the number of rows failing each check.
+
+    Args:
+        quarantine (pd.DataFrame): The rejected accidents, as returned by `validate`.
+        summary (pd.Series): The number of rows failing each check, as returned by `validate`.
+        path (Path): The CSV file of the rejected accidents. The summary is written next to it,
+            with a '_summary' suffix.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    quarantine.to_csv(path, index=False)
+    summary.rename_axis('check').to_csv(path.with_name(f'{path.stem}_summary.csv'))